@@ -0,0 +1,81 @@
+"""
+Context Diff Benchmark
+Replays a long conversation through build_context and compares the tokens sent with and without goals diffing
+
+Usage: python -m benchmarks.context_diff_benchmark [--turns 200] [--goals 12] [--change-every 15]
+"""
+
+import os
+import sys
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from navi.core.engine.context_window import estimate_tokens
+from navi.core.engine.conversation import NaviContextManager
+from navi.core.state.manager import StateManager
+
+REPLY = "<strategize>Check their week first.</strategize><message>" + "Sounds good, let's plan that. " * 6 + "</message>"
+
+
+def _goal(goal_id: int) -> dict:
+    return {'goal_id': goal_id, 'title': f'Run a half marathon before the end of season {goal_id}',
+            'category': 'Health'}
+
+
+def replay(turns: int, goals: int, change_every: int, diffing: bool) -> dict:
+    """Token counts for one replay; every `change_every` turns a goal is added"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = StateManager(filepath=os.path.join(tmp, 'state.json'), backend='json',
+                               journaled=False, segmented=False)
+        state = manager.get_state()
+        state['goals'] = [_goal(g) for g in range(1, goals + 1)]
+        context_manager = NaviContextManager(manager)
+
+        history_tokens = 0
+        context_tokens = 0
+        prompt_tokens = 0
+        for turn in range(turns):
+            if change_every and turn and turn % change_every == 0:
+                state['goals'].append(_goal(len(state['goals']) + 1))
+            if not diffing:
+                # The old behaviour: the full goals summary on every turn
+                context_manager.forget_sent_goals()
+
+            context = context_manager.build_context(f"Can you help me with my plans for day {turn}?")
+            tokens = estimate_tokens({'parts': [{'text': context}]})
+            context_tokens += tokens
+            # Each call sends the whole history so far plus the new message
+            prompt_tokens += history_tokens + tokens
+            history_tokens += tokens + estimate_tokens({'parts': [{'text': REPLY}]})
+
+        return {'context': context_tokens, 'prompt': prompt_tokens, 'history': history_tokens}
+
+
+def run(turns: int, goals: int, change_every: int):
+    full = replay(turns, goals, change_every, diffing=False)
+    diffed = replay(turns, goals, change_every, diffing=True)
+
+    print(f"{turns} turns, {goals} goals to start, one more every {change_every} turns (estimated tokens)")
+    print(f"{'':>26} {'full goals':>12} {'diffed':>12} {'saved':>7}")
+    for key, label in (('context', 'user turn context'), ('history', 'final history size'),
+                       ('prompt', 'prompt tokens, all calls')):
+        saved = 100 * (1 - diffed[key] / full[key]) if full[key] else 0
+        print(f"{label:>26} {full[key]:>12,} {diffed[key]:>12,} {saved:>6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--turns', type=int, default=200, help='User turns to replay')
+    parser.add_argument('--goals', type=int, default=12, help='Goals at the start')
+    parser.add_argument('--change-every', type=int, default=15, help='Turns between goal changes (0 for never)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    run(args.turns, args.goals, args.change_every)
+
+
+if __name__ == '__main__':
+    main()
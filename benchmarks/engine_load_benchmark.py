@@ -0,0 +1,105 @@
+"""
+Engine Load Benchmark
+Drives concurrent users through pooled conversation engines on the fake LLM provider and reports our own overhead
+
+Usage: python -m benchmarks.engine_load_benchmark [--users 20] [--turns 10] [--latency 0.2] [--jitter 0.1]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from navi.core.engine import providers
+from navi.core.engine.dispatcher import turn_dispatcher
+from navi.core.engine.fake_llm import FakeProvider
+from navi.core.engine.pool import EnginePool
+from navi.core.state.manager import StateManager
+
+# Every other turn reads the goals before answering, so tool execution is part of what's measured
+SCRIPT = [
+    {'function_calls': [{'name': 'list_goals', 'args': {}}]},
+    {'text': "<strategize>They asked about goals.</strategize><message>" + "Here's where you stand. " * 8 +
+             "</message>"},
+    {'text': "<message>" + "Sounds like a plan, let's do it. " * 6 + "</message>"},
+]
+
+
+def _llm_calls(manager: StateManager) -> int:
+    """LLM calls made for a user so far, from the usage accounting"""
+    return sum(flows.get('chat', {}).get('calls', 0) for flows in manager.get_state().get('usage_stats', {}).values())
+
+
+async def _user(pool: EnginePool, manager: StateManager, turns: int, timings: list):
+    for turn in range(turns):
+        started = time.perf_counter()
+        calls_before = _llm_calls(manager)
+        async with turn_dispatcher.turn(manager, pool=pool) as engine:
+            await engine.process_message(f"How am I doing on my goals this week? (turn {turn})")
+            engine.save_state()
+        elapsed = time.perf_counter() - started
+        timings.append((elapsed, _llm_calls(manager) - calls_before))
+
+
+async def _run(users: int, turns: int, directory: str) -> list:
+    pool = EnginePool(max_size=users)
+    timings = []
+    managers = []
+    for user in range(users):
+        manager = StateManager(filepath=os.path.join(directory, f'user{user}.json'), backend='json')
+        manager.user_email = f'user{user}@example.com'
+        manager.get_state()['goals'] = [{'goal_id': g, 'title': f'Goal {g}', 'category': 'Health'}
+                                        for g in range(1, 9)]
+        managers.append(manager)
+    await asyncio.gather(*(_user(pool, manager, turns, timings) for manager in managers))
+    return timings
+
+
+def run(users: int, turns: int, latency: float, jitter: float):
+    slept = []
+
+    def sleep(seconds: float):
+        slept.append(seconds)
+        time.sleep(seconds)
+
+    provider = FakeProvider(SCRIPT, latency=latency, jitter=jitter, seed=1, sleep=sleep)
+    providers.set_provider(provider)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            started = time.perf_counter()
+            timings = asyncio.run(_run(users, turns, tmp))
+            wall = time.perf_counter() - started
+    finally:
+        providers.set_provider(None)
+
+    # Includes waiting for a free LLM worker (NAVI_LLM_MAX_WORKERS), which is ours too
+    llm_ms = 1000 * statistics.mean(slept)
+    turn_ms = sorted(elapsed * 1000 for elapsed, _ in timings)
+    overhead_ms = statistics.mean(elapsed * 1000 - calls * llm_ms for elapsed, calls in timings)
+    print(f"{users} users x {turns} turns on the fake provider ({latency * 1000:.0f}ms +0-{jitter * 1000:.0f}ms "
+          f"per call, {provider.calls} calls)")
+    print(f"  wall time           {wall:8.2f}s  ({len(timings) / wall:.1f} turns/s)")
+    print(f"  turn p50 / p95      {statistics.median(turn_ms):8.1f}ms / {turn_ms[int(len(turn_ms) * 0.95) - 1]:.1f}ms")
+    print(f"  our overhead (mean) {overhead_ms:8.1f}ms per turn beyond the LLM's {llm_ms:.1f}ms per call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=20, help='Concurrent users')
+    parser.add_argument('--turns', type=int, default=10, help='Turns per user')
+    parser.add_argument('--latency', type=float, default=0.2, help='Fake LLM seconds per call')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Up to this many extra seconds per call')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    run(args.users, args.turns, args.latency, args.jitter)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+State Format Benchmark
+Compares on-disk size and load/save latency of the state encodings for growing chat histories
+
+Usage: python -m benchmarks.state_format_benchmark [--sizes 1000,10000,100000] [--repeat 3]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from navi.core.state import codec as state_codec
+from navi.core.state.codec import StateCodec
+from navi.utils.atomic_write import atomic_write
+from benchmarks.state_io_benchmark import build_state
+
+
+def available_codecs():
+    """(label, codec) for every encoding usable in this environment"""
+    combos = [('json', 'none'), ('compact', 'none')]
+    if state_codec.ormsgpack is not None:
+        combos.append(('msgpack', 'none'))
+    if state_codec.zstandard is not None:
+        combos.append(('compact', 'zstd'))
+        if state_codec.ormsgpack is not None:
+            combos.append(('msgpack', 'zstd'))
+
+    codecs = []
+    for fmt, compression in combos:
+        label = fmt if compression == 'none' else f"{fmt}+{compression}"
+        codecs.append((label, StateCodec(fmt, compression)))
+    return codecs
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def run(sizes, repeat: int):
+    codecs = available_codecs()
+    skipped = {'msgpack': state_codec.ormsgpack is None, 'zstd': state_codec.zstandard is None}
+    missing = [name for name, is_missing in skipped.items() if is_missing]
+    if missing:
+        print(f"(not installed, skipped: {', '.join(missing)})")
+
+    print(f"{'messages':>9} {'format':>14} {'size KB':>9} {'save':>10} {'load':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            state = build_state(n)
+            path = os.path.join(tmp, 'state.bin')
+
+            # Baseline: the historical stdlib json.dump(indent=4)
+            def legacy_save():
+                with open(path, 'w') as f:
+                    json.dump(state, f, indent=4)
+
+            def legacy_load():
+                with open(path, 'r') as f:
+                    json.load(f)
+
+            save_ms = _time(legacy_save, repeat)
+            load_ms = _time(legacy_load, repeat)
+            size_kb = os.path.getsize(path) / 1024
+            print(f"{n:>9} {'stdlib indent=4':>14} {size_kb:>9.0f} {save_ms:>8.1f}ms {load_ms:>8.1f}ms")
+
+            for label, codec in codecs:
+                def save():
+                    atomic_write(path, codec.encode(state))
+
+                def load():
+                    with open(path, 'rb') as f:
+                        codec.decode(f.read())
+
+                save_ms = _time(save, repeat)
+                load_ms = _time(load, repeat)
+                size_kb = os.path.getsize(path) / 1024
+                print(f"{n:>9} {label:>14} {size_kb:>9.0f} {save_ms:>8.1f}ms {load_ms:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Comma-separated chat history sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (median is reported)')
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(',')], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+State I/O Benchmark
+Times StateManager load/save against chat history size, compared with the old code path
+
+Usage: python -m benchmarks.state_io_benchmark [--sizes 100,1000,10000] [--repeat 5]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from navi.core.state.manager import StateManager
+from navi.utils import fast_json
+
+logger = logging.getLogger('navi.core.state.manager')
+
+
+def build_state(n_messages: int) -> dict:
+    """A default state with n_messages of realistic-looking chat history"""
+    state = StateManager(filepath=os.devnull).get_default_state()
+    for i in range(n_messages):
+        role = 'user' if i % 2 == 0 else 'model'
+        text = f"Message {i}: " + "I'd like to work on my running goal this week. " * 4
+        state['chat_history'].append({
+            'role': role,
+            'parts': [{'text': text}],
+            'timestamp': f"2025-07-06T10:{i % 60:02d}:00"
+        })
+    state['goals'] = [{'goal_id': g, 'title': f'Goal {g}', 'category': 'Health'} for g in range(1, 21)]
+    state['tasks'] = [{'task_id': t, 'goal_id': t % 20 + 1, 'status': 'PENDING'} for t in range(1, 101)]
+    return state
+
+
+def legacy_load(path: str) -> dict:
+    """The previous load path: read, seek, parse again, and two eager debug dumps"""
+    with open(path, 'r') as f:
+        raw = f.read()
+        if not raw.strip():
+            return {}
+        f.seek(0)
+        data = json.load(f)
+    logger.debug("%s", json.dumps(data, indent=2))
+    logger.debug("%s", json.dumps(data, indent=2))
+    return data
+
+
+def legacy_save(path: str, state: dict):
+    """The previous save path: eager debug dump plus json.dump(indent=4)"""
+    logger.debug("%s", json.dumps(state, indent=2))
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=4)
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def run(sizes, repeat: int):
+    print(f"orjson: {'yes' if fast_json.orjson is not None else 'no'}, debug logging off")
+    print(f"{'messages':>9} {'file KB':>9} {'old load':>10} {'new load':>10} {'old save':>10} {'new save':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f'state_{n}.json')
+            state = build_state(n)
+
+            manager = StateManager(filepath=path, journaled=False, backend='json')
+            manager.state = state
+            manager.save_state()
+
+            def new_load():
+                StateManager(filepath=path, journaled=False, backend='json').get_state()
+
+            old_load_ms = _time(lambda: legacy_load(path), repeat)
+            new_load_ms = _time(new_load, repeat)
+            old_save_ms = _time(lambda: legacy_save(path + '.legacy', state), repeat)
+            new_save_ms = _time(manager.save_state, repeat)
+
+            size_kb = os.path.getsize(path) / 1024
+            print(f"{n:>9} {size_kb:>9.0f} {old_load_ms:>8.1f}ms {new_load_ms:>8.1f}ms "
+                  f"{old_save_ms:>8.1f}ms {new_save_ms:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000', help='Comma-separated chat history sizes')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (median is reported)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    run([int(s) for s in args.sizes.split(',')], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,8 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from typing import Optional, Dict, Any
 
+from ...utils.atomic_write import atomic_write_json
+
 # Google API scopes needed - use broad scopes for full access
 SCOPES = [
     'https://www.googleapis.com/auth/calendar',  # Full calendar access (includes events)
@@ -155,21 +157,20 @@ class NaviAuth:
         os.makedirs(user_dir, exist_ok=True)
         
         token_path = os.path.join(user_dir, 'token.json')
-        with open(token_path, 'w') as f:
-            # Handle both old and new format
-            if hasattr(creds, 'to_json'):
-                json.dump(json.loads(creds.to_json()), f)
-            else:
-                # For direct credentials dict
-                creds_dict = {
-                    'token': creds.token,
-                    'refresh_token': creds.refresh_token,
-                    'token_uri': creds.token_uri,
-                    'client_id': creds.client_id,
-                    'client_secret': creds.client_secret,
-                    'scopes': creds.scopes
-                }
-                json.dump(creds_dict, f)
+        # Handle both old and new format
+        if hasattr(creds, 'to_json'):
+            creds_dict = json.loads(creds.to_json())
+        else:
+            # For direct credentials dict
+            creds_dict = {
+                'token': creds.token,
+                'refresh_token': creds.refresh_token,
+                'token_uri': creds.token_uri,
+                'client_id': creds.client_id,
+                'client_secret': creds.client_secret,
+                'scopes': creds.scopes
+            }
+        atomic_write_json(token_path, creds_dict)
 
     def initialize_authentication(self) -> bool:
         """Initialize authentication by selecting or authenticating a user"""
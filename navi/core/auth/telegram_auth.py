@@ -10,6 +10,9 @@ import string
 from datetime import datetime, timedelta
 from typing import Optional, Tuple, Dict, Any
 
+from ...utils.atomic_write import atomic_write_json
+from ...utils.file_lock import lock_for
+
 
 class TelegramSimpleAuth:
     """Simple authentication system using codes generated in web UI"""
@@ -19,6 +22,11 @@ class TelegramSimpleAuth:
         self.project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
         self.auth_codes_file = os.path.join(self.project_root, 'telegram_auth_codes.json')
         self.telegram_mappings_file = os.path.join(self.project_root, 'telegram_mappings.json')
+        # Both files are shared with the other process (web UI / bot); every
+        # read-modify-write reloads them under an exclusive lock
+        self.codes_lock = lock_for(self.auth_codes_file)
+        self.mappings_lock = lock_for(self.telegram_mappings_file)
+        self._mappings_mtime = None
         self.codes_data = self._load_codes_data()
         self.telegram_mappings = self._load_telegram_mappings()
     
@@ -26,7 +34,7 @@ class TelegramSimpleAuth:
         """Load authentication codes from file"""
         if os.path.exists(self.auth_codes_file):
             try:
-                with open(self.auth_codes_file, 'r') as f:
+                with self.codes_lock.read(), open(self.auth_codes_file, 'r') as f:
                     return json.load(f)
             except Exception:
                 pass
@@ -35,8 +43,7 @@ class TelegramSimpleAuth:
     def _save_codes_data(self):
         """Save authentication codes to file"""
         try:
-            with open(self.auth_codes_file, 'w') as f:
-                json.dump(self.codes_data, f, indent=2)
+            atomic_write_json(self.auth_codes_file, self.codes_data, indent=2)
         except Exception as e:
             print(f"Error saving codes data: {e}")
     
@@ -44,22 +51,37 @@ class TelegramSimpleAuth:
         """Load Telegram user mappings from file"""
         if os.path.exists(self.telegram_mappings_file):
             try:
-                with open(self.telegram_mappings_file, 'r') as f:
+                with self.mappings_lock.read(), open(self.telegram_mappings_file, 'r') as f:
+                    self._mappings_mtime = os.fstat(f.fileno()).st_mtime_ns
                     return json.load(f)
             except Exception:
                 pass
         return {}
     
+    def _refresh_telegram_mappings(self):
+        """Reload mappings if the other process has changed the file since we read it"""
+        try:
+            mtime = os.stat(self.telegram_mappings_file).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mappings_mtime:
+            self.telegram_mappings = self._load_telegram_mappings()
+    
     def _save_telegram_mappings(self):
         """Save Telegram user mappings to file"""
         try:
-            with open(self.telegram_mappings_file, 'w') as f:
-                json.dump(self.telegram_mappings, f, indent=2)
+            atomic_write_json(self.telegram_mappings_file, self.telegram_mappings, indent=2)
+            self._mappings_mtime = os.stat(self.telegram_mappings_file).st_mtime_ns
         except Exception as e:
             print(f"Error saving telegram mappings: {e}")
     
     def generate_auth_code(self, user_email: str) -> str:
         """Generate a new authentication code for a user"""
+        with self.codes_lock.write():
+            self.codes_data = self._load_codes_data()
+            return self._generate_auth_code(user_email)
+    
+    def _generate_auth_code(self, user_email: str) -> str:
         # Generate 6-digit code
         code = ''.join(secrets.choice(string.digits) for _ in range(6))
         
@@ -98,6 +120,11 @@ class TelegramSimpleAuth:
         Verify authentication code from Telegram user
         Returns (success, email, message)
         """
+        # Held until the code is marked used, so a code can't be redeemed twice
+        with self.codes_lock.write():
+            return self._verify_auth_code(telegram_user_id, code)
+    
+    def _verify_auth_code(self, telegram_user_id: int, code: str) -> Tuple[bool, Optional[str], str]:
         import logging
         
         # Setup auth logging
@@ -155,12 +182,14 @@ class TelegramSimpleAuth:
         user_email = code_data.get('email') or code_data.get('user_email')  # Handle both field names
         
         # Store Telegram mapping
-        self.telegram_mappings[str(telegram_user_id)] = {
-            'email': user_email,
-            'authenticated_at': datetime.now().isoformat(),
-            'auth_method': 'simple_code'
-        }
-        self._save_telegram_mappings()
+        with self.mappings_lock.write():
+            self.telegram_mappings = self._load_telegram_mappings()
+            self.telegram_mappings[str(telegram_user_id)] = {
+                'email': user_email,
+                'authenticated_at': datetime.now().isoformat(),
+                'auth_method': 'simple_code'
+            }
+            self._save_telegram_mappings()
         
         auth_logger.info(f"TELEGRAM_BOT: Successfully authenticated user {telegram_user_id} with email {user_email}")
         
@@ -168,19 +197,16 @@ class TelegramSimpleAuth:
     
     def is_telegram_user_authenticated(self, telegram_user_id: int) -> bool:
         """Check if Telegram user is authenticated"""
+        self._refresh_telegram_mappings()
         return str(telegram_user_id) in self.telegram_mappings
     
     def clear_user_mapping(self, telegram_user_id: int) -> bool:
         """Clear Telegram user mapping"""
-        user_id_str = str(telegram_user_id)
-        if user_id_str in self.telegram_mappings:
-            del self.telegram_mappings[user_id_str]
-            self._save_telegram_mappings()
-            return True
-        return False
+        return self.remove_telegram_user_auth(telegram_user_id)
     
     def get_user_email_from_telegram(self, telegram_user_id: int) -> Optional[str]:
         """Get user email from Telegram user ID"""
+        self._refresh_telegram_mappings()
         mapping = self.telegram_mappings.get(str(telegram_user_id))
         return mapping.get('email') if mapping else None
     
@@ -188,10 +214,12 @@ class TelegramSimpleAuth:
         """Remove Telegram user authentication mapping"""
         try:
             user_id_str = str(telegram_user_id)
-            if user_id_str in self.telegram_mappings:
-                del self.telegram_mappings[user_id_str]
-                self._save_telegram_mappings()
-                return True
+            with self.mappings_lock.write():
+                self.telegram_mappings = self._load_telegram_mappings()
+                if user_id_str in self.telegram_mappings:
+                    del self.telegram_mappings[user_id_str]
+                    self._save_telegram_mappings()
+                    return True
             return False
         except Exception as e:
             print(f"Error removing Telegram auth for user {telegram_user_id}: {e}")
@@ -202,16 +230,18 @@ class TelegramSimpleAuth:
         now = datetime.now()
         expired_codes = []
         
-        for code, data in self.codes_data.items():
-            expires_at = datetime.fromisoformat(data.get('expires_at', ''))
-            if now > expires_at:
-                expired_codes.append(code)
-        
-        for code in expired_codes:
-            del self.codes_data[code]
-        
-        if expired_codes:
-            self._save_codes_data()
+        with self.codes_lock.write():
+            self.codes_data = self._load_codes_data()
+            for code, data in self.codes_data.items():
+                expires_at = datetime.fromisoformat(data.get('expires_at', ''))
+                if now > expires_at:
+                    expired_codes.append(code)
+            
+            for code in expired_codes:
+                del self.codes_data[code]
+            
+            if expired_codes:
+                self._save_codes_data()
     
     def list_existing_users(self) -> list:
         """List existing NAVI users (those with user directories)"""
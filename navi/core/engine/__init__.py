@@ -3,6 +3,10 @@ Conversation Engine Module
 Core AI conversation and tool execution logic
 """
 
-from .conversation import NaviConversationEngine, NaviResponse, NaviToolManager
+from .conversation import NaviConversationEngine, NaviResponse, NaviStreamEvent, NaviToolManager
+from .pool import EnginePool, engine_pool, get_engine
+from .dispatcher import TurnDispatcher, turn_dispatcher
+from .providers import LLMProvider, GeminiProvider, get_provider, set_provider
 
-__all__ = ['NaviConversationEngine', 'NaviResponse', 'NaviToolManager']
\ No newline at end of file
+__all__ = ['NaviConversationEngine', 'NaviResponse', 'NaviStreamEvent', 'NaviToolManager', 'EnginePool', 'engine_pool', 'get_engine',
+           'TurnDispatcher', 'turn_dispatcher', 'LLMProvider', 'GeminiProvider', 'get_provider', 'set_provider']
\ No newline at end of file
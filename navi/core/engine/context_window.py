@@ -0,0 +1,218 @@
+"""
+Context Window Management
+Fits the chat history sent with each call into a token budget, folding older turns into a rolling digest
+"""
+
+import os
+import re
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TOKENS = 24000
+DEFAULT_RECENT_MESSAGES = 20
+DEFAULT_DIGEST_TOKENS = 1500
+
+# Rough characters per token for Gemini models on English text
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+DIGEST_LINE_CHARS = 200
+
+DIGEST_OPEN = '<conversation_digest>'
+DIGEST_CLOSE = '</conversation_digest>'
+DIGEST_ACK = 'Understood, I have the earlier conversation in mind.'
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+def estimate_tokens(message: Dict[str, Any]) -> int:
+    """
+    Approximate token count of a stored message.
+
+    The count is cached on the message under 'token_count' so it is only
+    computed once per message and survives save and reload.
+    """
+    cached = message.get('token_count')
+    if isinstance(cached, int):
+        return cached
+
+    chars = 0
+    for part in message.get('parts', []):
+        if not isinstance(part, dict):
+            chars += len(str(part))
+            continue
+        chars += len(part.get('text') or '')
+        call = part.get('function_call')
+        if call:
+            chars += len(call.get('name', '')) + len(json.dumps(call.get('args', {}), default=str))
+    tokens = MESSAGE_OVERHEAD_TOKENS + -(-chars // CHARS_PER_TOKEN)
+    message['token_count'] = tokens
+    return tokens
+
+
+def _text_of(message: Dict[str, Any]) -> str:
+    return ' '.join(part.get('text', '') for part in message.get('parts', [])
+                    if isinstance(part, dict) and part.get('text'))
+
+
+def is_digest_message(message: Dict[str, Any]) -> bool:
+    """Whether a message is the digest (or its acknowledgement) added in front of the history"""
+    text = _text_of(message)
+    return text.startswith(DIGEST_OPEN) or (message.get('role') == 'model' and text == DIGEST_ACK)
+
+
+def strip_digest(history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The history without the leading digest messages"""
+    start = 0
+    while start < len(history) and start < 2 and is_digest_message(history[start]):
+        start += 1
+    return history[start:]
+
+
+def _is_turn_start(message: Dict[str, Any]) -> bool:
+    # A user text message; function responses also have the user role
+    return message.get('role') == 'user' and bool(_text_of(message))
+
+
+def _digest_line(message: Dict[str, Any]) -> Optional[str]:
+    """One extractive line summarizing a message, or None if it carries nothing worth keeping"""
+    role = message.get('role')
+    text = _text_of(message)
+    calls = [part['function_call'].get('name', '') for part in message.get('parts', [])
+             if isinstance(part, dict) and part.get('function_call')]
+
+    if role == 'model':
+        # Keep what the user was told, not the model's private reasoning
+        shown = re.findall(r'<message>(.*?)</message>', text, re.DOTALL)
+        text = ' '.join(shown) if shown else re.sub(r'<(strategize|analyze)>.*?</\1>', '', text, flags=re.DOTALL)
+        speaker = 'Navi'
+    elif role == 'system':
+        speaker = 'System'
+    else:
+        speaker = 'User'
+    text = ' '.join(re.sub(r'<[^>]+>', ' ', text).split())
+
+    if len(text) > DIGEST_LINE_CHARS:
+        text = text[:DIGEST_LINE_CHARS - 3].rstrip() + '...'
+    if calls:
+        text = f"{text} [used {', '.join(calls)}]".strip()
+    return f"{speaker}: {text}" if text else None
+
+
+def digest_messages(digest: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The digest as a user/model message pair to put in front of the history, if there is one"""
+    lines = digest.get('lines') if isinstance(digest, dict) else None
+    if not lines:
+        return []
+    body = '\n'.join(lines)
+    return [
+        {'role': 'user', 'parts': [{'text': f"{DIGEST_OPEN}\nEarlier in this conversation "
+                                              f"({digest.get('messages', len(lines))} messages, oldest first):\n"
+                                              f"{body}\n{DIGEST_CLOSE}"}]},
+        {'role': 'model', 'parts': [{'text': DIGEST_ACK}]},
+    ]
+
+
+class ContextWindowManager:
+    """
+    Decides which stored messages are sent with each call.
+
+    The history and digest together stay under `max_tokens` per call
+    (NAVI_CONTEXT_MAX_TOKENS), of which `digest_tokens` are set aside for the
+    digest. The last `recent_messages` messages are kept unless they alone are
+    over budget, in which case whole turns go from the front down to the last
+    one; older messages are kept while they fit. The rest are dropped from the
+    history and folded into a digest stored in state['context_digest'], one
+    extractive line per message, so it only grows by what was just dropped; its
+    oldest lines go once it passes `digest_tokens`. The window always starts at
+    a user message so function calls stay paired with their responses.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, recent_messages: Optional[int] = None,
+                 digest_tokens: Optional[int] = None):
+        self.max_tokens = _env_int('NAVI_CONTEXT_MAX_TOKENS', DEFAULT_MAX_TOKENS) if max_tokens is None else max_tokens
+        self.recent_messages = (_env_int('NAVI_CONTEXT_RECENT_MESSAGES', DEFAULT_RECENT_MESSAGES)
+                                if recent_messages is None else recent_messages)
+        self.digest_tokens = (_env_int('NAVI_CONTEXT_DIGEST_TOKENS', DEFAULT_DIGEST_TOKENS)
+                              if digest_tokens is None else digest_tokens)
+
+    def fit(self, history: List[Dict[str, Any]], state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        The messages of `history` to keep, folding the others into the state's digest.
+
+        `history` must not contain the digest messages themselves (see strip_digest).
+        """
+        start = self._window_start(history)
+        if start == 0:
+            return history
+
+        self._fold(history[:start], state)
+        logger.info(f"Context management: folded {start} of {len(history)} messages into the digest")
+        return history[start:]
+
+    def _window_start(self, history: List[Dict[str, Any]]) -> int:
+        counts = [estimate_tokens(message) for message in history]
+        # A fixed allowance for the digest keeps fitting stable: the kept history fits again as is
+        budget = self.max_tokens - self.digest_tokens
+
+        # The recent window, moved forward to a turn boundary (or back, if the
+        # last turn alone is longer than the window)
+        start = self._next_turn_start(history, max(0, len(history) - self.recent_messages))
+        while 0 < start and (start == len(history) or not _is_turn_start(history[start])):
+            start -= 1
+
+        # Over budget even so: give up whole turns from the front, keeping the last one
+        total = sum(counts[start:])
+        while total > budget:
+            following = self._next_turn_start(history, start + 1)
+            if following >= len(history):
+                break
+            total -= sum(counts[start:following])
+            start = following
+
+        # Room to spare: take older messages back while they fit
+        candidate = start
+        while candidate > 0 and total + counts[candidate - 1] <= budget:
+            candidate -= 1
+            total += counts[candidate]
+            if _is_turn_start(history[candidate]):
+                start = candidate
+        return start
+
+    @staticmethod
+    def _next_turn_start(history: List[Dict[str, Any]], index: int) -> int:
+        """The first turn start at or after index, or len(history) if there is none"""
+        if index == 0:
+            return 0
+        while index < len(history) and not _is_turn_start(history[index]):
+            index += 1
+        return index
+
+    def _fold(self, dropped: List[Dict[str, Any]], state: Dict[str, Any]):
+        digest = state.get('context_digest')
+        if not isinstance(digest, dict):
+            digest = {'lines': [], 'messages': 0}
+        lines = list(digest.get('lines', []))
+        lines.extend(line for line in (_digest_line(message) for message in dropped) if line)
+
+        # Rolling: the oldest lines make way once the digest is over its budget
+        while lines and self._lines_tokens(lines) > self.digest_tokens:
+            lines.pop(0)
+
+        state['context_digest'] = {
+            'lines': lines,
+            'messages': digest.get('messages', 0) + len(dropped),
+            'updated_at': datetime.now(timezone.utc).isoformat(),
+        }
+
+    @staticmethod
+    def _lines_tokens(lines: List[str]) -> int:
+        return sum(-(-len(line) // CHARS_PER_TOKEN) + 1 for line in lines)
@@ -7,20 +7,30 @@ import os
 import re
 import json
 import time
+import asyncio
 import logging
+import hashlib
 import functools
-import inspect
 from datetime import datetime, timezone
-from typing import Optional, Dict, List, Any, Union
+from typing import Optional, Dict, List, Any, AsyncIterator, Union
 from dataclasses import dataclass
 
-import google.generativeai as genai
-from google.generativeai.types import FunctionDeclaration, Tool, generation_types
+from google.generativeai.types import FunctionDeclaration, generation_types
 
 # Local imports - updated for new package structure
 from ..state.manager import StateManager
-from ..tools import tool_functions
-from ...config.prompts import system_prompt
+from ..tools import tool_functions, tool_registry
+from ..tools.registry import ToolArgumentError
+from .context_window import ContextWindowManager, digest_messages, strip_digest
+from .dispatcher import PrioritySemaphore
+from .llm_executor import LLMTimeout, iterate_llm_stream, run_llm_call
+from .model_cache import get_tool_declarations
+from .providers import get_model
+from .streaming import StreamingTagParser
+from .tool_cache import ToolResultCache, is_cacheable
+from .tool_scheduler import ToolCallResult, run_tool_calls
+from .turn_budget import TurnBudget
+from .usage import extract_usage, record_usage
 
 
 logger = logging.getLogger(__name__)
@@ -34,12 +44,20 @@ class NaviResponse:
     analyze_text: Optional[str] = None
     tool_executions: List[Dict[str, Any]] = None
     error: Optional[str] = None
+    budget_exhausted: Optional[str] = None
     
     def __post_init__(self):
         if self.tool_executions is None:
             self.tool_executions = []
 
 
+@dataclass
+class NaviStreamEvent:
+    """One event of a streamed turn: a piece of the user-facing message, or the finished response"""
+    text: str = ''
+    response: Optional[NaviResponse] = None
+
+
 class NaviToolManager:
     """Manages tool declarations, binding, and execution"""
     
@@ -47,6 +65,11 @@ class NaviToolManager:
         self.state_manager = state_manager
         self.executable_tools = self._create_executable_tools()
         self.tool_declarations = self._create_tool_declarations()
+        self.result_cache = ToolResultCache()
+    
+    def start_turn(self):
+        """Forget the previous turn's cached tool results"""
+        self.result_cache.clear()
     
     def _create_executable_tools(self) -> Dict[str, callable]:
         """Create executable tools with state manager bound"""
@@ -56,33 +79,8 @@ class NaviToolManager:
         }
     
     def _create_tool_declarations(self) -> List[FunctionDeclaration]:
-        """Create Gemini tool declarations from functions"""
-        declarations = []
-        type_mapping = {str: 'STRING', int: 'INTEGER', bool: 'BOOLEAN', float: 'NUMBER'}
-        
-        for func in tool_functions.values():
-            signature = inspect.signature(func)
-            properties, required = {}, []
-            
-            for name, param in signature.parameters.items():
-                if name == 'state_manager':
-                    continue
-                model_type = type_mapping.get(param.annotation, 'STRING')
-                properties[name] = {'type': model_type, 'description': ''}
-                if param.default is inspect.Parameter.empty:
-                    required.append(name)
-            
-            declarations.append(FunctionDeclaration(
-                name=func.__name__,
-                description=func.__doc__,
-                parameters={
-                    'type': 'OBJECT',
-                    'properties': properties,
-                    'required': required
-                }
-            ))
-        
-        return declarations
+        """Tool declarations, shared by every engine in the process"""
+        return get_tool_declarations()
     
     async def execute_tools(self, response) -> List[Dict[str, Any]]:
         """Execute all function calls in a response and return results"""
@@ -99,17 +97,63 @@ class NaviToolManager:
         
         logger.info(f"Executing {len(function_calls)} tool(s)")
         
-        # Execute all function calls and prepare results for AI
+        # Check the arguments against the tools' schemas, converting them to the
+        # declared types; malformed calls fail here instead of inside the tool
+        calls, invalid = [], {}
+        for index, fc in enumerate(function_calls):
+            name, args = fc.name, dict(fc.args) if fc.args else {}
+            if name in self.executable_tools and name in tool_registry:
+                clean_args, problems = tool_registry.validate(name, args)
+                if problems:
+                    invalid[index] = ToolArgumentError(f"Invalid arguments for {name}: {'; '.join(problems)}")
+                else:
+                    args = clean_args
+            calls.append((name, args))
+        
+        # Read-only calls already answered this turn are served from the cache,
+        # unless a call before them in this response changes what they read
+        cached = {}
+        for index, (name, args) in enumerate(calls):
+            if name not in self.executable_tools or index in invalid:
+                continue
+            if is_cacheable(name, args):
+                hit, result = self.result_cache.lookup(name, args)
+                if hit:
+                    cached[index] = result
+            else:
+                self.result_cache.invalidate(name, args)
+        
+        # Run the other known tools (concurrently where independent, see run_tool_calls)
+        to_run = [index for index, (name, _) in enumerate(calls)
+                  if name in self.executable_tools and index not in cached and index not in invalid]
+        outcomes = {}
+        if to_run:
+            outcomes = dict(zip(to_run, await run_tool_calls(
+                [calls[index] for index in to_run],
+                [functools.partial(self.executable_tools[calls[index][0]], **calls[index][1]) for index in to_run]
+            )))
+        
+        # Prepare results for AI in call order
         gemini_tool_results = []
         execution_log = []
         
-        for func_call in function_calls:
-            tool_name = func_call.name
-            tool_args = dict(func_call.args) if func_call.args else {}
-            
+        for index, (tool_name, tool_args) in enumerate(calls):
             if tool_name in self.executable_tools:
-                try:
-                    result = self.executable_tools[tool_name](**tool_args)
+                from_cache = index in cached
+                if index in invalid:
+                    outcome = ToolCallResult(error=invalid[index])
+                elif from_cache:
+                    outcome = ToolCallResult(result=cached[index])
+                else:
+                    outcome = outcomes[index]
+                    # Replayed in call order so the cache ends up as if the calls ran one by one
+                    if not is_cacheable(tool_name, tool_args):
+                        self.result_cache.invalidate(tool_name, tool_args)
+                    elif outcome.error is None:
+                        self.result_cache.store(tool_name, tool_args, outcome.result)
+                
+                if outcome.error is None:
+                    result = outcome.result
                     execution_log.append(f"**running tool `{tool_name}`...**")
                     
                     # Prepare result for AI (Gemini format)
@@ -121,10 +165,14 @@ class NaviToolManager:
                     })
                     
                     # Log the execution
-                    self._log_tool_execution(tool_name, tool_args, result)
-                    logger.info(f"Tool {tool_name} executed successfully")
+                    self._log_tool_execution(tool_name, tool_args, result, outcome.duration_ms, cached=from_cache)
+                    if from_cache:
+                        logger.info(f"Tool {tool_name} served from this turn's cache")
+                    else:
+                        logger.info(f"Tool {tool_name} executed successfully in {outcome.duration_ms:.0f}ms")
                     
-                except Exception as e:
+                else:
+                    e = outcome.error
                     execution_log.append(f"❌ {tool_name} (failed)")
                     gemini_tool_results.append({
                         "function_response": {
@@ -132,7 +180,7 @@ class NaviToolManager:
                             "response": {"result": f"ERROR: {str(e)}"}
                         }
                     })
-                    self._log_tool_execution(tool_name, tool_args, f"ERROR: {str(e)}")
+                    self._log_tool_execution(tool_name, tool_args, f"ERROR: {str(e)}", outcome.duration_ms)
                     logger.error(f"Tool {tool_name} failed: {e}")
             else:
                 execution_log.append(f"❓ {tool_name} (not found)")
@@ -146,8 +194,9 @@ class NaviToolManager:
         
         return gemini_tool_results
     
-    def _log_tool_execution(self, tool_name: str, args: Dict[str, Any], result: str):
-        """Log tool execution to state manager"""
+    def _log_tool_execution(self, tool_name: str, args: Dict[str, Any], result: str, duration_ms: float = 0,
+                            cached: bool = False):
+        """Log tool execution to state manager, with the turn's cache hit rate so far"""
         try:
             if 'tool_execution_log' not in self.state_manager.state:
                 self.state_manager.state['tool_execution_log'] = []
@@ -157,6 +206,9 @@ class NaviToolManager:
                 'tool_name': tool_name,
                 'args': args,
                 'result': result,
+                'duration_ms': round(duration_ms, 1),
+                'cached': cached,
+                'cache_hit_rate': self.result_cache.hit_rate,
                 'timestamp': datetime.now(timezone.utc).isoformat()
             })
             
@@ -223,11 +275,20 @@ class NaviResponseProcessor:
         return match.group(1).strip() if match else None
 
 
+GOALS_UNCHANGED = "(unchanged since the last goals listed above)"
+
+
 class NaviContextManager:
     """Manages conversation context and chat history"""
     
     def __init__(self, state_manager: StateManager):
         self.state_manager = state_manager
+        # Hash of the goals summary last sent in the current chat, if it is still in there
+        self.sent_goals_hash: Optional[str] = None
+    
+    def forget_sent_goals(self):
+        """The chat was replaced, so the next turn must list the goals again"""
+        self.sent_goals_hash = None
     
     def build_context(self, user_message: str, extra_context: Dict[str, Any] = None) -> str:
         """Build rich conversation context like CLI version"""
@@ -245,6 +306,13 @@ class NaviContextManager:
             from ..tools.goals import list_goals
             goals_summary = list_goals(self.state_manager)
             
+            # Only resend the goals when they changed since the chat last saw them
+            goals_hash = hashlib.sha1(str(goals_summary).encode('utf-8')).hexdigest()
+            if goals_hash == self.sent_goals_hash:
+                goals_summary = GOALS_UNCHANGED
+            else:
+                self.sent_goals_hash = goals_hash
+            
             # Generate simple next stage suggestion
             next_stage_suggestion = self._generate_stage_suggestion(
                 user_message, current_stage
@@ -296,60 +364,107 @@ class NaviConversationEngine:
         self.tool_manager = NaviToolManager(state_manager)
         self.context_manager = NaviContextManager(state_manager)
         self.response_processor = NaviResponseProcessor()
+        self.context_window = ContextWindowManager()
+        self.history_version = None
+        self.uses_shared_model = False
+        # Which flow the current turn belongs to, for usage accounting
+        self.flow = 'chat'
+        # Held for a whole turn (message, tools and save), via the turn dispatcher
+        self.turn_lock = PrioritySemaphore(1)
+        # State-format record of each chat.history entry converted so far (None for
+        # entries with nothing to keep), so saves only convert the new ones
+        self._history_records: List[Optional[Dict[str, Any]]] = []
         self.model, self.chat = self._initialize_ai()
     
     def _initialize_ai(self):
-        """Initialize AI model and chat with tools"""
-        # Create tools
-        my_tools = [Tool(function_declarations=self.tool_manager.tool_declarations)]
+        """Start a chat on the shared model with this user's saved history"""
+        model = get_model()
+        history = self._load_history()
+        chat = model.start_chat(history=history)
+        self.history_version = self.state_manager.version
+        self.uses_shared_model = True
         
-        # Initialize model
-        model = genai.GenerativeModel(
-            model_name='gemini-2.5-flash',
-            system_instruction=system_prompt,
-            tools=my_tools
-        )
-        
-        # Load saved history
-        saved_history = self.state_manager.get_state().get('chat_history', [])
+        logger.info(f"AI initialized with {len(history)} messages in history")
+        return model, chat
+    
+    def _load_history(self) -> List[Dict[str, Any]]:
+        """Saved chat history, context-managed and in API format"""
+        state = self.state_manager.get_state()
+        saved_history = state.get('chat_history', [])
         
         # Apply built-in context management
         try:
             managed_history = self._manage_chat_context_builtin(saved_history)
+            if len(managed_history) != len(saved_history):
+                # Keep the saved history in step with the digest so nothing is folded twice
+                state['chat_history'] = managed_history
         except Exception as e:
             logger.warning(f"Context management failed: {e}")
             managed_history = saved_history
         
-        # Convert to API format
-        api_compatible_history = [
-            {'role': msg['role'], 'parts': msg['parts']}
-            for msg in managed_history
+        return self._chat_history_for(managed_history)
+    
+    def _chat_history_for(self, managed_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The API-format history to start a chat with: the digest of what was folded away, then the saved messages"""
+        records = [
+            msg for msg in digest_messages(self.state_manager.get_state().get('context_digest')) + managed_history
             if 'role' in msg and 'parts' in msg
         ]
-        
-        # Start chat with history
-        chat = model.start_chat(history=api_compatible_history)
-        
-        logger.info(f"AI initialized with {len(api_compatible_history)} messages in history")
-        return model, chat
+        # The chat about to be started holds exactly these, already in state format
+        self._history_records = records
+        return [{'role': msg['role'], 'parts': msg['parts']} for msg in records]
+    
+    def reload_history(self):
+        """Restart the chat from the saved history, e.g. after another process saved it"""
+        history = self._load_history()
+        self._restart_chat(history)
+        self.history_version = self.state_manager.version
+        logger.info(f"Reloaded {len(history)} messages of chat history")
+    
+    @property
+    def history_is_stale(self) -> bool:
+        """Whether the state was saved by someone else since this chat last synced with it"""
+        return self.history_version != self.state_manager.version
+    
+    def sync_history(self):
+        """Reload the chat if it went stale; only at the start of a turn, with the turn lock held"""
+        if not self.history_is_stale:
+            return
+        try:
+            self.reload_history()
+        except Exception as e:
+            logger.error(f"Error reloading chat history for {self.state_manager.user_email}: {e}")
     
     def _log_gemini_api_call(self, call_type: str, input_data: Any, response_data: Any, 
-                            response_time_ms: int = 0, tokens_in: int = 0, tokens_out: int = 0):
-        """Log Gemini API call to state manager"""
+                            response_time_ms: int = 0, tokens_in: int = 0, tokens_out: int = 0,
+                            usage: Optional[Dict[str, int]] = None):
+        """Log Gemini API call to state manager, counting its reported usage towards the user's totals"""
         try:
             if 'gemini_api_log' not in self.state_manager.state:
                 self.state_manager.state['gemini_api_log'] = []
             
-            # Add the API call to the log
-            self.state_manager.state['gemini_api_log'].append({
+            entry = {
                 'call_type': call_type,
+                'flow': self.flow,
                 'input_preview': str(input_data)[:200] + "..." if len(str(input_data)) > 200 else str(input_data),
                 'response_preview': str(response_data)[:200] + "..." if len(str(response_data)) > 200 else str(response_data),
                 'response_time_ms': response_time_ms,
                 'tokens_in': tokens_in,
                 'tokens_out': tokens_out,
                 'timestamp': datetime.now(timezone.utc).isoformat()
-            })
+            }
+            if usage:
+                entry['tokens_in'] = usage['prompt_tokens']
+                entry['tokens_out'] = usage['candidates_tokens']
+                entry['cached_tokens'] = usage['cached_tokens']
+                entry['total_tokens'] = usage['total_tokens']
+                record_usage(self.state_manager.state, self.flow, usage, response_time_ms)
+            else:
+                # No usage metadata: the word counts are only an estimate
+                entry['estimated'] = True
+            
+            # Add the API call to the log
+            self.state_manager.state['gemini_api_log'].append(entry)
             
             # Keep only the last 100 API calls
             if len(self.state_manager.state['gemini_api_log']) > 100:
@@ -381,146 +496,304 @@ class NaviConversationEngine:
         except Exception:
             return 0
     
-    async def process_message(self, user_message: str, context: Dict[str, Any] = None) -> NaviResponse:
-        """Process user message and return structured response"""
+    async def _send_message(self, content, call_type: str):
+        """Send to the chat on the LLM thread pool (see run_llm_call) and log the call"""
+        await self._follow_shared_model()
+        start_time = time.time()
+        response = await run_llm_call(self.chat.send_message, content)
+        self._log_response(call_type, content, response, start_time)
+        return response
+    
+    async def _stream_message(self, content, call_type: str, parser: StreamingTagParser) -> AsyncIterator[Any]:
+        """
+        Send to the chat with streaming, yielding the newly visible text of each chunk.
+        
+        The complete response is yielded last (as a non-str item) and the call logged.
+        """
+        await self._follow_shared_model()
+        start_time = time.time()
+        response = await run_llm_call(self.chat.send_message, content, stream=True)
+        async for chunk in iterate_llm_stream(response):
+            visible = parser.feed(self._safe_extract_response_text(chunk))
+            if visible:
+                yield visible
+        self._log_response(call_type, content, response, start_time)
+        yield response
+    
+    def _log_response(self, call_type: str, content, response, start_time: float):
+        self._log_gemini_api_call(
+            call_type=call_type,
+            input_data=content,
+            response_data=self._safe_extract_response_text(response),
+            response_time_ms=int((time.time() - start_time) * 1000),
+            tokens_in=len(str(content).split()),  # Rough estimate
+            tokens_out=self._safe_count_response_tokens(response),
+            usage=extract_usage(response)
+        )
+    
+    async def _follow_shared_model(self):
+        """Move the chat to the shared model if it was rebuilt, e.g. because its prompt cache was recreated"""
+        if not self.uses_shared_model:
+            return
+        # May have to extend or recreate the prompt cache, which is a blocking API call
+        model = await run_llm_call(get_model)
+        if model is not self.model:
+            logger.info("Shared model changed, moving chat over")
+            self.model = model
+            self._restart_chat(list(self.chat.history))
+    
+    def _restart_chat(self, history):
+        """Replace the chat session, e.g. after a call was abandoned mid-turn"""
+        # The abandoned call may still finish and append to the old session
+        self.chat = self.model.start_chat(history=history)
+        # The new history starts with (a prefix of) the old one
+        del self._history_records[len(history):]
+        # The history may no longer hold the goals last sent (e.g. after a rollback)
+        self.context_manager.forget_sent_goals()
+    
+    async def process_message(self, user_message: str, context: Dict[str, Any] = None,
+                              flow: str = 'chat') -> NaviResponse:
+        """Process user message and return structured response; `flow` labels its API usage"""
+        self.flow = flow
+        self.tool_manager.start_turn()
+        # A turn that times out or is cancelled is rolled back to here
+        turn_start_history = list(getattr(self.chat, 'history', None) or [])
         try:
             # Build rich context
             context_message = self.context_manager.build_context(user_message, context)
             
-            # Send to AI with timing and logging
-            start_time = time.time()
-            response = self.chat.send_message(context_message)
-            response_time_ms = int((time.time() - start_time) * 1000)
-            
-            # Log the initial Gemini API call
-            self._log_gemini_api_call(
-                call_type="chat.send_message",
-                input_data=context_message,
-                response_data=self._safe_extract_response_text(response),
-                response_time_ms=response_time_ms,
-                tokens_in=len(context_message.split()),  # Rough estimate
-                tokens_out=self._safe_count_response_tokens(response)
-            )
+            # Send to AI without blocking the event loop
+            budget = TurnBudget()
+            response = await self._send_message(context_message, "chat.send_message")
+            budget.add_response(response)
             
-            # Handle tool execution loop
+            # Handle tool execution loop, within the turn's budget
             while self._has_function_calls(response):
+                exhausted = budget.exhausted(self._count_function_calls(response))
+                if exhausted:
+                    return self._finish_over_budget(response, exhausted)
                 tool_results = await self.tool_manager.execute_tools(response)
                 if tool_results:
-                    # Log follow-up API call for tool results
-                    start_time = time.time()
-                    response = self.chat.send_message(tool_results)
-                    response_time_ms = int((time.time() - start_time) * 1000)
-                    
-                    self._log_gemini_api_call(
-                        call_type="chat.send_message (tool_results)",
-                        input_data=tool_results,
-                        response_data=self._safe_extract_response_text(response),
-                        response_time_ms=response_time_ms,
-                        tokens_in=len(str(tool_results).split()),  # Rough estimate
-                        tokens_out=self._safe_count_response_tokens(response)
-                    )
+                    budget.add_round(len(tool_results))
+                    response = await self._send_message(tool_results, "chat.send_message (tool_results)")
+                    budget.add_response(response)
                 else:
                     break
             
             # Process and return structured response
             return self.response_processor.process_response(response)
             
-        except generation_types.StopCandidateException as e:
+        except asyncio.CancelledError:
+            self._restart_chat(turn_start_history)
+            raise
+        except Exception as e:
+            return self._failed_turn_response(e, turn_start_history)
+    
+    async def stream_message(self, user_message: str, context: Dict[str, Any] = None,
+                             flow: str = 'chat') -> AsyncIterator[NaviStreamEvent]:
+        """
+        Process a user message like process_message, streaming the reply.
+        
+        Yields events carrying the user-facing <message> text as it is
+        generated (<strategize> is held back), across all tool rounds; the
+        last event carries the finished NaviResponse. Closing the stream
+        early rolls the turn back.
+        """
+        self.flow = flow
+        self.tool_manager.start_turn()
+        turn_start_history = list(getattr(self.chat, 'history', None) or [])
+        parser = StreamingTagParser()
+        try:
+            content = self.context_manager.build_context(user_message, context)
+            call_type = "chat.send_message (stream)"
+            budget = TurnBudget()
+            exhausted = None
+            shown = False
+            while True:
+                async for item in self._stream_message(content, call_type, parser):
+                    if isinstance(item, str):
+                        shown = True
+                        yield NaviStreamEvent(text=item)
+                    else:
+                        response = item
+                budget.add_response(response)
+                
+                if not self._has_function_calls(response):
+                    break
+                exhausted = budget.exhausted(self._count_function_calls(response))
+                if exhausted:
+                    break
+                content = await self.tool_manager.execute_tools(response)
+                if not content:
+                    break
+                budget.add_round(len(content))
+                call_type = "chat.send_message (stream, tool_results)"
+            
+            tail = parser.close()
+            if tail:
+                shown = True
+                yield NaviStreamEvent(text=tail)
+            if exhausted:
+                final = self._finish_over_budget(response, exhausted)
+                if not shown:
+                    yield NaviStreamEvent(text=final.message_text)
+            else:
+                final = self.response_processor.process_response(response)
+        except (asyncio.CancelledError, GeneratorExit):
+            self._restart_chat(turn_start_history)
+            raise
+        except Exception as e:
+            if not isinstance(e, LLMTimeout):
+                # A stream that broke off leaves the chat without a complete reply
+                self._restart_chat(turn_start_history)
+            final = self._failed_turn_response(e, turn_start_history)
+        yield NaviStreamEvent(response=final)
+    
+    def _failed_turn_response(self, e: Exception, turn_start_history) -> NaviResponse:
+        """The reply for a turn that failed, rolling the chat back where the failure left it inconsistent"""
+        # The context just built may never have reached the chat
+        self.context_manager.forget_sent_goals()
+        if isinstance(e, LLMTimeout):
+            logger.error(f"Gemini call timed out: {e}")
+            self._restart_chat(turn_start_history)
+            return NaviResponse(
+                message_text="Sorry, that took too long on my side. Could you send your message again?",
+                error="timeout"
+            )
+        if isinstance(e, generation_types.StopCandidateException):
             logger.error(f"AI generated malformed function call: {e}")
             return NaviResponse(
                 message_text="I got a bit confused trying to use my tools. Could you try saying that in a different way?",
                 error="StopCandidateException"
             )
+        logger.error(f"Failed to process message: {e}")
+        return NaviResponse(
+            message_text="Sorry, I encountered an error processing your message. Please try again!",
+            error=str(e)
+        )
+    
+    def _finish_over_budget(self, response, exhausted: str) -> NaviResponse:
+        """
+        End a turn whose budget ran out with tool calls still pending.
+        
+        The pending calls are answered as not run and the reply so far is
+        closed off in the chat, so the next turn starts from a consistent
+        history without another model call.
+        """
+        logger.warning(f"Turn budget exhausted ({exhausted}), finishing with the results so far")
+        self._note_budget_exhausted(exhausted)
+        
+        text = self._safe_extract_response_text(response)
+        if text.strip():
+            result = self.response_processor.process_response(response)
+        else:
+            result = NaviResponse(message_text="I had to stop partway through that one. "
+                                               "Let me know if you'd like me to carry on.")
+        result.budget_exhausted = exhausted
+        
+        pending = [part.function_call.name for part in response.candidates[0].content.parts
+                   if hasattr(part, 'function_call') and part.function_call]
+        self._restart_chat(list(self.chat.history) + [
+            {'role': 'user', 'parts': [
+                {'function_response': {'name': name, 'response': {'result': f"NOT RUN: turn budget exhausted ({exhausted})"}}}
+                for name in pending
+            ]},
+            {'role': 'model', 'parts': [{'text': f"<message>{result.message_text}</message>"}]},
+        ])
+        return result
+    
+    def _note_budget_exhausted(self, exhausted: str):
+        """Record on the turn's last API log entry which budget ran out"""
+        try:
+            api_log = self.state_manager.state.get('gemini_api_log')
+            if api_log:
+                api_log[-1]['budget_exhausted'] = exhausted
         except Exception as e:
-            logger.error(f"Failed to process message: {e}")
-            return NaviResponse(
-                message_text="Sorry, I encountered an error processing your message. Please try again!",
-                error=str(e)
-            )
+            logger.error(f"Failed to log exhausted turn budget: {e}")
     
-    def _has_function_calls(self, response) -> bool:
-        """Check if response contains function calls"""
+    def _count_function_calls(self, response) -> int:
+        """Number of function calls in a response"""
         if not (response.candidates and 
                 response.candidates[0].content and 
                 response.candidates[0].content.parts):
-            return False
+            return 0
         
-        for part in response.candidates[0].content.parts:
-            if hasattr(part, 'function_call') and part.function_call:
-                return True
-        return False
+        return sum(1 for part in response.candidates[0].content.parts
+                   if hasattr(part, 'function_call') and part.function_call)
+    
+    def _has_function_calls(self, response) -> bool:
+        """Check if response contains function calls"""
+        return self._count_function_calls(response) > 0
     
     def save_state(self):
         """Save current chat state"""
         try:
             # Apply built-in context management before saving
             try:
-                current_history = self._convert_chat_history()
+                current_history = strip_digest(self._convert_chat_history())
                 managed_history = self._manage_chat_context_builtin(current_history)
                 self.state_manager.state['chat_history'] = managed_history
+                if len(managed_history) != len(current_history):
+                    # Older messages went into the digest; send it instead of them from now on
+                    self._restart_chat(self._chat_history_for(managed_history))
             except Exception as e:
                 logger.warning(f"Context management failed during save: {e}")
                 # Fallback without context management
-                self.state_manager.state['chat_history'] = self._convert_chat_history()
+                self.state_manager.state['chat_history'] = strip_digest(self._convert_chat_history())
             
             self.state_manager.save_state()
+            self.history_version = self.state_manager.version
             logger.info("State saved successfully")
             
         except Exception as e:
             logger.error(f"Failed to save state: {e}")
     
     def _convert_chat_history(self) -> List[Dict[str, Any]]:
-        """Convert Gemini chat history to state manager format"""
-        state_history = []
-        
-        for msg in self.chat.history:
-            msg_dict = {
-                'role': msg.role,
-                'parts': []
-            }
-            
-            for part in msg.parts:
-                part_dict = {}
-                if hasattr(part, 'text') and part.text:
-                    part_dict['text'] = part.text
-                if hasattr(part, 'function_call') and part.function_call:
-                    part_dict['function_call'] = {
-                        'name': part.function_call.name,
-                        'args': dict(part.function_call.args)
-                    }
-                if part_dict:
-                    msg_dict['parts'].append(part_dict)
-            
-            # Add timestamp if missing
-            if not hasattr(msg, 'timestamp'):
-                msg_dict['timestamp'] = datetime.now(timezone.utc).isoformat()
-            
-            if msg_dict['parts']:
-                state_history.append(msg_dict)
+        """
+        Convert Gemini chat history to state manager format.
         
-        return state_history
+        Only messages added since the last call are converted (and stamped
+        with the time they were first saved); earlier ones reuse their
+        records, original timestamps included.
+        """
+        history = self.chat.history
+        if len(self._history_records) > len(history):
+            # The chat was replaced behind our back; start over
+            self._history_records = []
+        for msg in history[len(self._history_records):]:
+            self._history_records.append(self._convert_message(msg))
+        return [record for record in self._history_records if record]
     
-    def _manage_chat_context_builtin(self, chat_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Built-in context management - simple token limit handling"""
-        # Simple context management: keep last N messages if history is too long
-        MAX_MESSAGES = 100  # Reasonable limit for context
-        
-        if len(chat_history) <= MAX_MESSAGES:
-            return chat_history
-        
-        # Keep system messages and recent user/assistant exchanges
-        managed_history = []
-        recent_messages = chat_history[-MAX_MESSAGES:]
+    @staticmethod
+    def _convert_message(msg) -> Optional[Dict[str, Any]]:
+        """One Gemini chat message in state manager format, or None if it has no text or calls"""
+        if isinstance(msg, dict):
+            parts = [part for part in msg.get('parts', [])
+                     if isinstance(part, dict) and (part.get('text') or part.get('function_call'))]
+            if not parts:
+                return None
+            return {'timestamp': datetime.now(timezone.utc).isoformat(), **msg, 'parts': parts}
         
-        # Add any system messages from the full history
-        for msg in chat_history:
-            if msg.get('role') == 'system':
-                managed_history.append(msg)
+        msg_dict = {
+            'role': msg.role,
+            'parts': []
+        }
         
-        # Add recent messages (excluding any system messages already added)
-        for msg in recent_messages:
-            if msg.get('role') != 'system':
-                managed_history.append(msg)
+        for part in msg.parts:
+            part_dict = {}
+            if hasattr(part, 'text') and part.text:
+                part_dict['text'] = part.text
+            if hasattr(part, 'function_call') and part.function_call:
+                part_dict['function_call'] = {
+                    'name': part.function_call.name,
+                    'args': dict(part.function_call.args)
+                }
+            if part_dict:
+                msg_dict['parts'].append(part_dict)
         
-        logger.info(f"Context management: reduced {len(chat_history)} messages to {len(managed_history)}")
-        return managed_history
\ No newline at end of file
+        msg_dict['timestamp'] = datetime.now(timezone.utc).isoformat()
+        return msg_dict if msg_dict['parts'] else None
+    
+    def _manage_chat_context_builtin(self, chat_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Token-budgeted context management; older messages are folded into the state's digest"""
+        return self.context_window.fit(chat_history, self.state_manager.get_state())
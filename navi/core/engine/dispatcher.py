@@ -0,0 +1,183 @@
+"""
+Turn Dispatcher
+Runs engine turns one at a time per user, a bounded number at a time overall, interactive ones first
+"""
+
+import os
+import heapq
+import asyncio
+import logging
+import itertools
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Union
+
+from ..state.manager import StateManager
+
+logger = logging.getLogger(__name__)
+
+# Lower goes first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITIES = {'interactive': INTERACTIVE, 'background': BACKGROUND}
+
+DEFAULT_MAX_CONCURRENT_TURNS = 8
+
+
+class PrioritySemaphore:
+    """
+    An asyncio semaphore that hands a freed slot to the highest-priority waiter.
+
+    Waiters of equal priority are served in arrival order. With one slot it's
+    a lock, which is what each engine's turn_lock is; `async with` acquires at
+    interactive priority.
+    """
+
+    def __init__(self, value: int = 1):
+        self.capacity = max(1, value)
+        self.in_use = 0
+        self._waiters = []
+        self._order = itertools.count()
+
+    def locked(self) -> bool:
+        return self.in_use >= self.capacity
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int = INTERACTIVE) -> bool:
+        if self.in_use < self.capacity and not self.waiting:
+            self.in_use += 1
+            return True
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._order), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self.release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+        return True
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # The slot goes straight to the waiter, so in_use stays the same
+                future.set_result(True)
+                return
+        self.in_use = max(0, self.in_use - 1)
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def _priority(priority: Union[str, int]) -> int:
+    if isinstance(priority, int):
+        return priority
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown turn priority '{priority}', expected one of {', '.join(PRIORITIES)}")
+    return PRIORITIES[priority]
+
+
+async def _acquire(lock, priority: int):
+    if isinstance(lock, PrioritySemaphore):
+        await lock.acquire(priority)
+    else:
+        await lock.acquire()
+
+
+def _engine_for(user, pool=None):
+    """The engine itself, or a StateManager's engine from `pool` (default the global one)"""
+    if not isinstance(user, StateManager):
+        return user
+    if pool is None:
+        # Imported here: the pool imports the engine, which imports this module
+        from .pool import engine_pool as pool
+    return pool.get(user)
+
+
+async def _lock_engine(user, priority: int, pool=None):
+    """Acquire the turn lock of the user's engine, following the pool if it swapped engines meanwhile"""
+    engine = _engine_for(user, pool)
+    await _acquire(engine.turn_lock, priority)
+    while True:
+        try:
+            current = _engine_for(user, pool)
+        except BaseException:
+            engine.turn_lock.release()
+            raise
+        if current is engine:
+            return engine
+        engine.turn_lock.release()
+        engine = current
+        await _acquire(engine.turn_lock, priority)
+
+
+class TurnDispatcher:
+    """
+    Admits engine turns: one at a time per user (the engine's turn_lock) and at
+    most `max_concurrent` at a time overall (NAVI_MAX_CONCURRENT_TURNS), so the
+    Telegram bot and the schedulers stay within the API quota together. Web
+    chat turns run on their own event loops and don't go through it.
+
+    Interactive turns are admitted before waiting background ones (scheduler
+    check-ins and reflections), both for the user's lock and for a global
+    slot. A background turn already running is left to finish; cancelling it
+    could abandon tool calls that already changed the calendar or tasks.
+    """
+
+    def __init__(self, max_concurrent: int = None):
+        if max_concurrent is None:
+            try:
+                max_concurrent = int(os.environ.get('NAVI_MAX_CONCURRENT_TURNS', DEFAULT_MAX_CONCURRENT_TURNS))
+            except ValueError:
+                max_concurrent = DEFAULT_MAX_CONCURRENT_TURNS
+        self.slots = PrioritySemaphore(max_concurrent)
+
+    @property
+    def in_flight(self) -> int:
+        return self.slots.in_use
+
+    @property
+    def waiting(self) -> int:
+        return self.slots.waiting
+
+    @asynccontextmanager
+    async def turn(self, user, priority: Union[str, int] = 'interactive', pool=None) -> AsyncIterator:
+        """
+        Hold the user's engine and a global slot for the whole turn (message, tools and save).
+
+        `user` is an engine or a StateManager; for a StateManager the engine
+        is looked up in `pool` (default the global one) and the one locked is
+        yielded, so read the state the turn depends on inside the block.
+        """
+        level = _priority(priority)
+        # The user's lock first, so a turn queued behind the same user doesn't sit on a global slot
+        engine = await _lock_engine(user, level, pool)
+        try:
+            if self.slots.locked():
+                logger.info(f"All {self.slots.capacity} turn slots busy; "
+                            f"{'background' if level >= BACKGROUND else 'interactive'} turn waiting")
+            await self.slots.acquire(level)
+            try:
+                # Only now is nothing else using the chat, so a stale one can be swapped out
+                if hasattr(engine, 'sync_history'):
+                    engine.sync_history()
+                yield engine
+            finally:
+                self.slots.release()
+        finally:
+            engine.turn_lock.release()
+
+
+# Global dispatcher instance
+turn_dispatcher = TurnDispatcher()
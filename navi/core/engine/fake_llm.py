@@ -0,0 +1,286 @@
+"""
+Fake LLM Provider
+A deterministic local stand-in for Gemini that replays scripted responses with configurable latency
+"""
+
+import os
+import re
+import json
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .context_window import CHARS_PER_TOKEN
+from .providers import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLY = "<message>Got it.</message>"
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def _part_tokens(part) -> int:
+    if part.function_call:
+        return _estimate_tokens(_text_of({'name': part.function_call.name, 'args': part.function_call.args}))
+    if part.function_response:
+        return _estimate_tokens(_text_of(part.function_response))
+    return _estimate_tokens(part.text)
+
+
+@dataclass
+class FakeFunctionCall:
+    name: str
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class FakePart:
+    text: str = ''
+    function_call: Optional[FakeFunctionCall] = None
+    function_response: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class FakeContent:
+    role: str
+    parts: List[FakePart]
+
+
+@dataclass
+class FakeCandidate:
+    content: FakeContent
+
+
+@dataclass
+class FakeUsage:
+    prompt_token_count: int = 0
+    candidates_token_count: int = 0
+    cached_content_token_count: int = 0
+    total_token_count: int = 0
+
+
+class FakeResponse:
+    """
+    A scripted reply shaped like a Gemini response.
+
+    Iterating it yields the text in chunks, as a streamed response does; the
+    first chunk arrives after `delay` seconds.
+    """
+
+    def __init__(self, parts: List[FakePart], usage: FakeUsage, chunk_chars: int = 40,
+                 delay: float = 0.0, sleep: Callable[[float], None] = time.sleep):
+        self.candidates = [FakeCandidate(FakeContent('model', parts))]
+        self.usage_metadata = usage
+        self.text = ''.join(part.text for part in parts)
+        self._chunk_chars = max(1, chunk_chars)
+        self._delay = delay
+        self._sleep = sleep
+
+    def __iter__(self) -> Iterator['FakeResponse']:
+        if self._delay:
+            self._sleep(self._delay)
+        text_parts = [part for part in self.candidates[0].content.parts if part.text]
+        calls = [part for part in self.candidates[0].content.parts if part.function_call]
+        for part in text_parts:
+            for start in range(0, len(part.text), self._chunk_chars):
+                yield FakeResponse([FakePart(text=part.text[start:start + self._chunk_chars])], FakeUsage())
+        if calls:
+            yield FakeResponse(calls, FakeUsage())
+
+
+def _text_of(content: Any) -> str:
+    """What a script's `when` patterns are matched against"""
+    if isinstance(content, str):
+        return content
+    try:
+        return json.dumps(content, default=str)
+    except (TypeError, ValueError):
+        return str(content)
+
+
+def _to_content(message: Any) -> FakeContent:
+    """A history entry (Gemini content or API-format dict) as FakeContent"""
+    if isinstance(message, FakeContent):
+        return message
+    if isinstance(message, dict):
+        parts = []
+        for part in message.get('parts', []):
+            if isinstance(part, str):
+                parts.append(FakePart(text=part))
+            elif part.get('function_call'):
+                call = part['function_call']
+                parts.append(FakePart(function_call=FakeFunctionCall(call['name'], dict(call.get('args', {})))))
+            else:
+                parts.append(FakePart(text=part.get('text', ''), function_response=part.get('function_response')))
+        return FakeContent(message.get('role', 'user'), parts)
+    parts = []
+    for part in getattr(message, 'parts', []):
+        call = getattr(part, 'function_call', None)
+        parts.append(FakePart(text=getattr(part, 'text', '') or '',
+                              function_call=FakeFunctionCall(call.name, dict(call.args)) if call else None))
+    return FakeContent(getattr(message, 'role', 'user'), parts)
+
+
+def _sent_content(content: Any) -> FakeContent:
+    """What the user side of a send adds to the history"""
+    if isinstance(content, str):
+        return FakeContent('user', [FakePart(text=content)])
+    parts = []
+    for item in content if isinstance(content, list) else [content]:
+        if isinstance(item, dict) and 'function_response' in item:
+            parts.append(FakePart(function_response=item['function_response']))
+        else:
+            parts.append(FakePart(text=_text_of(item)))
+    return FakeContent('user', parts)
+
+
+class FakeChat:
+    """A chat session replaying the provider's script from its start"""
+
+    def __init__(self, provider: 'FakeProvider', history: List[Any]):
+        self.provider = provider
+        self.history: List[FakeContent] = [_to_content(message) for message in history or []]
+        self._position = 0
+
+    def _next_entry(self, text: str) -> Dict[str, Any]:
+        for entry in self.provider.script:
+            if entry.get('when') and re.search(entry['when'], text, re.IGNORECASE):
+                return entry
+        sequence = [entry for entry in self.provider.script if not entry.get('when')]
+        if not sequence:
+            return {'text': DEFAULT_REPLY}
+        entry = sequence[self._position % len(sequence)]
+        self._position += 1
+        return entry
+
+    def send_message(self, content: Any, stream: bool = False) -> FakeResponse:
+        text = _text_of(content)
+        entry = self._next_entry(text)
+        parts = []
+        reply = entry.get('text', entry.get('response_data', ''))
+        if reply:
+            parts.append(FakePart(text=reply))
+        for call in entry.get('function_calls', []):
+            parts.append(FakePart(function_call=FakeFunctionCall(call['name'], dict(call.get('args', {})))))
+        if not parts:
+            parts.append(FakePart(text=DEFAULT_REPLY))
+
+        usage = self.provider.usage_for(self.history, text, parts, entry.get('usage'))
+        delay = self.provider.latency()
+        response = FakeResponse(parts, usage, chunk_chars=self.provider.chunk_chars,
+                                delay=delay if stream else 0.0, sleep=self.provider.sleep)
+        if not stream and delay:
+            self.provider.sleep(delay)
+
+        self.history.append(_sent_content(content))
+        self.history.append(response.candidates[0].content)
+        self.provider.calls += 1
+        return response
+
+
+class FakeModel:
+    """The fake provider's shared model"""
+
+    def __init__(self, provider: 'FakeProvider'):
+        self.provider = provider
+
+    def start_chat(self, history: Optional[List[Any]] = None) -> FakeChat:
+        return FakeChat(self.provider, history or [])
+
+    def count_tokens(self, contents: Any):
+        return FakeUsage(total_token_count=self.provider.count_tokens(contents))
+
+
+class FakeProvider(LLMProvider):
+    """
+    Scripted local stand-in for Gemini, for load tests and profiling our own overhead.
+
+    The script is a list of entries, each with any of `text`, `function_calls`
+    ([{"name", "args"}]), `usage` (token counts to report instead of the
+    estimate) and `when` (a regex on the message sent). Entries with `when`
+    answer any message they match; the others are replayed in order by each
+    chat, starting over when they run out. `response_data` is read as `text`,
+    so logged Gemini calls can be replayed. Every call takes `latency` seconds
+    plus up to `jitter` more.
+    """
+
+    name = 'fake'
+
+    def __init__(self, script: Optional[List[Dict[str, Any]]] = None, latency: float = 0.0,
+                 jitter: float = 0.0, seed: Optional[int] = None, chunk_chars: int = 40,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.script = list(script or [])
+        self.base_latency = max(0.0, latency)
+        self.jitter = max(0.0, jitter)
+        self.chunk_chars = chunk_chars
+        self.sleep = sleep
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._model = FakeModel(self)
+
+    @classmethod
+    def from_env(cls) -> 'FakeProvider':
+        """Configured by NAVI_FAKE_LLM_SCRIPT, NAVI_FAKE_LLM_LATENCY, NAVI_FAKE_LLM_JITTER and NAVI_FAKE_LLM_SEED"""
+        script_path = os.environ.get('NAVI_FAKE_LLM_SCRIPT')
+        seed = os.environ.get('NAVI_FAKE_LLM_SEED')
+        return cls(
+            script=load_script(script_path) if script_path else None,
+            latency=_env_float('NAVI_FAKE_LLM_LATENCY', 0.0),
+            jitter=_env_float('NAVI_FAKE_LLM_JITTER', 0.0),
+            seed=int(seed) if seed and seed.isdigit() else None,
+        )
+
+    def model(self) -> FakeModel:
+        return self._model
+
+    def latency(self) -> float:
+        if not self.jitter:
+            return self.base_latency
+        with self._random_lock:
+            return self.base_latency + self._random.uniform(0, self.jitter)
+
+    def count_tokens(self, contents: Any) -> int:
+        if isinstance(contents, list):
+            return sum(self.count_tokens(item) for item in contents)
+        if isinstance(contents, FakeContent):
+            return sum(_part_tokens(part) for part in contents.parts)
+        if isinstance(contents, dict) and 'parts' in contents:
+            return self.count_tokens(_to_content(contents))
+        return _estimate_tokens(_text_of(contents))
+
+    def usage_for(self, history: List[FakeContent], sent: str, parts: List[FakePart],
+                  scripted: Optional[Dict[str, int]] = None) -> FakeUsage:
+        """Reported usage: the scripted counts, else estimates for the whole history plus the message"""
+        scripted = scripted or {}
+        prompt = scripted.get('prompt_tokens', self.count_tokens(history) + _estimate_tokens(sent))
+        candidates = scripted.get('candidates_tokens', sum(_part_tokens(part) for part in parts))
+        cached = scripted.get('cached_tokens', 0)
+        return FakeUsage(prompt, candidates, cached, scripted.get('total_tokens', prompt + candidates))
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def load_script(path: str) -> List[Dict[str, Any]]:
+    """Script entries from a JSON list or a JSONL file (one entry per line)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = f.read()
+        stripped = raw.strip()
+        if stripped.startswith('['):
+            return json.loads(stripped)
+        return [json.loads(line) for line in stripped.splitlines() if line.strip()]
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load fake LLM script {path}: {e}")
+        return []
@@ -0,0 +1,120 @@
+"""
+LLM Call Executor
+Runs blocking Gemini SDK calls on a bounded thread pool so the event loop stays responsive
+"""
+
+import os
+import asyncio
+import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT_SECONDS = 60.0
+
+
+class LLMTimeout(TimeoutError):
+    """Raised when an LLM call doesn't finish within its timeout."""
+
+
+def llm_max_workers() -> int:
+    """Concurrent LLM calls per process, via NAVI_LLM_MAX_WORKERS"""
+    try:
+        return max(1, int(os.environ.get('NAVI_LLM_MAX_WORKERS', DEFAULT_MAX_WORKERS)))
+    except ValueError:
+        return DEFAULT_MAX_WORKERS
+
+
+def llm_timeout() -> Optional[float]:
+    """Per-call timeout in seconds via NAVI_LLM_TIMEOUT (0 disables it)"""
+    try:
+        timeout = float(os.environ.get('NAVI_LLM_TIMEOUT', DEFAULT_TIMEOUT_SECONDS))
+    except ValueError:
+        timeout = DEFAULT_TIMEOUT_SECONDS
+    return timeout if timeout > 0 else None
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_llm_executor() -> ThreadPoolExecutor:
+    """The process-wide pool LLM calls run on, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=llm_max_workers(), thread_name_prefix='navi-llm')
+        return _executor
+
+
+async def run_llm_call(fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """
+    Await a blocking call on the LLM pool.
+
+    Raises LLMTimeout once `timeout` seconds (default NAVI_LLM_TIMEOUT) pass.
+    On timeout or cancellation the caller stops waiting straight away; the
+    worker thread can't be interrupted and its eventual result is discarded.
+    """
+    timeout = llm_timeout() if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_llm_executor(), functools.partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"LLM call {getattr(fn, '__qualname__', fn)} timed out after {timeout}s")
+        raise LLMTimeout(f"LLM call timed out after {timeout}s") from None
+
+
+_STREAM_END = object()
+
+
+async def iterate_llm_stream(stream: Iterable[Any], timeout: Optional[float] = None) -> AsyncIterator[Any]:
+    """
+    Iterate a blocking stream (e.g. a streamed Gemini response) on the LLM pool.
+
+    Items are handed to the event loop as they arrive. Raises LLMTimeout when
+    no item arrives for `timeout` seconds (default NAVI_LLM_TIMEOUT). If the
+    caller stops early, the worker stops pulling after its current item.
+    """
+    timeout = llm_timeout() if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stopped = threading.Event()
+
+    def put(item, error=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            # The loop has closed; nobody is listening any more
+            stopped.set()
+
+    def pump():
+        try:
+            for item in stream:
+                if stopped.is_set():
+                    return
+                put(item)
+        except Exception as e:
+            put(_STREAM_END, e)
+        else:
+            put(_STREAM_END)
+
+    loop.run_in_executor(get_llm_executor(), pump)
+    try:
+        while True:
+            try:
+                item, error = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"LLM stream stalled for {timeout}s")
+                raise LLMTimeout(f"LLM stream stalled for {timeout}s") from None
+            if item is _STREAM_END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
@@ -0,0 +1,97 @@
+"""
+Shared Model Cache
+Builds the Gemini model and tool declarations once per process for every engine to share
+"""
+
+import os
+import logging
+import threading
+from typing import List, Optional
+
+import google.generativeai as genai
+from google.generativeai.types import FunctionDeclaration, Tool
+
+from ..tools import tool_registry
+from .prompt_cache import PromptCache, prompt_cache_mode
+from ...config.prompts import system_prompt
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = os.environ.get('NAVI_GEMINI_MODEL', 'gemini-2.5-flash')
+
+
+def build_tool_declarations() -> List[FunctionDeclaration]:
+    """Create Gemini tool declarations from the tool registry's schemas"""
+    return [
+        FunctionDeclaration(
+            name=spec.name,
+            description=spec.description,
+            parameters=spec.parameters_schema()
+        )
+        for spec in tool_registry
+    ]
+
+
+_declarations: Optional[List[FunctionDeclaration]] = None
+_model: Optional[genai.GenerativeModel] = None
+_prompt_cache: Optional[PromptCache] = None  # False once caching turned out to be unavailable
+_cache_lock = threading.Lock()
+
+
+def get_tool_declarations() -> List[FunctionDeclaration]:
+    """The process-wide tool declarations, built on first use"""
+    global _declarations
+    with _cache_lock:
+        if _declarations is None:
+            _declarations = build_tool_declarations()
+            logger.info(f"Built {len(_declarations)} tool declarations")
+        return _declarations
+
+
+def get_model() -> genai.GenerativeModel:
+    """
+    The process-wide Gemini model with the system prompt and tools.
+
+    With prompt caching on (NAVI_PROMPT_CACHE) this is the model bound to the
+    cached prompt, which may be replaced when the cache has to be recreated;
+    while no cache is available it falls back to a plain model sending the
+    whole prompt.
+    """
+    global _model, _prompt_cache
+    declarations = get_tool_declarations()
+    tools = [Tool(function_declarations=declarations)]
+    mode = prompt_cache_mode()
+    if mode != 'off':
+        with _cache_lock:
+            if _prompt_cache is None:
+                try:
+                    _prompt_cache = PromptCache(MODEL_NAME, system_prompt, tools, mode=mode)
+                except Exception as e:
+                    # e.g. an SDK without caching support; don't retry on every call
+                    logger.error(f"Prompt caching unavailable: {e}")
+                    _prompt_cache = False
+            prompt_cache = _prompt_cache
+        cached_model = prompt_cache.model() if prompt_cache else None
+        if cached_model is not None:
+            return cached_model
+
+    with _cache_lock:
+        if _model is None:
+            _model = genai.GenerativeModel(
+                model_name=MODEL_NAME,
+                system_instruction=system_prompt,
+                tools=tools
+            )
+            logger.info(f"Initialized shared {MODEL_NAME} model")
+        return _model
+
+
+def clear_model_cache():
+    """Drop the cached model, prompt cache and declarations, e.g. after the tools or prompt change"""
+    global _declarations, _model, _prompt_cache
+    with _cache_lock:
+        if _prompt_cache:
+            _prompt_cache.close()
+        _declarations = None
+        _model = None
+        _prompt_cache = None
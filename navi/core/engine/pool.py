@@ -0,0 +1,122 @@
+"""
+Conversation Engine Pool
+Keeps one conversation engine per user alive between turns and evicts idle ones
+"""
+
+import os
+import time
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from ..state.manager import StateManager
+from ..state.registry import get_state_manager
+from .conversation import NaviConversationEngine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 64
+DEFAULT_IDLE_SECONDS = 1800.0
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class EnginePool:
+    """
+    Process-wide cache of NaviConversationEngine instances keyed by user.
+
+    Engines unused for `idle_seconds` (NAVI_ENGINE_IDLE_SECONDS) are dropped,
+    as are the least recently used ones beyond `max_size` (NAVI_ENGINE_POOL_SIZE).
+    Like the state registry, dropped engines are tracked weakly so one still
+    held elsewhere is handed out again instead of being duplicated. Engines
+    are handed out as they are; a chat gone stale is reloaded at the start of
+    the next turn, under the user's turn lock (see `sync_history`).
+    """
+
+    def __init__(self, max_size: Optional[int] = None, idle_seconds: Optional[float] = None):
+        if max_size is None:
+            max_size = int(_env_number('NAVI_ENGINE_POOL_SIZE', DEFAULT_MAX_SIZE))
+        if idle_seconds is None:
+            idle_seconds = _env_number('NAVI_ENGINE_IDLE_SECONDS', DEFAULT_IDLE_SECONDS)
+        self.max_size = max(1, max_size)
+        self.idle_seconds = idle_seconds
+        self._engines: 'OrderedDict[str, Tuple[NaviConversationEngine, float]]' = OrderedDict()
+        self._live = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, state_manager: StateManager) -> NaviConversationEngine:
+        """Return the pooled engine for a state manager's user, creating it on first use."""
+        key = state_manager.user_email or state_manager.filepath
+        now = time.monotonic()
+        with self._lock:
+            self.evict_idle(now, locked=True)
+            entry = self._engines.pop(key, None)
+            engine = entry[0] if entry else self._live.get(key)
+            if engine is not None and engine.state_manager is not state_manager:
+                # The registry replaced the user's manager; don't keep the old one alive
+                engine = None
+            if engine is None:
+                engine = NaviConversationEngine(state_manager)
+                self._live[key] = engine
+                logger.info(f"Created conversation engine for {key}")
+            self._engines[key] = (engine, now)
+            self._evict()
+        return engine
+
+    def evict_idle(self, now: Optional[float] = None, locked: bool = False) -> int:
+        """Drop engines idle for longer than idle_seconds; returns how many went."""
+        if not locked:
+            with self._lock:
+                return self.evict_idle(now, locked=True)
+        if self.idle_seconds <= 0:
+            return 0
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        # Entries are kept in order of last use, so the idle ones are at the front
+        while self._engines:
+            key, (_, last_used) = next(iter(self._engines.items()))
+            if now - last_used < self.idle_seconds:
+                break
+            self._engines.popitem(last=False)
+            evicted += 1
+            logger.debug(f"Evicted idle conversation engine for {key}")
+        return evicted
+
+    def discard(self, user_email: str):
+        """Forget a user's engine so the next lookup starts a fresh chat."""
+        with self._lock:
+            self._engines.pop(user_email, None)
+            self._live.pop(user_email, None)
+
+    def clear(self):
+        """Forget every pooled engine."""
+        with self._lock:
+            self._engines.clear()
+            self._live = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._engines)
+
+    def __contains__(self, user_email: str):
+        return user_email in self._engines
+
+    def _evict(self):
+        while len(self._engines) > self.max_size:
+            key, _ = self._engines.popitem(last=False)
+            logger.debug(f"Evicted least recently used conversation engine for {key}")
+
+
+# Global pool instance
+engine_pool = EnginePool()
+
+
+def get_engine(user_email: str) -> NaviConversationEngine:
+    """Pooled conversation engine for a user"""
+    return engine_pool.get(get_state_manager(user_email))
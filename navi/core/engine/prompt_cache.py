@@ -0,0 +1,176 @@
+"""
+Prompt Caching
+Keeps a provider-side cache of the system prompt and tool declarations alive so each call only sends the history
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 3600.0
+DEFAULT_REFRESH_MARGIN = 300.0
+CACHE_MODES = ('gemini', 'local', 'off')
+
+
+def prompt_cache_mode() -> str:
+    """Where the prompt is cached via NAVI_PROMPT_CACHE: 'gemini', 'local' (stand-in) or 'off'"""
+    mode = os.environ.get('NAVI_PROMPT_CACHE', 'gemini').lower()
+    if mode not in CACHE_MODES:
+        logger.warning(f"Unknown NAVI_PROMPT_CACHE '{mode}', caching disabled")
+        return 'off'
+    return mode
+
+
+def prompt_cache_ttl() -> float:
+    """Lifetime of the cached prompt in seconds, via NAVI_PROMPT_CACHE_TTL"""
+    try:
+        return max(60.0, float(os.environ.get('NAVI_PROMPT_CACHE_TTL', DEFAULT_TTL_SECONDS)))
+    except ValueError:
+        return DEFAULT_TTL_SECONDS
+
+
+class LocalCachedContent:
+    """
+    In-process stand-in for genai.caching.CachedContent.
+
+    Has the same create/update/delete lifecycle and expiry, so the cache's
+    refreshing can be exercised without the API. Models built from it are
+    plain models that send the whole prompt.
+    """
+
+    _store: Dict[str, 'LocalCachedContent'] = {}
+
+    def __init__(self, model: str, system_instruction: Optional[str], tools: Optional[List[Any]], ttl: timedelta):
+        self.name = f"cachedContents/local-{uuid.uuid4().hex[:12]}"
+        self.model = model
+        self.system_instruction = system_instruction
+        self.tools = tools
+        self._set_ttl(ttl)
+
+    @classmethod
+    def create(cls, model: str, system_instruction: Optional[str] = None, tools: Optional[List[Any]] = None,
+               ttl: timedelta = timedelta(seconds=DEFAULT_TTL_SECONDS)) -> 'LocalCachedContent':
+        content = cls(model, system_instruction, tools, ttl)
+        cls._store[content.name] = content
+        return content
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expire_time.timestamp()
+
+    def update(self, *, ttl: timedelta):
+        if self.name not in self._store or self.expired:
+            self._store.pop(self.name, None)
+            raise LookupError(f"{self.name} has expired")
+        self._set_ttl(ttl)
+
+    def delete(self):
+        self._store.pop(self.name, None)
+
+    def to_model(self) -> genai.GenerativeModel:
+        return genai.GenerativeModel(
+            model_name=self.model.split('/')[-1],
+            system_instruction=self.system_instruction,
+            tools=self.tools
+        )
+
+    def _set_ttl(self, ttl: timedelta):
+        self.expire_time = datetime.now(timezone.utc) + ttl
+
+
+class PromptCache:
+    """
+    One cached copy of the system prompt and tools, and the model bound to it.
+
+    model() creates the cache on first use and extends its TTL once less than
+    `refresh_margin` seconds remain. If the extension fails (the cache expired
+    or was deleted) a new cache and model are created and `generation` goes
+    up; chats on the old model have to move over. When creation fails, model()
+    returns None and isn't retried for `refresh_margin` seconds.
+    """
+
+    def __init__(self, model_name: str, system_instruction: str, tools: List[Any], mode: str = 'gemini',
+                 ttl: Optional[float] = None, refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+                 clock: Callable[[], float] = time.time):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.tools = tools
+        self.ttl = prompt_cache_ttl() if ttl is None else ttl
+        self.refresh_margin = min(refresh_margin, self.ttl / 2)
+        self.clock = clock
+        if mode == 'local':
+            self.content_class = LocalCachedContent
+            self.model_from_cache = lambda content: content.to_model()
+        else:
+            from google.generativeai import caching
+            self.content_class = caching.CachedContent
+            self.model_from_cache = lambda content: genai.GenerativeModel.from_cached_content(cached_content=content)
+        self.content = None
+        self.generation = 0
+        self._model = None
+        self._expires_at = 0.0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def model(self) -> Optional[genai.GenerativeModel]:
+        """The model bound to a live cache, creating or refreshing the cache as needed"""
+        with self._lock:
+            now = self.clock()
+            if self.content is not None and self._expires_at - now > self.refresh_margin:
+                return self._model
+            if self.content is not None and self._refresh(now):
+                return self._model
+            if now < self._retry_at:
+                return None
+            return self._create(now)
+
+    def close(self):
+        """Delete the cache ahead of its expiry"""
+        with self._lock:
+            if self.content is None:
+                return
+            try:
+                self.content.delete()
+            except Exception as e:
+                logger.warning(f"Failed to delete prompt cache {self.content.name}: {e}")
+            self.content = self._model = None
+
+    def _create(self, now: float) -> Optional[genai.GenerativeModel]:
+        try:
+            content = self.content_class.create(
+                model=f"models/{self.model_name}",
+                system_instruction=self.system_instruction,
+                tools=self.tools,
+                ttl=timedelta(seconds=self.ttl)
+            )
+            model = self.model_from_cache(content)
+        except Exception as e:
+            logger.error(f"Failed to create prompt cache, sending the full prompt: {e}")
+            self.content = self._model = None
+            self._retry_at = now + self.refresh_margin
+            return None
+
+        self.content, self._model = content, model
+        self._expires_at = now + self.ttl
+        self.generation += 1
+        logger.info(f"Created prompt cache {content.name} for {self.ttl:.0f}s")
+        return model
+
+    def _refresh(self, now: float) -> bool:
+        try:
+            self.content.update(ttl=timedelta(seconds=self.ttl))
+        except Exception as e:
+            logger.warning(f"Failed to extend prompt cache {self.content.name}, recreating it: {e}")
+            self.content = self._model = None
+            return False
+        self._expires_at = now + self.ttl
+        logger.debug(f"Extended prompt cache {self.content.name} by {self.ttl:.0f}s")
+        return True
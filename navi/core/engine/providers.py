@@ -0,0 +1,107 @@
+"""
+LLM Providers
+The backend the engine talks to (Gemini, or a scripted local fake for load tests), chosen via NAVI_LLM_PROVIDER
+"""
+
+import os
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+from . import model_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDER = 'gemini'
+
+
+class LLMProvider(ABC):
+    """
+    What the engine needs from an LLM backend.
+
+    `model()` returns the shared model, whose `start_chat(history=...)` gives a
+    chat with a `history` list and `send_message(content, stream=False)`.
+    Responses carry `text`, `candidates[0].content.parts` (text or
+    function_call parts) and `usage_metadata`; a streamed response yields
+    chunks with `text` and has the full response's attributes once iterated.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def model(self):
+        """The shared model chats are started on"""
+        pass
+
+    @abstractmethod
+    def count_tokens(self, contents: Any) -> int:
+        """Input tokens `contents` would cost"""
+        pass
+
+    def close(self):
+        """Release anything held provider-side (e.g. cached prompts)"""
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via the process-wide model cache"""
+
+    name = 'gemini'
+
+    def model(self):
+        return model_cache.get_model()
+
+    def count_tokens(self, contents: Any) -> int:
+        return model_cache.get_model().count_tokens(contents).total_tokens
+
+    def close(self):
+        model_cache.clear_model_cache()
+
+
+def _fake_provider() -> LLMProvider:
+    from .fake_llm import FakeProvider
+    return FakeProvider.from_env()
+
+
+# NAVI_LLM_PROVIDER values and how to build each
+PROVIDERS: Dict[str, Callable[[], LLMProvider]] = {
+    'gemini': GeminiProvider,
+    'fake': _fake_provider,
+}
+
+
+def create_provider(name: Optional[str] = None) -> LLMProvider:
+    """A new provider by name (default NAVI_LLM_PROVIDER)"""
+    name = (name or os.environ.get('NAVI_LLM_PROVIDER', DEFAULT_PROVIDER)).strip().lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{name}', expected one of {', '.join(PROVIDERS)}")
+    provider = PROVIDERS[name]()
+    logger.info(f"Using LLM provider {provider.name}")
+    return provider
+
+
+_provider: Optional[LLMProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> LLMProvider:
+    """The process-wide provider, created on first use"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_provider()
+        return _provider
+
+
+def set_provider(provider: Optional[LLMProvider]):
+    """Swap the process-wide provider, e.g. to a fake in a benchmark; engines pick it up on their next call"""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, provider
+    if previous is not None and previous is not provider:
+        previous.close()
+
+
+def get_model():
+    """The current provider's shared model"""
+    return get_provider().model()
@@ -0,0 +1,88 @@
+"""
+Response Streaming
+Incremental parsing of streamed model output into the text the user should see
+"""
+
+from typing import Optional
+
+# Sections whose content is shown to the user, and those that are kept from them
+SHOWN_SECTIONS = ('message',)
+HIDDEN_SECTIONS = ('strategize', 'analyze')
+_TAGS = tuple(f"<{name}>" for name in SHOWN_SECTIONS + HIDDEN_SECTIONS) + \
+    tuple(f"</{name}>" for name in SHOWN_SECTIONS + HIDDEN_SECTIONS)
+
+
+class StreamingTagParser:
+    """
+    Turns chunks of model output into the user-facing text, as it arrives.
+
+    Text inside <message> is passed through; <strategize> and <analyze>
+    sections are swallowed. A tag split across chunks is held back until it
+    is complete. Like NaviResponseProcessor, output with no <message> section
+    at all is shown whole (minus hidden sections), which close() emits.
+    """
+
+    def __init__(self):
+        self.section: Optional[str] = None
+        self.seen_message = False
+        self._pending = ''
+        self._outside = []
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return the newly visible text"""
+        text = self._pending + chunk
+        self._pending = ''
+        visible = []
+        i = 0
+        while i < len(text):
+            start = text.find('<', i)
+            if start == -1:
+                self._emit(text[i:], visible)
+                break
+            self._emit(text[i:start], visible)
+
+            tag = next((t for t in _TAGS if text.startswith(t, start)), None)
+            if tag is None:
+                rest = text[start:]
+                if any(t.startswith(rest) for t in _TAGS):
+                    # Possibly the start of a tag cut off by the chunk boundary
+                    self._pending = rest
+                    break
+                self._emit('<', visible)
+                i = start + 1
+                continue
+
+            self._enter(tag)
+            i = start + len(tag)
+        return ''.join(visible)
+
+    def close(self) -> str:
+        """Flush what's left once the stream has ended"""
+        visible = []
+        if self._pending:
+            self._emit(self._pending, visible)
+            self._pending = ''
+        if not self.seen_message:
+            visible.append(''.join(self._outside).strip())
+            self._outside = []
+        return ''.join(visible)
+
+    def _enter(self, tag: str):
+        name = tag.strip('</>')
+        if tag.startswith('</'):
+            if self.section == name:
+                self.section = None
+        elif self.section is None:
+            self.section = name
+            if name in SHOWN_SECTIONS:
+                self.seen_message = True
+                # Text outside any section only counts when there's no message
+                self._outside = []
+
+    def _emit(self, text: str, visible: list):
+        if not text:
+            return
+        if self.section in SHOWN_SECTIONS:
+            visible.append(text)
+        elif self.section is None and not self.seen_message:
+            self._outside.append(text)
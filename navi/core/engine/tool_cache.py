@@ -0,0 +1,80 @@
+"""
+Per-Turn Tool Result Cache
+Reuses the results of read-only tool calls within a turn until a mutating call touches what they read
+"""
+
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from .tool_scheduler import resolve_access, resources_overlap
+
+logger = logging.getLogger(__name__)
+
+# Read-only, but their result changes from one call to the next
+UNCACHEABLE_TOOLS = ('get_current_datetime',)
+
+# Results that report a failure are worth retrying rather than reusing
+_FAILURE_PREFIXES = ('error', '❌')
+
+
+def is_cacheable(tool_name: str, args: Dict[str, Any]) -> bool:
+    """Whether a call only reads (per TOOL_ACCESS) and returns the same result while nothing changes"""
+    reads, writes = resolve_access(tool_name, args)
+    return bool(reads) and not writes and tool_name not in UNCACHEABLE_TOOLS
+
+
+class ToolResultCache:
+    """
+    Results of read-only tool calls made during the current turn.
+
+    Entries are keyed by tool name and arguments. A call that writes a
+    resource drops every entry that read an overlapping one, so a list
+    requested again after an update is fetched fresh. Cleared at the start of
+    each turn; hits and lookups count towards the turn's hit rate.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[frozenset, Any]] = {}
+        self.hits = 0
+        self.lookups = 0
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.lookups = 0
+
+    @staticmethod
+    def _key(tool_name: str, args: Dict[str, Any]) -> Tuple[str, str]:
+        return tool_name, json.dumps(args, sort_keys=True, default=str)
+
+    def lookup(self, tool_name: str, args: Dict[str, Any]) -> Tuple[bool, Any]:
+        """(hit, result) for a cacheable call"""
+        self.lookups += 1
+        entry = self._entries.get(self._key(tool_name, args))
+        if entry is None:
+            return False, None
+        self.hits += 1
+        return True, entry[1]
+
+    def store(self, tool_name: str, args: Dict[str, Any], result: Any):
+        """Keep a cacheable call's result, unless it reports a failure"""
+        if isinstance(result, str) and result.strip().lower().startswith(_FAILURE_PREFIXES):
+            return
+        reads, _ = resolve_access(tool_name, args)
+        self._entries[self._key(tool_name, args)] = (reads, result)
+
+    def invalidate(self, tool_name: str, args: Dict[str, Any]) -> int:
+        """Drop the entries a mutating call may have made stale; returns how many"""
+        _, writes = resolve_access(tool_name, args)
+        stale = [key for key, (reads, _) in self._entries.items()
+                 if any(resources_overlap(w, r) for w in writes for r in reads)]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            logger.debug(f"{tool_name} invalidated {len(stale)} cached tool result(s)")
+        return len(stale)
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        return round(self.hits / self.lookups, 2) if self.lookups else None
@@ -0,0 +1,245 @@
+"""
+Tool Call Scheduling
+Runs the function calls of one model response concurrently where they don't touch the same data
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass(frozen=True)
+class ToolAccess:
+    """
+    What a tool reads and writes.
+
+    Resources are names like 'tasks' or 'calendar'; 'calendar:{event_id}' names
+    a single entity and is filled in from the call's arguments (falling back to
+    the whole collection when the argument is missing).
+    """
+    reads: Tuple[str, ...] = ()
+    writes: Tuple[str, ...] = ()
+
+
+# Tools missing from this table are assumed to touch everything and run alone.
+# Tools must not persist state themselves (the engine saves at the end of the
+# turn); a save from a pool thread would snapshot state while siblings change it.
+TOOL_ACCESS: Dict[str, ToolAccess] = {
+    # Goals
+    'list_goals': ToolAccess(reads=('goals',)),
+    'list_goals_by_category': ToolAccess(reads=('goals',)),
+    'check_goal_completion': ToolAccess(reads=('goals',)),
+    'calculate_goal_progress': ToolAccess(reads=('tasks',)),
+    'display_goals_with_progress': ToolAccess(reads=('goals', 'tasks')),
+    'display_goal_summary': ToolAccess(reads=('goals', 'tasks')),
+    'add_goal': ToolAccess(writes=('goals',)),
+    'update_goal': ToolAccess(writes=('goals',)),
+    'update_user_goal_assessment': ToolAccess(writes=('goals',)),
+    'update_goal_progress_on_task_completion': ToolAccess(reads=('tasks',), writes=('goals',)),
+    # Tasks
+    'list_tasks': ToolAccess(reads=('tasks',)),
+    'display_tasks_for_user': ToolAccess(reads=('tasks', 'goals')),
+    'add_task': ToolAccess(reads=('user_preferences',), writes=('tasks', 'calendar')),
+    'update_task': ToolAccess(writes=('tasks', 'goals')),
+    # Calendar
+    'list_events': ToolAccess(reads=('calendar',)),
+    'get_event_details': ToolAccess(reads=('calendar:{event_id}',)),
+    'add_event': ToolAccess(reads=('user_preferences',), writes=('calendar',)),
+    'add_daily_event': ToolAccess(reads=('user_preferences',), writes=('calendar',)),
+    'update_event': ToolAccess(reads=('user_preferences',), writes=('calendar:{event_id}',)),
+    'delete_event': ToolAccess(writes=('calendar:{event_id}',)),
+    # Utilities
+    'get_current_date': ToolAccess(reads=('user_preferences',)),
+    'get_current_datetime': ToolAccess(reads=('user_preferences',)),
+    'get_user_timezone': ToolAccess(reads=('user_preferences',)),
+    'set_user_timezone': ToolAccess(writes=('user_preferences',)),
+    'add_user_detail': ToolAccess(writes=('user_details',)),
+    'update_conversation_stage': ToolAccess(writes=('conversation_stage',)),
+    'list_progress_trackers': ToolAccess(reads=('progress_trackers',)),
+    'add_progress_tracker': ToolAccess(writes=('progress_trackers',)),
+    'update_progress_tracker': ToolAccess(writes=('progress_trackers',)),
+    'add_insight': ToolAccess(writes=('insights',)),
+}
+
+_EVERYTHING = '*'
+
+
+def parallel_tools_enabled() -> bool:
+    """Whether independent tool calls run concurrently, via NAVI_TOOL_PARALLEL"""
+    return os.environ.get('NAVI_TOOL_PARALLEL', 'true').lower() in ('1', 'true', 'yes')
+
+
+def tool_max_workers() -> int:
+    """Concurrent tool calls per process, via NAVI_TOOL_MAX_WORKERS"""
+    try:
+        return max(1, int(os.environ.get('NAVI_TOOL_MAX_WORKERS', DEFAULT_MAX_WORKERS)))
+    except ValueError:
+        return DEFAULT_MAX_WORKERS
+
+
+def _resolve(resource: str, args: Dict[str, Any]) -> str:
+    collection, _, entity = resource.partition(':')
+    if not entity:
+        return resource
+    try:
+        return f"{collection}:{entity.format(**args)}"
+    except (KeyError, IndexError, ValueError):
+        return collection
+
+
+def resolve_access(tool_name: str, args: Dict[str, Any]) -> Tuple[frozenset, frozenset]:
+    """(reads, writes) of one call, with entity placeholders filled from its args"""
+    access = TOOL_ACCESS.get(tool_name)
+    if access is None:
+        return frozenset(), frozenset([_EVERYTHING])
+    return (frozenset(_resolve(r, args) for r in access.reads),
+            frozenset(_resolve(w, args) for w in access.writes))
+
+
+def resources_overlap(a: str, b: str) -> bool:
+    """Whether two resources (see ToolAccess) refer to any of the same data"""
+    if _EVERYTHING in (a, b) or a == b:
+        return True
+    # A whole collection overlaps each of its entities
+    return a.startswith(b + ':') or b.startswith(a + ':')
+
+
+def _conflict(first: Tuple[frozenset, frozenset], second: Tuple[frozenset, frozenset]) -> bool:
+    reads1, writes1 = first
+    reads2, writes2 = second
+    return (any(resources_overlap(w, r) for w in writes1 for r in reads2 | writes2)
+            or any(resources_overlap(w, r) for w in writes2 for r in reads1))
+
+
+def plan_tool_calls(calls: List[Tuple[str, Dict[str, Any]]]) -> List[List[int]]:
+    """
+    For each call, the earlier calls it must wait for.
+
+    A call depends on every earlier call it conflicts with (both touch a
+    resource and at least one writes it), so conflicting calls keep the order
+    the model gave them while the rest can overlap.
+    """
+    accesses = [resolve_access(name, args) for name, args in calls]
+    return [[j for j in range(i) if _conflict(accesses[j], accesses[i])] for i in range(len(calls))]
+
+
+class ToolMetrics:
+    """Per-tool call counts and latencies, plus how much batching saved"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tools: Dict[str, Dict[str, float]] = {}
+        self.batches = 0
+        self.batch_wall_ms = 0.0
+        self.batch_tool_ms = 0.0
+
+    def record_call(self, tool_name: str, duration_ms: float, failed: bool = False):
+        with self._lock:
+            stats = self.tools.setdefault(tool_name, {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['calls'] += 1
+            stats['errors'] += int(failed)
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+
+    def record_batch(self, wall_ms: float, tool_ms: float):
+        with self._lock:
+            self.batches += 1
+            self.batch_wall_ms += wall_ms
+            self.batch_tool_ms += tool_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-dict copy: per-tool stats with averages, and the overall speed-up"""
+        with self._lock:
+            tools = {
+                name: dict(stats, avg_ms=round(stats['total_ms'] / stats['calls'], 1))
+                for name, stats in self.tools.items()
+            }
+            speedup = self.batch_tool_ms / self.batch_wall_ms if self.batch_wall_ms else 1.0
+            return {'tools': tools, 'batches': self.batches, 'speedup': round(speedup, 2)}
+
+    def reset(self):
+        with self._lock:
+            self.tools.clear()
+            self.batches = 0
+            self.batch_wall_ms = self.batch_tool_ms = 0.0
+
+
+# Global instance
+tool_metrics = ToolMetrics()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """The process-wide pool tool calls run on, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=tool_max_workers(), thread_name_prefix='navi-tool')
+        return _executor
+
+
+@dataclass
+class ToolCallResult:
+    """Outcome of one tool call"""
+    result: Any = None
+    error: Optional[Exception] = None
+    duration_ms: float = 0.0
+
+
+def _timed(fn: Callable[[], Any]) -> ToolCallResult:
+    start = time.perf_counter()
+    try:
+        result = ToolCallResult(result=fn())
+    except Exception as e:
+        result = ToolCallResult(error=e)
+    result.duration_ms = (time.perf_counter() - start) * 1000
+    return result
+
+
+async def run_tool_calls(calls: List[Tuple[str, Dict[str, Any]]], thunks: List[Callable[[], Any]],
+                         parallel: Optional[bool] = None) -> List[ToolCallResult]:
+    """
+    Run one response's tool calls and return their outcomes in call order.
+
+    In parallel mode each call starts on the tool pool as soon as the calls it
+    conflicts with (see plan_tool_calls) have finished; otherwise they run one
+    after another on the event loop thread, as before.
+    """
+    parallel = parallel_tools_enabled() if parallel is None else parallel
+    start = time.perf_counter()
+
+    if not parallel or len(calls) < 2:
+        results = [_timed(thunk) for thunk in thunks]
+    else:
+        loop = asyncio.get_running_loop()
+        executor = get_tool_executor()
+        tasks: List[asyncio.Future] = []
+
+        async def run(index: int, dependencies: List[int]) -> ToolCallResult:
+            if dependencies:
+                await asyncio.gather(*(tasks[j] for j in dependencies))
+            return await loop.run_in_executor(executor, _timed, thunks[index])
+
+        for index, dependencies in enumerate(plan_tool_calls(calls)):
+            tasks.append(asyncio.ensure_future(run(index, dependencies)))
+        results = list(await asyncio.gather(*tasks))
+
+    wall_ms = (time.perf_counter() - start) * 1000
+    tool_ms = sum(r.duration_ms for r in results)
+    for (name, _), outcome in zip(calls, results):
+        tool_metrics.record_call(name, outcome.duration_ms, failed=outcome.error is not None)
+    tool_metrics.record_batch(wall_ms, tool_ms)
+    if len(calls) > 1:
+        logger.info(f"Ran {len(calls)} tools in {wall_ms:.0f}ms ({tool_ms:.0f}ms of tool time)")
+    return results
@@ -0,0 +1,82 @@
+"""
+Turn Budgets
+Caps on the tool-call loop of a single turn: rounds, tool calls, wall-clock time and tokens
+"""
+
+import os
+import time
+from typing import Callable, Optional
+
+from .usage import extract_usage
+
+DEFAULT_MAX_ROUNDS = 6
+DEFAULT_MAX_TOOL_CALLS = 20
+DEFAULT_MAX_SECONDS = 90.0
+DEFAULT_MAX_TOKENS = 200000
+
+# Names recorded in the API log when a budget runs out
+ROUNDS = 'rounds'
+TOOL_CALLS = 'tool_calls'
+LATENCY = 'latency'
+TOKENS = 'tokens'
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return max(0, cast(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+class TurnBudget:
+    """
+    What one turn may still spend on tool rounds.
+
+    A turn is the first model call plus one round per batch of tool results
+    sent back. Before each round the engine asks exhausted() whether it may go
+    on; the limits come from NAVI_TURN_MAX_ROUNDS, NAVI_TURN_MAX_TOOL_CALLS,
+    NAVI_TURN_MAX_SECONDS and NAVI_TURN_MAX_TOKENS, and 0 disables a limit.
+    Tokens are counted from the usage the provider reports.
+    """
+
+    def __init__(self, max_rounds: Optional[int] = None, max_tool_calls: Optional[int] = None,
+                 max_seconds: Optional[float] = None, max_tokens: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_rounds = _env_number('NAVI_TURN_MAX_ROUNDS', DEFAULT_MAX_ROUNDS) if max_rounds is None else max_rounds
+        self.max_tool_calls = (_env_number('NAVI_TURN_MAX_TOOL_CALLS', DEFAULT_MAX_TOOL_CALLS)
+                               if max_tool_calls is None else max_tool_calls)
+        self.max_seconds = (_env_number('NAVI_TURN_MAX_SECONDS', DEFAULT_MAX_SECONDS, float)
+                            if max_seconds is None else max_seconds)
+        self.max_tokens = _env_number('NAVI_TURN_MAX_TOKENS', DEFAULT_MAX_TOKENS) if max_tokens is None else max_tokens
+        self._clock = clock
+        self.started = clock()
+        self.rounds = 0
+        self.tool_calls = 0
+        self.tokens = 0
+
+    def add_response(self, response):
+        """Count a model response's reported tokens"""
+        usage = extract_usage(response)
+        if usage:
+            self.tokens += usage['total_tokens']
+
+    def add_round(self, tool_calls: int):
+        """Count a round of tool calls whose results go back to the model"""
+        self.rounds += 1
+        self.tool_calls += tool_calls
+
+    @property
+    def elapsed(self) -> float:
+        return self._clock() - self.started
+
+    def exhausted(self, pending_tool_calls: int) -> Optional[str]:
+        """The budget that rules out running the pending tool calls as another round, if any"""
+        if self.max_rounds and self.rounds >= self.max_rounds:
+            return ROUNDS
+        if self.max_tool_calls and self.tool_calls + pending_tool_calls > self.max_tool_calls:
+            return TOOL_CALLS
+        if self.max_seconds and self.elapsed >= self.max_seconds:
+            return LATENCY
+        if self.max_tokens and self.tokens >= self.max_tokens:
+            return TOKENS
+        return None
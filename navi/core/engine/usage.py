@@ -0,0 +1,91 @@
+"""
+Token Usage Accounting
+Records the provider's reported token usage per call and aggregates it per day and flow
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Where a turn came from: a user's message or one of the schedulers
+FLOWS = ('chat', 'reflection', 'tracker')
+
+USAGE_FIELDS = ('prompt_tokens', 'candidates_tokens', 'cached_tokens', 'total_tokens')
+
+# Days of usage kept in state
+RETENTION_DAYS = 400
+
+# usage_metadata attribute for each of our fields
+_METADATA_FIELDS = {
+    'prompt_tokens': 'prompt_token_count',
+    'candidates_tokens': 'candidates_token_count',
+    'cached_tokens': 'cached_content_token_count',
+    'total_tokens': 'total_token_count',
+}
+
+
+def extract_usage(response) -> Optional[Dict[str, int]]:
+    """The token counts the provider reported for a response, or None if it reported none"""
+    metadata = getattr(response, 'usage_metadata', None)
+    if metadata is None:
+        return None
+    usage = {}
+    for field, attribute in _METADATA_FIELDS.items():
+        value = getattr(metadata, attribute, 0)
+        usage[field] = value if isinstance(value, int) else 0
+    if not any(usage.values()):
+        return None
+    if not usage['total_tokens']:
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['candidates_tokens']
+    return usage
+
+
+def record_usage(state: Dict[str, Any], flow: str, usage: Dict[str, int], response_time_ms: int = 0,
+                 when: Optional[datetime] = None):
+    """Add one call's usage to state['usage_stats'][day][flow]"""
+    day = (when or datetime.now(timezone.utc)).strftime('%Y-%m-%d')
+    stats = state.setdefault('usage_stats', {})
+    totals = stats.setdefault(day, {}).setdefault(flow, {'calls': 0, 'response_time_ms': 0,
+                                                         **{field: 0 for field in USAGE_FIELDS}})
+    totals['calls'] += 1
+    totals['response_time_ms'] += response_time_ms
+    for field in USAGE_FIELDS:
+        totals[field] = totals.get(field, 0) + usage.get(field, 0)
+
+    if len(stats) > RETENTION_DAYS:
+        for old_day in sorted(stats)[:-RETENTION_DAYS]:
+            del stats[old_day]
+
+
+def usage_series(state: Dict[str, Any], days: Optional[int] = None,
+                 today: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Daily usage as time series, one per flow, plus totals per flow.
+
+    With `days`, covers that many days up to today (days without calls are
+    zeros); otherwise every recorded day.
+    """
+    stats = state.get('usage_stats') or {}
+    if days:
+        today = today or datetime.now(timezone.utc)
+        dates = [(today - timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days - 1, -1, -1)]
+    else:
+        dates = sorted(stats)
+
+    flows = sorted({flow for day in stats.values() for flow in day} | set(FLOWS))
+    fields = ('calls', 'response_time_ms') + USAGE_FIELDS
+    series: Dict[str, Dict[str, List[int]]] = {flow: {field: [] for field in fields} for flow in flows}
+    for date in dates:
+        day = stats.get(date, {})
+        for flow in flows:
+            totals = day.get(flow, {})
+            for field in fields:
+                series[flow][field].append(totals.get(field, 0))
+
+    return {
+        'days': dates,
+        'flows': series,
+        'totals': {flow: {field: sum(values) for field, values in series[flow].items()} for flow in flows},
+    }
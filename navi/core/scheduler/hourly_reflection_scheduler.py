@@ -12,7 +12,9 @@ from telegram import Bot
 from telegram.error import TelegramError
 
 from ..state.manager import StateManager
-from ..engine.conversation import NaviConversationEngine
+from ..state.registry import get_state_manager
+from ..engine.pool import engine_pool
+from ..engine.dispatcher import turn_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -90,83 +92,83 @@ class HourlyReflectionScheduler:
         """Process 4-hour reflection for a specific user"""
         try:
             # Get user's state
-            state_manager = StateManager(user_email=user_email)
-            state = state_manager.get_state()
-            
-            # Create conversation engine for this user
-            engine = NaviConversationEngine(state_manager)
+            state_manager = get_state_manager(user_email)
             
-            # Build comprehensive reflection prompt
-            reflection_prompt = self._build_comprehensive_reflection_prompt(state, user_email)
+            # Hold this user's pooled conversation engine for the whole turn, and only
+            # then read the state the reflection is built from
+            async with turn_dispatcher.turn(state_manager, priority='background', pool=engine_pool) as engine:
+                # Build comprehensive reflection prompt
+                state = state_manager.get_state()
+                reflection_prompt = self._build_comprehensive_reflection_prompt(state, user_email)
             
-            # Generate AI reflection response
-            response = await engine.process_message(reflection_prompt)
+                # Generate AI reflection response
+                response = await engine.process_message(reflection_prompt, flow='reflection')
             
-            # CRITICAL: Validate and fix AI response formatting
-            corrected_response = self._validate_and_fix_response(response, user_email)
+                # CRITICAL: Validate and fix AI response formatting
+                corrected_response = self._validate_and_fix_response(response, user_email)
             
-            # Check if AI decided to send a message (after correction)
-            if corrected_response.message_text:
-                # AI decided to reach out to user
-                await self._send_proactive_message(telegram_id, user_email, corrected_response.message_text)
-                
-                # Add to chat history for conversation UI with system role
-                self._add_to_chat_history(state_manager, 
-                    role="system",
-                    content=f"<system_prompt>\n[SYSTEM: 4-Hour Reflection Check]\n{reflection_prompt}\n</system_prompt>",
-                    timestamp=datetime.now().isoformat()
-                )
-                
-                # Add AI response to chat history (including strategize thoughts)
-                full_response = ""
-                if corrected_response.strategize_text:
-                    full_response += f"<strategize>{corrected_response.strategize_text}</strategize>\n"
+                # Check if AI decided to send a message (after correction)
                 if corrected_response.message_text:
-                    full_response += f"<message>{corrected_response.message_text}</message>"
+                    # AI decided to reach out to user
+                    await self._send_proactive_message(telegram_id, user_email, corrected_response.message_text)
+                
+                    # Add to chat history for conversation UI with system role
+                    self._add_to_chat_history(state_manager, 
+                        role="system",
+                        content=f"<system_prompt>\n[SYSTEM: 4-Hour Reflection Check]\n{reflection_prompt}\n</system_prompt>",
+                        timestamp=datetime.now().isoformat()
+                    )
                 
-                self._add_to_chat_history(state_manager,
-                    role="model", 
-                    content=full_response,
-                    timestamp=datetime.now().isoformat()
-                )
+                    # Add AI response to chat history (including strategize thoughts)
+                    full_response = ""
+                    if corrected_response.strategize_text:
+                        full_response += f"<strategize>{corrected_response.strategize_text}</strategize>\n"
+                    if corrected_response.message_text:
+                        full_response += f"<message>{corrected_response.message_text}</message>"
                 
-                # Log this reflection with message sent
-                self._log_reflection(state_manager, {
-                    "timestamp": datetime.now().isoformat(),
-                    "ai_analysis": corrected_response.strategize_text or "No strategic analysis",
-                    "action_taken": "message_sent",
-                    "message_content": corrected_response.message_text,
-                    "tool_executions": [exec["name"] for exec in response.tool_executions] if response.tool_executions else [],
-                    "formatting_corrections": getattr(corrected_response, 'formatting_corrections', [])
-                })
-            else:
-                # AI decided to stay silent - still log to chat history with system role
-                self._add_to_chat_history(state_manager,
-                    role="system",
-                    content=f"<system_prompt>\n[SYSTEM: 4-Hour Reflection Check - Silent]\n{reflection_prompt}\n</system_prompt>",
-                    timestamp=datetime.now().isoformat()
-                )
+                    self._add_to_chat_history(state_manager,
+                        role="model", 
+                        content=full_response,
+                        timestamp=datetime.now().isoformat()
+                    )
                 
-                # Add AI's strategize thoughts even for silent reflections
-                if corrected_response.strategize_text:
+                    # Log this reflection with message sent
+                    self._log_reflection(state_manager, {
+                        "timestamp": datetime.now().isoformat(),
+                        "ai_analysis": corrected_response.strategize_text or "No strategic analysis",
+                        "action_taken": "message_sent",
+                        "message_content": corrected_response.message_text,
+                        "tool_executions": [exec["name"] for exec in response.tool_executions] if response.tool_executions else [],
+                        "formatting_corrections": getattr(corrected_response, 'formatting_corrections', [])
+                    })
+                else:
+                    # AI decided to stay silent - still log to chat history with system role
                     self._add_to_chat_history(state_manager,
-                        role="model",
-                        content=f"<strategize>{corrected_response.strategize_text}</strategize>",
+                        role="system",
+                        content=f"<system_prompt>\n[SYSTEM: 4-Hour Reflection Check - Silent]\n{reflection_prompt}\n</system_prompt>",
                         timestamp=datetime.now().isoformat()
                     )
                 
-                # Log this reflection as silent
-                self._log_reflection(state_manager, {
-                    "timestamp": datetime.now().isoformat(),
-                    "ai_analysis": corrected_response.strategize_text or "Silent reflection completed",
-                    "action_taken": "silent_reflection",
-                    "message_content": None,
-                    "tool_executions": [exec["name"] for exec in response.tool_executions] if response.tool_executions else [],
-                    "formatting_corrections": getattr(corrected_response, 'formatting_corrections', [])
-                })
-            
-            # Save the updated state after reflection
-            engine.save_state()
+                    # Add AI's strategize thoughts even for silent reflections
+                    if corrected_response.strategize_text:
+                        self._add_to_chat_history(state_manager,
+                            role="model",
+                            content=f"<strategize>{corrected_response.strategize_text}</strategize>",
+                            timestamp=datetime.now().isoformat()
+                        )
+                
+                    # Log this reflection as silent
+                    self._log_reflection(state_manager, {
+                        "timestamp": datetime.now().isoformat(),
+                        "ai_analysis": corrected_response.strategize_text or "Silent reflection completed",
+                        "action_taken": "silent_reflection",
+                        "message_content": None,
+                        "tool_executions": [exec["name"] for exec in response.tool_executions] if response.tool_executions else [],
+                        "formatting_corrections": getattr(corrected_response, 'formatting_corrections', [])
+                    })
+            
+                # Save the updated state after reflection
+                engine.save_state()
             
             logger.info(f"Completed 4-hour reflection for {user_email} - Action: {'message_sent' if corrected_response.message_text else 'silent_reflection'}")
             
@@ -405,6 +407,9 @@ Conduct your analysis now."""
             # Add new reflection
             state['hourly_reflections'].append(reflection_data)
             
+            # Expire old reflections into daily rollups and cold storage
+            state_manager.enforce_retention('hourly_reflections')
+            
             # Save state
             state_manager.save_state()
             
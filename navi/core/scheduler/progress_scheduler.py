@@ -12,9 +12,11 @@ from telegram import Bot
 from telegram.error import TelegramError
 
 from ..state.manager import StateManager
+from ..state.registry import get_state_manager
+from ..state.storage import parse_check_in_time
 from ..tools.utilities import update_progress_tracker, list_progress_trackers
-from ..tools.tasks import _find_task_by_id
-from ..tools.goals import _find_goal_by_id
+from ..engine.pool import engine_pool
+from ..engine.dispatcher import turn_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -90,55 +92,48 @@ class ProgressTrackerScheduler:
         """Check and process trackers for a specific user"""
         try:
             # Get user's state
-            state_manager = StateManager(user_email=user_email)
-            state = state_manager.get_state()
-            
-            # Get all progress trackers
-            trackers = state.get('progress_trackers', [])
+            state_manager = get_state_manager(user_email)
             current_time = datetime.now()
             
-            for tracker in trackers:
-                if tracker.get('status') == 'PENDING':
-                    # Parse check-in time
-                    check_in_time = self._parse_datetime(tracker.get('check_in_time', ''))
+            # Only PENDING trackers whose check-in time has arrived; index-backed
+            # storage answers this without loading the whole state
+            for tracker in state_manager.get_due_progress_trackers(current_time):
+                # The check-in, marking the tracker and the save are one background turn,
+                # so they don't interleave with the user's, who goes first
+                async with turn_dispatcher.turn(state_manager, priority='background', pool=engine_pool) as engine:
+                    # The user's own turn may have changed it while we waited
+                    tracker = state_manager.index.tracker(tracker['tracker_id'])
+                    if not tracker or tracker.get('status') != 'PENDING':
+                        continue
                     
-                    if check_in_time and current_time >= check_in_time:
-                        # Time to send notification!
-                        await self._send_progress_notification(
-                            telegram_id, user_email, tracker, state_manager
-                        )
-                        
-                        # Update tracker status
-                        update_progress_tracker(
-                            state_manager, 
-                            tracker['tracker_id'], 
-                            'status', 
-                            'NOTIFIED'
-                        )
-                        state_manager.save_state()
+                    # Time to send notification!
+                    await self._send_progress_notification(
+                        telegram_id, user_email, tracker, state_manager, engine
+                    )
+                    
+                    # Update tracker status
+                    update_progress_tracker(
+                        state_manager, 
+                        tracker['tracker_id'], 
+                        'status', 
+                        'NOTIFIED'
+                    )
+                    # Through the engine, so its chat isn't left looking stale
+                    engine.save_state()
                         
         except Exception as e:
             logger.error(f"Error checking user trackers for {user_email}: {e}")
             
     async def _send_progress_notification(self, telegram_id: str, user_email: str, 
-                                        tracker: Dict, state_manager: StateManager):
-        """Send AI-generated progress check-in notification to user"""
+                                        tracker: Dict, state_manager: StateManager, engine):
+        """Send AI-generated progress check-in notification to user, within the engine's turn"""
+        task = None
         try:
             # Get task and goal information
-            state = state_manager.get_state()
-            tasks = state.get('tasks', [])
-            goals = state.get('goals', [])
-            
-            task = _find_task_by_id(tasks, tracker['task_id'])
+            task = state_manager.index.task(tracker['task_id'])
             if not task:
                 logger.warning(f"Task {tracker['task_id']} not found for tracker {tracker['tracker_id']}")
                 return
-                
-            # Use AI to generate natural check-in message
-            from ..engine.conversation import NaviConversationEngine
-            
-            # Create conversation engine for this user
-            engine = NaviConversationEngine(state_manager)
             
             # Build context for the AI check-in
             task_description = task.get('description', 'Unknown task')
@@ -148,7 +143,7 @@ class ProgressTrackerScheduler:
             # Get goal context
             goal_title = ""
             if task.get('goal_id'):
-                goal = _find_goal_by_id(goals, task['goal_id'])
+                goal = state_manager.index.goal(task['goal_id'])
                 goal_title = goal['title'] if goal else ""
             
             # Create a clear SYSTEM-triggered check-in prompt
@@ -181,7 +176,7 @@ This is an AUTOMATED SYSTEM-GENERATED progress check-in that has reached its sch
             )
             
             # Generate AI response
-            response = await engine.process_message(check_in_prompt)
+            response = await engine.process_message(check_in_prompt, flow='tracker')
             
             # Add AI response to chat history with proper tags
             if response.strategize_text or response.message_text:
@@ -190,7 +185,7 @@ This is an AUTOMATED SYSTEM-GENERATED progress check-in that has reached its sch
                     full_response += f"<strategize>{response.strategize_text}</strategize>\n"
                 if response.message_text:
                     full_response += f"<message>{response.message_text}</message>"
-                
+            
                 self._add_to_chat_history(state_manager,
                     role="model",
                     content=full_response,
@@ -214,9 +209,6 @@ This is an AUTOMATED SYSTEM-GENERATED progress check-in that has reached its sch
                 parse_mode='Markdown'
             )
             
-            # Save the conversation state after AI interaction
-            engine.save_state()
-            
             logger.info(f"Sent AI-generated progress notification to {user_email} for task {task['task_id']}")
             
         except TelegramError as e:
@@ -225,7 +217,8 @@ This is an AUTOMATED SYSTEM-GENERATED progress check-in that has reached its sch
             logger.error(f"Error sending progress notification: {e}")
             # Fallback to simple message if AI fails
             try:
-                fallback_message = f"🌟 Hey! Just checking in on your task: {task.get('description', 'your task')}\n\nHow's it going? I'm here to help!"
+                description = task.get('description', 'your task') if task else 'your task'
+                fallback_message = f"🌟 Hey! Just checking in on your task: {description}\n\nHow's it going? I'm here to help!"
                 await self.bot.send_message(
                     chat_id=telegram_id,
                     text=fallback_message
@@ -239,21 +232,9 @@ This is an AUTOMATED SYSTEM-GENERATED progress check-in that has reached its sch
         if not datetime_str:
             return None
             
-        # Try multiple date formats
-        formats = [
-            "%Y-%m-%d %H:%M",
-            "%Y-%m-%d %H:%M:%S",
-            "%d/%m/%y %H:%M",
-            "%d/%m/%Y %H:%M",
-            "%Y-%m-%dT%H:%M:%S",
-            "%Y-%m-%dT%H:%M:%S.%f"
-        ]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(datetime_str, fmt)
-            except ValueError:
-                continue
+        parsed = parse_check_in_time(datetime_str)
+        if parsed:
+            return parsed
                 
         logger.warning(f"Could not parse datetime: {datetime_str}")
         return None
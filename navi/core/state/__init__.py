@@ -4,5 +4,11 @@ Handles user state persistence and management
 """
 
 from .manager import StateManager
+from .storage import StateStorage, JsonFileStorage, create_storage
+from .sqlite_storage import SQLiteStorage
+from .registry import StateManagerRegistry, state_registry, get_state_manager
 
-__all__ = ['StateManager']
\ No newline at end of file
+__all__ = [
+    'StateManager', 'StateStorage', 'JsonFileStorage', 'SQLiteStorage', 'create_storage',
+    'StateManagerRegistry', 'state_registry', 'get_state_manager'
+]
\ No newline at end of file
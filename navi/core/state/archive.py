@@ -0,0 +1,239 @@
+"""
+History Archive
+Day-segmented JSONL storage for chat history and logs, kept out of the main state document
+"""
+
+import os
+import uuid
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+from ...utils import fast_json
+from ...utils.atomic_write import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Collections stored in the archive instead of the main state document
+ARCHIVED_KEYS = ('chat_history', 'tool_execution_log', 'gemini_api_log', 'hourly_reflections')
+
+
+class HistoryArchive:
+    """
+    Append-only segment files per collection plus an index.
+
+    Each collection is split into segments holding the items of one day (by the
+    item's timestamp), capped at SEGMENT_MAX_ITEMS. The index records, per
+    segment, its file, how many lines and bytes it holds and how many leading
+    lines were trimmed off the front of the collection, so readers can open only
+    the segments covering the range they need.
+    """
+
+    SEGMENT_MAX_ITEMS = 1000
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self._index: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._lock = threading.RLock()
+
+    # --- Reading -------------------------------------------------------------
+
+    def exists(self) -> bool:
+        return os.path.exists(self.index_path)
+
+    def collections(self) -> List[str]:
+        """Collections that have an entry in the index"""
+        with self._lock:
+            return list(self._load_index())
+
+    def count(self, key: str) -> int:
+        """Number of live items in a collection"""
+        with self._lock:
+            return sum(seg['count'] - seg['skip'] for seg in self._load_index().get(key, []))
+
+    def read(self, key: str) -> List[Any]:
+        """All live items of a collection, oldest first"""
+        return self.read_range(key, 0, None)
+
+    def read_range(self, key: str, start: int, stop: Optional[int]) -> List[Any]:
+        """Live items [start:stop) of a collection, reading only the segments that overlap"""
+        with self._lock:
+            items = []
+            position = 0
+            for seg in self._load_index().get(key, []):
+                live = seg['count'] - seg['skip']
+                seg_start, seg_stop = position, position + live
+                position = seg_stop
+                if seg_stop <= start:
+                    continue
+                if stop is not None and seg_start >= stop:
+                    break
+                lines = self._read_segment(key, seg)
+                lo = max(start - seg_start, 0)
+                hi = live if stop is None else min(stop - seg_start, live)
+                items.extend(fast_json.loads(line) for line in lines[lo:hi])
+            return items
+
+    # --- Writing -------------------------------------------------------------
+
+    def apply(self, ops: List[Dict[str, Any]]):
+        """Apply StateChangeTracker ops for archived collections."""
+        if not ops:
+            return
+        with self._lock:
+            index = self._load_index()
+            obsolete = []
+            try:
+                for op in ops:
+                    kind, key = op['op'], op['key']
+                    if kind in ('set', 'del'):
+                        obsolete.extend((key, seg['file']) for seg in index.pop(key, []))
+                        if kind == 'set':
+                            index[key] = []
+                            self._append(key, index[key], op.get('value') or [])
+                    elif kind == 'extend':
+                        segments = index.setdefault(key, [])
+                        obsolete.extend((key, name) for name in self._drop(key, segments, op.get('drop', 0)))
+                        self._append(key, segments, op.get('items', []))
+
+                # Segment data is durable before the index that references it, and
+                # files are only removed once the index no longer does
+                self._save_index()
+            except Exception:
+                # The cached index may be half-updated; fall back to the one on disk
+                self._index = None
+                raise
+            for key, name in obsolete:
+                self._remove_file(key, name)
+
+    def replace_all(self, collections: Dict[str, List[Any]]):
+        """Replace the whole archive with the given collections."""
+        with self._lock:
+            index = self._load_index()
+            ops = [{'op': 'del', 'key': key} for key in index if key not in collections]
+            ops += [{'op': 'set', 'key': key, 'value': value} for key, value in collections.items()]
+            self.apply(ops)
+
+    def clear(self):
+        """Remove every segment and the index."""
+        with self._lock:
+            if not self.exists():
+                return
+            index = self._load_index()
+            os.remove(self.index_path)
+            for key, segments in index.items():
+                for seg in segments:
+                    self._remove_file(key, seg['file'])
+            self._index = {}
+
+    # --- Internals -----------------------------------------------------------
+
+    def _load_index(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._index is None:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'rb') as f:
+                    self._index = fast_json.loads(f.read())
+            else:
+                self._index = {}
+        return self._index
+
+    def reload_index(self):
+        """Drop the cached index so the next read picks up other processes' writes"""
+        with self._lock:
+            self._index = None
+
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write(self.index_path, fast_json.dumps(self._index))
+
+    def _segment_path(self, key: str, name: str) -> str:
+        return os.path.join(self.directory, key, name)
+
+    def _read_segment(self, key: str, seg: Dict[str, Any]) -> List[bytes]:
+        with open(self._segment_path(key, seg['file']), 'rb') as f:
+            lines = f.read().splitlines()
+        # Lines past 'count' are from an append whose index update never landed
+        return lines[seg['skip']:seg['count']]
+
+    def _drop(self, key: str, segments: List[Dict[str, Any]], drop: int) -> List[str]:
+        """Trim items off the front; returns files that are no longer referenced"""
+        removed = []
+        while drop and segments:
+            seg = segments[0]
+            live = seg['count'] - seg['skip']
+            if drop >= live:
+                removed.append(segments.pop(0)['file'])
+                drop -= live
+            else:
+                seg['skip'] += drop
+                drop = 0
+                if seg['skip'] * 2 > seg['count']:
+                    removed.append(self._rewrite_segment(key, seg))
+        return removed
+
+    def _rewrite_segment(self, key: str, seg: Dict[str, Any]) -> str:
+        """Copy a mostly-trimmed segment's live lines to a new file; returns the old file name"""
+        lines = self._read_segment(key, seg)
+        data = b''.join(line + b'\n' for line in lines)
+        old_file = seg['file']
+        seg['file'] = self._new_file_name(seg['day'])
+        atomic_write(self._segment_path(key, seg['file']), data)
+        seg['skip'], seg['count'], seg['bytes'] = 0, len(lines), len(data)
+        return old_file
+
+    def _append(self, key: str, segments: List[Dict[str, Any]], items: List[Any]):
+        if not items:
+            return
+        os.makedirs(os.path.join(self.directory, key), exist_ok=True)
+
+        pending: List[bytes] = []
+        for item in items:
+            day = self._day_of(item)
+            last = segments[-1] if segments else None
+            # Segments stay in order even if an item carries an older timestamp
+            if last is not None and day < last['day']:
+                day = last['day']
+            if last is None or day != last['day'] or last['count'] + len(pending) >= self.SEGMENT_MAX_ITEMS:
+                self._write_lines(key, last, pending)
+                pending = []
+                last = {'file': self._new_file_name(day), 'day': day, 'skip': 0, 'count': 0, 'bytes': 0}
+                segments.append(last)
+            pending.append(fast_json.dumps(item) + b'\n')
+        self._write_lines(key, segments[-1], pending)
+
+    def _write_lines(self, key: str, seg: Optional[Dict[str, Any]], lines: List[bytes]):
+        if seg is None or not lines:
+            return
+        data = b''.join(lines)
+        with open(self._segment_path(key, seg['file']), 'ab') as f:
+            # Drop anything left by an append whose index update never landed
+            if f.tell() != seg['bytes']:
+                f.truncate(seg['bytes'])
+                f.seek(seg['bytes'])
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        seg['count'] += len(lines)
+        seg['bytes'] += len(data)
+
+    def _remove_file(self, key: str, name: str):
+        try:
+            os.remove(self._segment_path(key, name))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _new_file_name(day: str) -> str:
+        return f"{day}-{uuid.uuid4().hex[:8]}.jsonl"
+
+    @staticmethod
+    def _day_of(item: Any) -> str:
+        timestamp = item.get('timestamp') if isinstance(item, dict) else None
+        if isinstance(timestamp, str) and len(timestamp) >= 10:
+            try:
+                return datetime.strptime(timestamp[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+            except ValueError:
+                pass
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
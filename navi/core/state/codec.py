@@ -0,0 +1,113 @@
+"""
+State Codec
+On-disk encodings for state snapshots (pretty JSON, compact JSON, msgpack) with optional zstd
+"""
+
+import os
+import logging
+from typing import Any, Optional
+
+from ...utils import fast_json
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ormsgpack
+except ImportError:  # pragma: no cover - optional dependency
+    ormsgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+STATE_FORMATS = ('json', 'compact', 'msgpack')
+STATE_COMPRESSIONS = ('none', 'zstd')
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+ZSTD_LEVEL = 3
+
+# Bytes a JSON document can start with (msgpack maps start with 0x80-0x8f, 0xde or 0xdf)
+_JSON_START = frozenset(b'{["tfn-0123456789 \t\r\n')
+
+
+class StateCodecError(Exception):
+    """Raised when a state file uses an encoding that can't be read here."""
+
+
+def detect_format(data: bytes) -> str:
+    """Identify the encoding of stored state bytes: 'zstd', 'json' or 'msgpack'."""
+    if data.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    if not data or data[0] in _JSON_START:
+        return 'json'
+    return 'msgpack'
+
+
+def decode_state(data: bytes) -> Optional[Any]:
+    """Decode stored state in any supported encoding; None for an empty file."""
+    fmt = detect_format(data)
+    if fmt == 'zstd':
+        if zstandard is None:
+            raise StateCodecError("State file is zstd-compressed but zstandard is not installed")
+        data = zstandard.ZstdDecompressor().decompress(data, max_output_size=1 << 31)
+        fmt = detect_format(data)
+
+    if fmt == 'msgpack':
+        if ormsgpack is None:
+            raise StateCodecError("State file is msgpack-encoded but ormsgpack is not installed")
+        return ormsgpack.unpackb(data)
+
+    if not data.strip():
+        return None
+    return fast_json.loads(data)
+
+
+class StateCodec:
+    """Encodes state snapshots in the configured format; decoding auto-detects."""
+
+    def __init__(self, state_format: Optional[str] = None, compression: Optional[str] = None):
+        state_format = (state_format or os.environ.get('NAVI_STATE_FORMAT', 'json')).lower()
+        compression = (compression or os.environ.get('NAVI_STATE_COMPRESSION', 'none')).lower()
+
+        if state_format not in STATE_FORMATS:
+            logger.warning(f"Unknown state format '{state_format}', falling back to json")
+            state_format = 'json'
+        if state_format == 'msgpack' and ormsgpack is None:
+            logger.warning("NAVI_STATE_FORMAT=msgpack but ormsgpack is not installed, using compact json")
+            state_format = 'compact'
+
+        if compression not in STATE_COMPRESSIONS:
+            logger.warning(f"Unknown state compression '{compression}', storing uncompressed")
+            compression = 'none'
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("NAVI_STATE_COMPRESSION=zstd but zstandard is not installed, storing uncompressed")
+            compression = 'none'
+
+        self.format = state_format
+        self.compression = compression
+
+    def encode(self, state: Any) -> bytes:
+        if self.format == 'msgpack':
+            data = ormsgpack.packb(state, option=ormsgpack.OPT_NON_STR_KEYS)
+        else:
+            data = fast_json.dumps(state, pretty=self.format == 'json')
+
+        if self.compression == 'zstd':
+            data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        return data
+
+    def decode(self, data: bytes) -> Optional[Any]:
+        return decode_state(data)
+
+    def matches(self, data: bytes) -> bool:
+        """Whether stored bytes are already in this codec's encoding"""
+        fmt = detect_format(data)
+        if fmt == 'zstd':
+            return self.compression == 'zstd'
+        if self.compression == 'zstd':
+            return False
+        if fmt == 'msgpack':
+            return self.format == 'msgpack'
+        pretty = b'\n' in data[:64]
+        return self.format == ('json' if pretty else 'compact')
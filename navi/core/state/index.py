@@ -0,0 +1,176 @@
+"""
+State Index
+Secondary indexes over goals, tasks and progress trackers for constant-time lookups
+"""
+
+import bisect
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Indexed collections: (id field, grouped fields)
+INDEXED_COLLECTIONS = {
+    'goals': ('goal_id', ()),
+    'tasks': ('task_id', ('goal_id', 'status')),
+    'progress_trackers': ('tracker_id', ('task_id',)),
+}
+
+
+def _status_key(value: Any) -> str:
+    return str(value).upper() if value is not None else ''
+
+
+# Grouped fields whose values are normalized before grouping
+_GROUP_KEYS: Dict[str, Callable[[Any], Any]] = {'status': _status_key}
+
+
+def _group_key(field: str, value: Any) -> Any:
+    normalize = _GROUP_KEYS.get(field)
+    return normalize(value) if normalize else value
+
+
+class _CollectionIndex:
+    """By-id map and per-field groups for one list of dicts, in list order"""
+
+    def __init__(self, items: List[Dict[str, Any]], id_field: str, group_fields: Tuple[str, ...]):
+        self.items = items
+        self.id_field = id_field
+        self.group_fields = group_fields
+        self.by_id: Dict[Any, Dict[str, Any]] = {}
+        self.groups: Dict[str, Dict[Any, List[Dict[str, Any]]]] = {field: {} for field in group_fields}
+        # Position of each item (by identity) in the list, to keep groups in list order
+        self.positions: Dict[int, int] = {}
+        for item in items:
+            self._add(item)
+        self.length = len(items)
+        self.last = items[-1] if items else None
+
+    def is_current(self, items: List[Dict[str, Any]]) -> bool:
+        """Cheap check that the list wasn't replaced, grown or shrunk behind our back"""
+        return (items is self.items and len(items) == self.length
+                and (items[-1] if items else None) is self.last)
+
+    def added(self, item: Dict[str, Any]) -> bool:
+        """Index an item just appended to the list; False if the index had drifted"""
+        items = self.items
+        if len(items) != self.length + 1 or not items or items[-1] is not item:
+            return False
+        if self.length and items[-2] is not self.last:
+            return False
+        self._add(item)
+        self.length = len(items)
+        self.last = item
+        return True
+
+    def changed(self, item: Dict[str, Any], field: str, old_value: Any):
+        """Move an item whose field was reassigned in place"""
+        if field == self.id_field:
+            if self.by_id.get(old_value) is item:
+                del self.by_id[old_value]
+                # Another item may share the old id; the first one wins, as in a linear scan
+                for other in self.items:
+                    if other is not item and other.get(self.id_field) == old_value:
+                        self.by_id[old_value] = other
+                        break
+            current = self.by_id.get(item.get(self.id_field))
+            if current is None or self.positions[id(item)] < self.positions[id(current)]:
+                self.by_id[item.get(self.id_field)] = item
+        elif field in self.groups:
+            old_key, new_key = _group_key(field, old_value), _group_key(field, item.get(field))
+            if old_key == new_key:
+                return
+            groups = self.groups[field]
+            old_group = groups.get(old_key, [])
+            for i, other in enumerate(old_group):
+                if other is item:
+                    del old_group[i]
+                    break
+            if not old_group:
+                groups.pop(old_key, None)
+            bisect.insort(groups.setdefault(new_key, []), item, key=lambda it: self.positions[id(it)])
+
+    def _add(self, item: Dict[str, Any]):
+        self.positions[id(item)] = len(self.positions)
+        self.by_id.setdefault(item.get(self.id_field), item)
+        for field in self.group_fields:
+            self.groups[field].setdefault(_group_key(field, item.get(field)), []).append(item)
+
+
+class StateIndex:
+    """
+    Secondary indexes over the live state's goals, tasks and progress trackers.
+
+    Goals, tasks and trackers are indexed by id; tasks also by goal_id and by
+    (case-insensitive) status, trackers by task_id. The tool functions report
+    appends and field updates through note_added() and note_changed() so the
+    indexes stay current incrementally. A collection whose list was replaced,
+    grown or shrunk some other way is rebuilt on its next lookup.
+    """
+
+    def __init__(self, get_state: Callable[[], Dict[str, Any]]):
+        self._get_state = get_state
+        self._indexes: Dict[str, _CollectionIndex] = {}
+
+    def _collection(self, name: str) -> _CollectionIndex:
+        items = self._get_state().get(name)
+        if not isinstance(items, list):
+            items = []
+        index = self._indexes.get(name)
+        if index is None or not index.is_current(items):
+            id_field, group_fields = INDEXED_COLLECTIONS[name]
+            index = _CollectionIndex(items, id_field, group_fields)
+            self._indexes[name] = index
+        return index
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop one collection's index (or all of them); rebuilt on next use"""
+        if name is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(name, None)
+
+    # --- Maintenance ---------------------------------------------------------
+
+    def note_added(self, name: str, item: Dict[str, Any]):
+        """Record an item just appended to state[name]"""
+        index = self._indexes.get(name)
+        if index is not None and not index.added(item):
+            self.invalidate(name)
+
+    def note_changed(self, name: str, item: Dict[str, Any], field: str, old_value: Any):
+        """Record that item[field] was reassigned from old_value"""
+        index = self._indexes.get(name)
+        if index is None:
+            return
+        if index.positions.get(id(item)) is None or not index.is_current(self._get_state().get(name)):
+            self.invalidate(name)
+            return
+        index.changed(item, field, old_value)
+
+    # --- Lookups -------------------------------------------------------------
+
+    def goal(self, goal_id: Any) -> Optional[Dict[str, Any]]:
+        return self._collection('goals').by_id.get(goal_id)
+
+    def task(self, task_id: Any) -> Optional[Dict[str, Any]]:
+        return self._collection('tasks').by_id.get(task_id)
+
+    def tracker(self, tracker_id: Any) -> Optional[Dict[str, Any]]:
+        return self._collection('progress_trackers').by_id.get(tracker_id)
+
+    def tasks_for_goal(self, goal_id: Any) -> List[Dict[str, Any]]:
+        """Tasks belonging to a goal, in list order"""
+        return list(self._collection('tasks').groups['goal_id'].get(goal_id, []))
+
+    def tasks_with_status(self, status: str) -> List[Dict[str, Any]]:
+        """Tasks whose status matches, ignoring case, in list order"""
+        return list(self._collection('tasks').groups['status'].get(_status_key(status), []))
+
+    def trackers_for_task(self, task_id: Any) -> List[Dict[str, Any]]:
+        return list(self._collection('progress_trackers').groups['task_id'].get(task_id, []))
+
+    def orphan_tasks(self) -> List[Dict[str, Any]]:
+        """Tasks whose goal_id matches no goal, in list order"""
+        goals = self._collection('goals').by_id
+        return [task for task in self._collection('tasks').items if task.get('goal_id') not in goals]
@@ -0,0 +1,358 @@
+"""
+State Journal
+Append-only write-ahead log for user state with background snapshot compaction
+"""
+
+import os
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+from ...utils import fast_json
+from ...utils.atomic_write import atomic_write
+from ...utils.file_lock import lock_for
+from .codec import StateCodec, decode_state
+
+logger = logging.getLogger(__name__)
+
+# Collections that only ever grow at the tail (or get trimmed at the head).
+# These are journaled as appends instead of full rewrites.
+APPEND_ONLY_KEYS = ('chat_history', 'tool_execution_log', 'gemini_api_log', 'hourly_reflections', 'insights')
+
+# Snapshot key recording the last journal record folded into the snapshot
+JOURNAL_SEQ_KEY = '_journal_seq'
+
+
+def _dumps(value) -> bytes:
+    return fast_json.dumps(value, sort_keys=True)
+
+
+def apply_ops(state: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply journaled operations to a state dict in place and return it."""
+    for op in ops:
+        kind = op.get('op')
+        key = op.get('key')
+        if kind == 'set':
+            state[key] = op.get('value')
+        elif kind == 'del':
+            state.pop(key, None)
+        elif kind == 'extend':
+            current = state.get(key)
+            if not isinstance(current, list):
+                current = []
+            drop = op.get('drop', 0)
+            state[key] = current[drop:] + op.get('items', [])
+        else:
+            logger.warning(f"Skipping unknown journal op: {kind}")
+    return state
+
+
+class StateChangeTracker:
+    """
+    Remembers what was last persisted and turns the current state into a list of ops.
+
+    Append-only collections are compared by per-item fingerprints, so a turn that adds
+    two messages produces an 'extend' op with two items. Everything else is compared
+    as a serialized blob and rewritten with a 'set' op when it changed.
+    """
+
+    def __init__(self):
+        self._blobs: Dict[str, bytes] = {}
+        self._fingerprints: Dict[str, List[bytes]] = {}
+        # Chat messages don't change once written, so their fingerprints are reused by identity
+        self._message_fingerprints: Dict[int, tuple] = {}
+        self._has_baseline = False
+
+    @property
+    def has_baseline(self) -> bool:
+        return self._has_baseline
+
+    def reset(self, state: Dict[str, Any]):
+        """Record the given state as fully persisted."""
+        self._blobs, self._fingerprints = {}, {}
+        for key, value in state.items():
+            if key in APPEND_ONLY_KEYS and isinstance(value, list):
+                self._fingerprints[key] = self._list_fingerprints(key, value)
+            else:
+                self._blobs[key] = _dumps(value)
+        self._has_baseline = True
+
+    def track(self, key: str, value: Any):
+        """Record a single key as persisted (for collections loaded after the rest of the state)."""
+        self._blobs.pop(key, None)
+        self._fingerprints.pop(key, None)
+        if key in APPEND_ONLY_KEYS and isinstance(value, list):
+            self._fingerprints[key] = self._list_fingerprints(key, value)
+        else:
+            self._blobs[key] = _dumps(value)
+
+    def baseline(self, key: str) -> Any:
+        """The last persisted value of a non-append-only key (None if untracked)"""
+        blob = self._blobs.get(key)
+        return fast_json.loads(blob) if blob is not None else None
+
+    def is_tracked(self, key: str) -> bool:
+        return key in self._blobs or key in self._fingerprints
+
+    def matches(self, key: str, value: Any) -> bool:
+        """Whether value equals the last persisted value of a non-append-only key"""
+        return key in self._blobs and self._blobs[key] == _dumps(value)
+
+    def diff(self, state: Dict[str, Any]):
+        """
+        Compare state against the last persisted version.
+
+        Returns (ops, pending) where pending must be passed to commit() once the ops
+        have been written durably.
+        """
+        ops = []
+        blobs, fingerprints = {}, {}
+
+        for key, value in state.items():
+            if key in APPEND_ONLY_KEYS and isinstance(value, list):
+                new_fps = self._list_fingerprints(key, value)
+                fingerprints[key] = new_fps
+                op = self._list_op(key, value, new_fps)
+                if op:
+                    ops.append(op)
+            else:
+                blob = _dumps(value)
+                blobs[key] = blob
+                if self._blobs.get(key) != blob:
+                    ops.append({'op': 'set', 'key': key, 'value': value})
+
+        for key in list(self._blobs) + list(self._fingerprints):
+            if key not in state:
+                ops.append({'op': 'del', 'key': key})
+
+        return ops, (blobs, fingerprints)
+
+    def commit(self, pending):
+        """Adopt the state described by a previous diff() as persisted."""
+        self._blobs, self._fingerprints = pending
+        self._has_baseline = True
+
+    def _list_op(self, key: str, items: List[Any], new_fps: List[bytes]) -> Optional[Dict[str, Any]]:
+        old_fps = self._fingerprints.get(key)
+        if old_fps is None:
+            return {'op': 'set', 'key': key, 'value': items}
+        if not old_fps:
+            return {'op': 'extend', 'key': key, 'items': items} if items else None
+
+        # Find the largest overlap where the new list starts with the tail of the old one
+        n_old = len(old_fps)
+        for last in range(min(len(new_fps), n_old) - 1, -1, -1):
+            if new_fps[last] != old_fps[-1]:
+                continue
+            drop = n_old - 1 - last
+            if new_fps[:last + 1] == old_fps[drop:]:
+                added = items[last + 1:]
+                if not added and not drop:
+                    return None
+                op = {'op': 'extend', 'key': key, 'items': added}
+                if drop:
+                    op['drop'] = drop
+                return op
+
+        return {'op': 'set', 'key': key, 'value': items}
+
+    def _list_fingerprints(self, key: str, items: List[Any]) -> List[bytes]:
+        if key != 'chat_history':
+            return [self._fingerprint(key, item) for item in items]
+        # Only the messages not seen in the last call are serialized
+        known, fingerprints = {}, []
+        for item in items:
+            cached = self._message_fingerprints.get(id(item))
+            fingerprint = cached[1] if cached is not None and cached[0] is item else self._fingerprint(key, item)
+            known[id(item)] = (item, fingerprint)
+            fingerprints.append(fingerprint)
+        self._message_fingerprints = known
+        return fingerprints
+
+    @staticmethod
+    def _fingerprint(key: str, item: Any) -> bytes:
+        # Older engines re-stamped chat messages on every save, so their
+        # timestamp is not part of their identity; nor is their cached token count
+        if key == 'chat_history' and isinstance(item, dict) and ('timestamp' in item or 'token_count' in item):
+            item = {k: v for k, v in item.items() if k not in ('timestamp', 'token_count')}
+        return _dumps(item)
+
+
+class StateJournal:
+    """Snapshot file plus an append-only journal of state changes."""
+
+    # Compact once the journal holds this many records, or grows past
+    # COMPACT_RATIO of the snapshot size (but never below COMPACT_MIN_BYTES)
+    COMPACT_MAX_RECORDS = 500
+    COMPACT_MIN_BYTES = 256 * 1024
+    COMPACT_RATIO = 0.5
+
+    def __init__(self, snapshot_path: str, codec: Optional[StateCodec] = None):
+        self.snapshot_path = snapshot_path
+        self.codec = codec or StateCodec()
+        self.journal_path = self.journal_path_for(snapshot_path)
+        self.tracker = StateChangeTracker()
+        self._seq = 0
+        self._records = 0
+        self._lock = threading.Lock()
+        self._snapshot_generation = 0
+        self._compaction_thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def journal_path_for(snapshot_path: str) -> str:
+        return snapshot_path + '.journal'
+
+    def replay(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply every journal record newer than the snapshot to it."""
+        snapshot_seq = snapshot.pop(JOURNAL_SEQ_KEY, 0)
+        self._seq = snapshot_seq
+        self._records = 0
+
+        for record in self._read_records():
+            seq = record.get('seq', 0)
+            if seq <= snapshot_seq:
+                continue
+            apply_ops(snapshot, record.get('ops', []))
+            self._seq = max(self._seq, seq)
+            self._records += 1
+
+        if self._records:
+            logger.debug(f"Replayed {self._records} journal records from {self.journal_path}")
+        return snapshot
+
+    def save(self, state: Dict[str, Any]):
+        """Persist state by appending the changes since the last save."""
+        if not self.tracker.has_baseline or not os.path.exists(self.snapshot_path):
+            self.write_snapshot(state)
+            return
+
+        ops, pending = self.tracker.diff(state)
+        if ops:
+            self.append(ops)
+        self.tracker.commit(pending)
+        self._maybe_compact()
+
+    def append(self, ops: List[Dict[str, Any]]):
+        """Append one record holding the given ops to the journal."""
+        with self._lock:
+            self._seq += 1
+            record = {
+                'seq': self._seq,
+                'ts': datetime.now(timezone.utc).isoformat(),
+                'ops': ops
+            }
+            line = fast_json.dumps(record) + b'\n'
+            with open(self.journal_path, 'ab') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._records += 1
+
+    def write_snapshot(self, state: Dict[str, Any]):
+        """Write a full snapshot of the given state and discard the journal."""
+        with self._lock:
+            snapshot = dict(state)
+            snapshot[JOURNAL_SEQ_KEY] = self._seq
+            self._write_snapshot_file(snapshot)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._records = 0
+            self._snapshot_generation += 1
+        self.tracker.reset(state)
+
+    def discard(self):
+        """Remove the journal file (used when a full state file supersedes it)."""
+        with self._lock:
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._records = 0
+
+    def _maybe_compact(self):
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        if not self._needs_compaction():
+            return
+
+        self._compaction_thread = threading.Thread(
+            target=self.compact, name=f"state-compaction:{self.snapshot_path}", daemon=True
+        )
+        self._compaction_thread.start()
+
+    def _needs_compaction(self) -> bool:
+        if self._records >= self.COMPACT_MAX_RECORDS:
+            return True
+        try:
+            journal_size = os.path.getsize(self.journal_path)
+            snapshot_size = os.path.getsize(self.snapshot_path)
+        except OSError:
+            return False
+        return journal_size >= max(self.COMPACT_MIN_BYTES, snapshot_size * self.COMPACT_RATIO)
+
+    def compact(self):
+        """Fold the journal into the snapshot without blocking writers for the slow part."""
+        try:
+            file_lock = lock_for(self.snapshot_path)
+            with file_lock.read(), self._lock:
+                generation = self._snapshot_generation
+                try:
+                    fold_upto = os.path.getsize(self.journal_path)
+                except OSError:
+                    return
+                with open(self.snapshot_path, 'rb') as f:
+                    snapshot_bytes = f.read()
+
+            snapshot = decode_state(snapshot_bytes)
+            snapshot_seq = snapshot.pop(JOURNAL_SEQ_KEY, 0)
+
+            folded_seq = snapshot_seq
+            for record in self._read_records(limit_bytes=fold_upto):
+                if record.get('seq', 0) <= snapshot_seq:
+                    continue
+                apply_ops(snapshot, record.get('ops', []))
+                folded_seq = max(folded_seq, record['seq'])
+
+            snapshot[JOURNAL_SEQ_KEY] = folded_seq
+
+            # The file lock keeps other processes from appending to the journal
+            # while its tail is carried over
+            with file_lock.write(), self._lock:
+                if generation != self._snapshot_generation:
+                    # A full snapshot was written meanwhile; our fold is stale
+                    return
+                with open(self.snapshot_path, 'rb') as f:
+                    if f.read() != snapshot_bytes:
+                        # ...or by another process
+                        return
+
+                # Records appended while we were folding stay in the journal
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(fold_upto)
+                    tail = f.read()
+                remaining = tail.count(b'\n')
+
+                self._write_snapshot_file(snapshot)
+                atomic_write(self.journal_path, tail)
+                self._records = remaining
+
+            logger.info(f"Compacted state journal {self.journal_path} up to record {folded_seq}")
+        except Exception as e:
+            logger.error(f"State journal compaction failed for {self.journal_path}: {e}")
+
+    def _write_snapshot_file(self, snapshot: Dict[str, Any]):
+        atomic_write(self.snapshot_path, self.codec.encode(snapshot))
+
+    def _read_records(self, limit_bytes: Optional[int] = None):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'rb') as f:
+            data = f.read() if limit_bytes is None else f.read(limit_bytes)
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                yield fast_json.loads(line)
+            except ValueError:
+                # A torn final line from a crash mid-append; nothing after it is valid
+                logger.warning(f"Ignoring truncated record in {self.journal_path}")
+                return
@@ -0,0 +1,145 @@
+"""
+Lazy State
+State dict whose heavy collections are only read from storage when first accessed
+"""
+
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyState(dict):
+    """
+    A dict that holds loaders for some keys instead of their values.
+
+    Indexing, get(), setdefault() and pop() on a pending key run its loader once
+    and store the result. Membership tests, len() and key iteration don't load
+    anything; items(), values() and equality load everything.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None,
+                 loaders: Optional[Dict[str, Callable[[], Any]]] = None):
+        super().__init__(data or {})
+        self._loaders: Dict[str, Callable[[], Any]] = {
+            key: loader for key, loader in (loaders or {}).items() if not dict.__contains__(self, key)
+        }
+        self._hooks: Dict[str, List[Callable[[Any], Any]]] = {}
+
+    # --- Lazy loading --------------------------------------------------------
+
+    def is_loaded(self, key: str) -> bool:
+        """Whether key is held in memory (False while its loader hasn't run)"""
+        return key not in self._loaders
+
+    def pending_keys(self) -> List[str]:
+        return list(self._loaders)
+
+    def on_load(self, key: str, hook: Callable[[Any], Any]):
+        """Transform a key's value when it is loaded (or now, if it already is)."""
+        if key in self._loaders:
+            self._hooks.setdefault(key, []).append(hook)
+        elif super().__contains__(key):
+            super().__setitem__(key, hook(super().__getitem__(key)))
+
+    def loaded_items(self):
+        """Items currently in memory, without running any loader"""
+        return super().items()
+
+    def adopt(self, other: 'LazyState'):
+        """Replace this dict's contents, pending loaders included, with another's"""
+        super().clear()
+        super().update(other.loaded_items())
+        self._loaders = dict(other._loaders)
+        self._hooks = {key: list(hooks) for key, hooks in other._hooks.items()}
+
+    def load_all(self):
+        for key in list(self._loaders):
+            self._load(key)
+
+    def _load(self, key: str):
+        loader = self._loaders.pop(key, None)
+        if loader is None:
+            return
+        value = loader()
+        for hook in self._hooks.pop(key, []):
+            value = hook(value)
+        super().__setitem__(key, value)
+
+    # --- dict interface ------------------------------------------------------
+
+    def __getitem__(self, key):
+        self._load(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._load(key)
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self._load(key)
+        return super().setdefault(key, default)
+
+    def pop(self, key, *default):
+        self._load(key)
+        return super().pop(key, *default)
+
+    def __setitem__(self, key, value):
+        self._loaders.pop(key, None)
+        self._hooks.pop(key, None)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if self._loaders.pop(key, None) is not None:
+            self._hooks.pop(key, None)
+            return
+        super().__delitem__(key)
+
+    def __contains__(self, key):
+        return key in self._loaders or super().__contains__(key)
+
+    def __len__(self):
+        return super().__len__() + len(self._loaders)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(super().keys())
+        yield from list(self._loaders)
+
+    def keys(self):
+        return list(super().keys()) + list(self._loaders)
+
+    def items(self):
+        self.load_all()
+        return super().items()
+
+    def values(self):
+        self.load_all()
+        return super().values()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        self._loaders.clear()
+        self._hooks.clear()
+        super().clear()
+
+    def copy(self) -> Dict[str, Any]:
+        self.load_all()
+        return dict(super().items())
+
+    def __eq__(self, other):
+        self.load_all()
+        if isinstance(other, LazyState):
+            other.load_all()
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        pending = f", pending={self.pending_keys()}" if self._loaders else ''
+        return f"LazyState({super().__repr__()}{pending})"
@@ -6,7 +6,17 @@ Handles loading and saving the application state to and from user-specific state
 import json
 import os
 import logging
+import functools
 from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from ...utils.file_lock import lock_for
+from .index import StateIndex
+from .journal import StateChangeTracker
+from .lazy import LazyState
+from .merge import merge_concurrent
+from .retention import ColdStorage, apply_retention, policy_for
+from .storage import StateStorageError, create_storage, page_of
 
 logger = logging.getLogger(__name__)
 
@@ -14,19 +24,91 @@ logger = logging.getLogger(__name__)
 class StateManager:
     """Handles loading and saving the application state to and from user-specific state files."""
 
-    def __init__(self, filepath='state.json', user_email=None):
+    def __init__(self, filepath='state.json', user_email=None, journaled=None, backend=None, segmented=None):
         if user_email:
             # Use user-specific state file
             user_dir = os.path.join('users', user_email)
             if not os.path.exists(user_dir):
                 os.makedirs(user_dir, exist_ok=True)
-            self.filepath = os.path.join(user_dir, 'state.json')
+            json_path = os.path.join(user_dir, 'state.json')
         else:
             # Use global state file (fallback)
-            self.filepath = filepath
-            
+            json_path = filepath
+
         self.user_email = user_email
-        self.state = self.load_state()
+
+        # Storage driver (json file by default, sqlite via NAVI_STATE_BACKEND)
+        self.storage = create_storage(json_path, backend=backend, journaled=journaled, segmented=segmented)
+        self.filepath = self.storage.path
+
+        # State is loaded on first access so index-backed queries can skip it
+        self._state = None
+
+        # Signature of the stored files as of our last load or save
+        self._signature = None
+
+        # Advisory lock shared with other processes using the same state file:
+        # loads hold it shared, saves exclusively
+        self.lock = lock_for(self.storage.path)
+
+        # Optimistic concurrency: the version stamp (metadata.version) we last
+        # loaded or saved, and what the state looked like then, so a save that
+        # finds the stored state changed can merge instead of overwriting it
+        self.version = 0
+        self._baseline = StateChangeTracker()
+
+        # Id/goal/status indexes over the live state, maintained by the tools
+        self.index = StateIndex(self.get_state)
+
+    @property
+    def state(self):
+        """The live state dict, loaded from storage on first access"""
+        if self._state is None:
+            self._state = self.load_state()
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        self._state = value
+        self.index.invalidate()
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the full state has been materialized in memory"""
+        return self._state is not None
+
+    def is_stale(self) -> bool:
+        """Whether the stored state was changed by someone else since we loaded or saved it"""
+        if not self.is_loaded:
+            return False
+        signature = self.storage.signature()
+        return signature is not None and signature != self._signature
+
+    def reload_if_stale(self) -> bool:
+        """
+        Reload the state in place if another process has written it.
+
+        Changes not saved yet are replayed onto the reloaded state, as a save
+        would (see merge_concurrent), so they survive and go out with the next
+        save. The existing dict is updated rather than replaced, so references
+        handed out by get_state() stay valid. Returns True when a reload happened.
+        """
+        if not self.is_stale():
+            return False
+
+        logger.info(f"State for {self.user_email or self.filepath} changed on disk, reloading")
+        return self._merge_onto_stored(self._serialize_live_state(self._state))
+
+    def _adopt(self, fresh):
+        """Replace the live state's contents with a freshly loaded state"""
+        live = self._state
+        if isinstance(live, LazyState) and isinstance(fresh, LazyState):
+            live.adopt(fresh)
+        else:
+            live.clear()
+            live.update(fresh)
+        self._state = live
+        self.index.invalidate()
 
     def get_default_state(self):
         """Returns the default structure for the state."""
@@ -44,10 +126,10 @@ class StateManager:
 
     def load_state(self):
         """
-        Loads state from the JSON file, validating its structure and cleaning it before returning.
+        Loads state from storage, validating its structure and cleaning it before returning.
         """
         logger.debug("Attempting to load state from %s", self.filepath)
-        if not os.path.exists(self.filepath):
+        if not self.storage.exists():
             logger.debug("State file not found. Creating a new one.")
             state = self.get_default_state()
             self.state = state # Set internal state before saving
@@ -55,61 +137,171 @@ class StateManager:
             return state
         
         try:
-            with open(self.filepath, 'r') as f:
-                raw_file_content = f.read()
-                if not raw_file_content.strip():
-                    logger.debug("state.json is empty. Starting with default state.")
-                    return self.get_default_state()
-                
-                f.seek(0)
-                loaded_data = json.load(f)
-
-                # --- THE CRITICAL FIX ---
-                # Ensure the loaded data is a dictionary, not a list or something else.
-                if not isinstance(loaded_data, dict):
-                    logger.warning("state.json contains invalid data (not a dictionary). Starting fresh.")
-                    return self.get_default_state()
+            with self.lock.read():
+                self._signature = self.storage.signature()
+                loaded_data = self.storage.read()
+            if loaded_data is None:
+                logger.debug("state.json is empty. Starting with default state.")
+                return self.get_default_state()
+
+            # --- THE CRITICAL FIX ---
+            # Ensure the loaded data is a dictionary, not a list or something else.
+            if not isinstance(loaded_data, dict):
+                logger.warning("state.json contains invalid data (not a dictionary). Starting fresh.")
+                return self.get_default_state()
 
+            # Pretty-printing a large history is expensive; only do it when it will be logged
+            if logger.isEnabledFor(logging.DEBUG):
                 logger.debug("JSON data loaded from state.json:\n%s", json.dumps(loaded_data, indent=2))
 
-                if 'chat_history' in loaded_data and isinstance(loaded_data['chat_history'], list):
-                    clean_history = self._clean_history_data(loaded_data['chat_history'])
-                    loaded_data['chat_history'] = clean_history
-                
-                # Ensure all required fields exist (add missing fields from default state)
-                default_state = self.get_default_state()
-                for key, default_value in default_state.items():
-                    if key not in loaded_data:
-                        loaded_data[key] = default_value
-                        logger.info(f"Added missing field '{key}' to existing state")
-                
+            if isinstance(loaded_data, LazyState) and not loaded_data.is_loaded('chat_history'):
+                # Archived history is cleaned when it is first read
+                loaded_data.on_load('chat_history', self._clean_history_data)
+            elif 'chat_history' in loaded_data and isinstance(loaded_data['chat_history'], list):
+                clean_history = self._clean_history_data(loaded_data['chat_history'])
+                loaded_data['chat_history'] = clean_history
+            
+            # Ensure all required fields exist (add missing fields from default state)
+            default_state = self.get_default_state()
+            for key, default_value in default_state.items():
+                if key not in loaded_data:
+                    loaded_data[key] = default_value
+                    logger.info(f"Added missing field '{key}' to existing state")
+            
+            if logger.isEnabledFor(logging.DEBUG):
                 logger.debug("State data after cleaning (to be used by app):\n%s", json.dumps(loaded_data, indent=2))
 
-                return loaded_data
+            self.storage.loaded(loaded_data)
+            self._track_baseline(loaded_data)
+            return loaded_data
 
-        except (json.JSONDecodeError, IOError) as e:
+        except (json.JSONDecodeError, IOError, StateStorageError) as e:
             logger.error("Error loading or parsing state file: %s. Starting with a default state.", e)
             return self.get_default_state()
 
     def save_state(self):
-        """Saves the current internal state to the JSON file."""
-        serializable_state = self._serialize_live_state(self.state)
-        
-        logger.debug("Saving the following state to state.json:\n%s", json.dumps(serializable_state, indent=2))
-        
-        with open(self.filepath, 'w') as f:
-            json.dump(serializable_state, f, indent=4)
+        """
+        Saves the current internal state to storage.
+
+        Holds the state file's write lock. If another process saved since we
+        loaded, our changes are merged onto its state (see merge_concurrent)
+        instead of overwriting it, and the live state becomes the merged one.
+        """
+        with self.lock.write():
+            serializable_state = self._serialize_live_state(self.state)
+            if self.is_stale() and self.storage.exists():
+                serializable_state = self._merge_concurrent_save(serializable_state)
+
+            metadata = serializable_state.get('metadata')
+            if isinstance(metadata, dict):
+                metadata['version'] = self.version + 1
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Saving the following state to state.json:\n%s", json.dumps(serializable_state, indent=2))
+
+            self.storage.write(serializable_state)
+            self._signature = self.storage.signature()
+            self.version += 1
+            self._baseline.reset(serializable_state)
+
+    def _merge_concurrent_save(self, ours: Dict[str, Any]) -> Dict[str, Any]:
+        """Reload the stored state and replay our unsaved changes onto it"""
+        if not self._merge_onto_stored(ours):
+            # The stored state couldn't be read; there is nothing to merge onto
+            logger.error(f"Could not reload state for {self.user_email or self.filepath}, overwriting it")
+            return ours
+        return self._serialize_live_state(self._state)
+
+    def _merge_onto_stored(self, ours: Dict[str, Any]) -> bool:
+        """Load the stored state, replay our changes since the baseline onto it and make it live; False if it couldn't be read"""
+        baseline, our_version = self._baseline, self.version
+        fresh = self.load_state()
+        if self._baseline is baseline:
+            return False
+        if self.version != our_version:
+            logger.info(f"State for {self.user_email or self.filepath} was saved elsewhere "
+                        f"(version {our_version} -> {self.version}), merging")
+        merge_concurrent(fresh, ours, baseline)
+        self._adopt(fresh)
+        return True
+
+    def _track_baseline(self, state):
+        """Remember a freshly loaded state as the base for merging our next save"""
+        metadata = state.get('metadata')
+        self.version = (metadata.get('version') if isinstance(metadata, dict) else None) or 0
+        self._baseline = StateChangeTracker()
+        if isinstance(state, LazyState):
+            self._baseline.reset(dict(state.loaded_items()))
+            for key in state.pending_keys():
+                state.on_load(key, functools.partial(self._track_loaded, key))
+        else:
+            self._baseline.reset(state)
+
+    def _track_loaded(self, key: str, value):
+        self._baseline.track(key, value)
+        return value
 
     def get_state(self):
         """Returns a direct reference to the current in-memory state object."""
         return self.state
 
+    def get_due_progress_trackers(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """PENDING progress trackers whose check-in time has arrived"""
+        now = now or datetime.now()
+        if not self.is_loaded and self.storage.supports_queries:
+            return self.storage.due_progress_trackers(None, now)
+        return self.storage.due_progress_trackers(self.state, now)
+
+    def get_recent_messages(self, role: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """The last `limit` chat messages, optionally filtered by role"""
+        if not self.is_loaded and self.storage.supports_queries:
+            return self.storage.recent_messages(None, role, limit)
+        return self.storage.recent_messages(self.state, role, limit)
+
+    def enforce_retention(self, collection: str, now: Optional[datetime] = None) -> int:
+        """
+        Apply the collection's retention policy to the live state.
+
+        Expired entries go to cold storage next to the state file and are rolled up
+        into state['rollups']; the caller saves as usual. Returns how many expired.
+        """
+        policy = policy_for(collection)
+        if policy is None:
+            return 0
+        try:
+            cold_storage = ColdStorage(os.path.splitext(self.storage.path)[0] + '.cold')
+            return apply_retention(self.state, collection, policy, cold_storage, now)
+        except Exception as e:
+            logger.error(f"Error applying retention to {collection}: {e}")
+            return 0
+
+    def get_history_page(self, key: str = 'chat_history', limit: int = 50,
+                         before: Optional[int] = None) -> Dict[str, Any]:
+        """
+        A page of a history/log collection, newest page first.
+
+        Returns {'items', 'start', 'total'}: items are collection[start:before]
+        (oldest first) with at most `limit` entries. Archived collections that
+        aren't loaded are read segment by segment instead of in full.
+        """
+        state = self.state
+        if isinstance(state, LazyState) and not state.is_loaded(key):
+            page = self.storage.read_collection_page(key, limit, before)
+            if page is not None:
+                if key == 'chat_history':
+                    page['items'] = self._clean_history_data(page['items'])
+                return page
+
+        return page_of(state.get(key, []), limit, before)
+
     def _serialize_live_state(self, state_dict):
         """
         Creates a copy of the state from live objects that is safe for JSON.
         """
         serializable_copy = {}
-        for key, value in state_dict.items():
+        # Collections that were never loaded are unchanged and left to storage
+        items = state_dict.loaded_items() if isinstance(state_dict, LazyState) else state_dict.items()
+        for key, value in items:
             if key == 'chat_history':
                 history_as_dicts = [self._content_obj_to_dict(c) for c in value]
                 serializable_copy[key] = self._clean_history_data(history_as_dicts)
@@ -181,8 +373,12 @@ class StateManager:
         logger.info(f"Resetting all data for user {self.user_email}")
         
         # Reset to default state
-        self.state = self.get_default_state()
-        self.save_state()
+        with self.lock.write():
+            self.state = self.get_default_state()
+            self.state['metadata']['version'] = self.version + 1
+            self.storage.write_full(self.state)
+            self._signature = self.storage.signature()
+            self._track_baseline(self.state)
         
         # Clear other user files if they exist
         if self.user_email:
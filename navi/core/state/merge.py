@@ -0,0 +1,161 @@
+"""
+Concurrent Save Merging
+Replays this process's unsaved changes onto state that another process saved in the meantime
+"""
+
+import logging
+from typing import Dict, List, Any
+
+from .journal import StateChangeTracker, apply_ops
+
+logger = logging.getLogger(__name__)
+
+# Collections of records with ids, merged record by record. Order matters:
+# ids renumbered in one collection are remapped in the ones after it.
+ID_COLLECTIONS = {
+    'goals': 'goal_id',
+    'tasks': 'task_id',
+    'progress_trackers': 'tracker_id',
+}
+
+# Fields holding ids of another collection's records
+ID_REFERENCES = {
+    'tasks': {'goal_id': 'goals'},
+    'progress_trackers': {'task_id': 'tasks'},
+}
+
+# Metadata counters handing out the ids of each collection
+ID_COUNTERS = {
+    'goals': 'next_goal_id',
+    'tasks': 'next_task_id',
+    'progress_trackers': 'next_progress_tracker_id',
+}
+
+
+def merge_concurrent(theirs: Dict[str, Any], ours: Dict[str, Any], baseline: StateChangeTracker) -> List[str]:
+    """
+    Apply the changes in `ours` since `baseline` onto `theirs`, in place.
+
+    Append-only collections get our new items appended after theirs. Goals,
+    tasks and trackers are merged per record; records both sides added under
+    the same id get a fresh id on our side. Other dicts are merged per field.
+    Where both sides changed the same value ours wins, and the key is returned
+    in the list of conflicts.
+    """
+    ops, _ = baseline.diff(ours)
+    order = list(ID_COLLECTIONS)
+    ops.sort(key=lambda op: order.index(op['key']) if op['key'] in ID_COLLECTIONS else len(order))
+
+    conflicts = []
+    remap: Dict[str, Dict[Any, Any]] = {}
+    for op in ops:
+        key = op['key']
+        if op['op'] != 'set':
+            apply_ops(theirs, [op])
+            continue
+
+        value = op['value']
+        current = theirs.get(key)
+        base = baseline.baseline(key)
+        if key in ID_COLLECTIONS and all(isinstance(v, list) for v in (base, value, current)):
+            # Even when only we changed it, references to renumbered ids need remapping
+            theirs[key] = _merge_records(key, base, value, current, remap, conflicts)
+        elif not baseline.is_tracked(key) or baseline.matches(key, current):
+            # Only we changed it
+            theirs[key] = value
+        elif all(isinstance(v, dict) for v in (base, value, current)):
+            theirs[key] = _merge_fields(key, base, value, current, conflicts)
+        else:
+            theirs[key] = value
+            conflicts.append(key)
+
+    _fix_counters(theirs)
+    if conflicts:
+        logger.warning(f"Concurrent changes to {', '.join(conflicts)}; kept this process's values")
+    return conflicts
+
+
+def _merge_records(key: str, base: List[Dict[str, Any]], ours: List[Dict[str, Any]],
+                   theirs: List[Dict[str, Any]], remap: Dict[str, Dict[Any, Any]],
+                   conflicts: List[str]) -> List[Dict[str, Any]]:
+    id_field = ID_COLLECTIONS[key]
+    base_by_id = {item.get(id_field): item for item in base}
+    result = list(theirs)
+    position = {item.get(id_field): i for i, item in enumerate(result)}
+    next_id = max([i for i in list(base_by_id) + list(position) + [item.get(id_field) for item in ours]
+                   if isinstance(i, int)] + [0]) + 1
+    references = ID_REFERENCES.get(key, {})
+    kept = set()
+
+    for item in ours:
+        item_id = item.get(id_field)
+        kept.add(item_id)
+        if base_by_id.get(item_id) == item:
+            continue
+
+        # Point our new or changed records at the ids they were renumbered to
+        for field, target in references.items():
+            if item.get(field) in remap.get(target, {}):
+                item[field] = remap[target][item.get(field)]
+
+        if item_id in base_by_id:
+            # Changed by us
+            if item_id in position:
+                if result[position[item_id]] != base_by_id[item_id]:
+                    conflicts.append(f"{key}[{item_id}]")
+                result[position[item_id]] = item
+            else:
+                # Deleted by them; keep our edit rather than lose it
+                conflicts.append(f"{key}[{item_id}]")
+                position[item_id] = len(result)
+                result.append(item)
+        else:
+            # Added by us
+            if item_id in position:
+                if result[position[item_id]] == item:
+                    continue
+                remap.setdefault(key, {})[item_id] = next_id
+                logger.info(f"Renumbered concurrently added {key} record {item_id} to {next_id}")
+                item[id_field] = item_id = next_id
+                next_id += 1
+            position[item_id] = len(result)
+            result.append(item)
+
+    # Records we deleted go, unless they changed them meanwhile
+    deleted = {item_id for item_id in base_by_id if item_id not in kept}
+    return [item for item in result
+            if item.get(id_field) not in deleted or item != base_by_id[item.get(id_field)]]
+
+
+def _merge_fields(key: str, base: Dict[str, Any], ours: Dict[str, Any], theirs: Dict[str, Any],
+                  conflicts: List[str]) -> Dict[str, Any]:
+    merged = dict(theirs)
+    for field in set(base) | set(ours):
+        if field not in ours:
+            if field in merged and merged[field] == base.get(field):
+                del merged[field]
+            continue
+        value = ours[field]
+        if field in base and value == base[field]:
+            continue
+        if key == 'metadata' and field.startswith('next_') and isinstance(merged.get(field), int) \
+                and isinstance(value, int):
+            # Id counters only move forward
+            merged[field] = max(value, merged[field])
+            continue
+        if field in merged and merged[field] != base.get(field) and merged[field] != value:
+            conflicts.append(f"{key}.{field}")
+        merged[field] = value
+    return merged
+
+
+def _fix_counters(state: Dict[str, Any]):
+    """Keep the id counters ahead of every id in use after a merge"""
+    metadata = state.get('metadata')
+    if not isinstance(metadata, dict):
+        return
+    for key, counter in ID_COUNTERS.items():
+        ids = [item.get(ID_COLLECTIONS[key]) for item in state.get(key) or [] if isinstance(item, dict)]
+        ids = [i for i in ids if isinstance(i, int)]
+        if ids and isinstance(metadata.get(counter), int):
+            metadata[counter] = max(metadata[counter], max(ids) + 1)
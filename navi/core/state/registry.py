@@ -0,0 +1,87 @@
+"""
+State Manager Registry
+Hands out one shared StateManager per user within a process
+"""
+
+import os
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Optional
+
+from .manager import StateManager
+
+logger = logging.getLogger(__name__)
+
+
+class StateManagerRegistry:
+    """
+    Process-wide cache of live StateManager instances keyed by user.
+
+    The most recently used managers are kept in an LRU. Evicted managers are only
+    tracked weakly, so one that is still held elsewhere (e.g. by a bot's engine) is
+    handed out again instead of being duplicated. Every lookup checks the stored
+    files' signature and reloads the state in place when another process wrote it,
+    keeping any changes not saved yet.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        if max_size is None:
+            max_size = int(os.environ.get('NAVI_STATE_CACHE_SIZE', '128'))
+        self.max_size = max(1, max_size)
+        self._managers: 'OrderedDict[str, StateManager]' = OrderedDict()
+        self._live = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, user_email: str) -> StateManager:
+        """Return the shared StateManager for a user, creating it on first use."""
+        with self._lock:
+            manager = self._managers.get(user_email)
+            if manager is not None:
+                self._managers.move_to_end(user_email)
+            else:
+                manager = self._live.get(user_email)
+                if manager is None:
+                    manager = StateManager(user_email=user_email)
+                    self._live[user_email] = manager
+                self._managers[user_email] = manager
+                self._evict()
+
+        try:
+            manager.reload_if_stale()
+        except Exception as e:
+            logger.error(f"Error revalidating state for {user_email}: {e}")
+        return manager
+
+    def discard(self, user_email: str):
+        """Forget a user's manager so the next lookup starts from storage."""
+        with self._lock:
+            self._managers.pop(user_email, None)
+            self._live.pop(user_email, None)
+
+    def clear(self):
+        """Forget every cached manager."""
+        with self._lock:
+            self._managers.clear()
+            self._live = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._managers)
+
+    def __contains__(self, user_email: str):
+        return user_email in self._managers
+
+    def _evict(self):
+        while len(self._managers) > self.max_size:
+            user_email, _ = self._managers.popitem(last=False)
+            logger.debug(f"Evicted idle state manager for {user_email}")
+
+
+# Global registry instance
+state_registry = StateManagerRegistry()
+
+
+def get_state_manager(user_email: str) -> StateManager:
+    """Shared StateManager for a user from the process-wide registry"""
+    return state_registry.get(user_email)
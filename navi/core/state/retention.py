@@ -0,0 +1,185 @@
+"""
+Retention Policies
+Bounds growth of reflection and insight logs, rolling expired entries up and archiving them cold
+"""
+
+import os
+import gzip
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+from ...utils import fast_json
+
+logger = logging.getLogger(__name__)
+
+# Field whose values are counted per day in the rollup of each collection
+ROLLUP_FIELDS = {
+    'hourly_reflections': 'action_taken',
+    'insights': 'type',
+}
+
+# State key holding per-collection, per-day rollups of expired entries
+ROLLUPS_KEY = 'rollups'
+
+
+@dataclass
+class RetentionPolicy:
+    """Limits for one collection; entries beyond any limit expire oldest first"""
+    max_count: Optional[int] = None
+    max_age_days: Optional[float] = None
+    max_bytes: Optional[int] = None
+
+    @classmethod
+    def parse(cls, spec: str) -> 'RetentionPolicy':
+        """Parse 'count=500,age_days=30,bytes=1048576' (any subset, 'none' to disable)"""
+        policy = cls()
+        for part in spec.split(','):
+            name, _, value = part.strip().partition('=')
+            if not name or name == 'none':
+                continue
+            try:
+                if name == 'count':
+                    policy.max_count = int(value)
+                elif name == 'age_days':
+                    policy.max_age_days = float(value)
+                elif name == 'bytes':
+                    policy.max_bytes = int(value)
+                else:
+                    logger.warning(f"Ignoring unknown retention setting '{name}'")
+            except ValueError:
+                logger.warning(f"Ignoring invalid retention value '{part}'")
+        return policy
+
+
+DEFAULT_POLICIES = {
+    'hourly_reflections': RetentionPolicy(max_count=500, max_age_days=30),
+    'insights': RetentionPolicy(max_count=200),
+}
+
+
+def policy_for(collection: str) -> Optional[RetentionPolicy]:
+    """Policy for a collection: NAVI_RETENTION_<COLLECTION> if set, else the default"""
+    spec = os.environ.get(f"NAVI_RETENTION_{collection.upper()}")
+    if spec is not None:
+        return RetentionPolicy.parse(spec)
+    return DEFAULT_POLICIES.get(collection)
+
+
+class ColdStorage:
+    """Gzipped JSONL files of expired entries, one per collection and month"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def archive(self, collection: str, entries: List[Any]):
+        by_month: Dict[str, List[bytes]] = {}
+        for entry in entries:
+            month = _day_of(entry)[:7] or 'undated'
+            by_month.setdefault(month, []).append(fast_json.dumps(entry) + b'\n')
+
+        os.makedirs(os.path.join(self.directory, collection), exist_ok=True)
+        for month, lines in by_month.items():
+            path = os.path.join(self.directory, collection, f"{month}.jsonl.gz")
+            # Each write adds a gzip member; concatenated members read back as one stream
+            with open(path, 'ab') as f:
+                f.write(gzip.compress(b''.join(lines)))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read(self, collection: str) -> List[Any]:
+        """All archived entries of a collection, oldest month first"""
+        directory = os.path.join(self.directory, collection)
+        if not os.path.isdir(directory):
+            return []
+        entries = []
+        for name in sorted(os.listdir(directory)):
+            with gzip.open(os.path.join(directory, name), 'rb') as f:
+                entries.extend(fast_json.loads(line) for line in f.read().splitlines() if line.strip())
+        return entries
+
+
+def _day_of(entry: Any) -> str:
+    timestamp = entry.get('timestamp') if isinstance(entry, dict) else None
+    if isinstance(timestamp, str) and len(timestamp) >= 10:
+        return timestamp[:10]
+    return ''
+
+
+def _parse_timestamp(entry: Any) -> Optional[datetime]:
+    timestamp = entry.get('timestamp') if isinstance(entry, dict) else None
+    if not isinstance(timestamp, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    # Aware timestamps (e.g. the engine's UTC ones) are compared in local time like the naive ones
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def expired_prefix(entries: List[Any], policy: RetentionPolicy, now: datetime) -> int:
+    """Number of leading (oldest) entries that fall outside the policy"""
+    expired = 0
+    if policy.max_count is not None and len(entries) > policy.max_count:
+        expired = len(entries) - max(policy.max_count, 0)
+
+    if policy.max_age_days is not None:
+        cutoff = now - timedelta(days=policy.max_age_days)
+        while expired < len(entries):
+            timestamp = _parse_timestamp(entries[expired])
+            if timestamp is None or timestamp >= cutoff:
+                break
+            expired += 1
+
+    if policy.max_bytes is not None:
+        sizes = [len(fast_json.dumps(entry)) for entry in entries[expired:]]
+        total = sum(sizes)
+        for size in sizes:
+            if total <= policy.max_bytes:
+                break
+            total -= size
+            expired += 1
+
+    return expired
+
+
+def rollup(rollups: Dict[str, Any], collection: str, entries: List[Any]):
+    """Add per-day counts of the collection's rollup field for expired entries"""
+    field = ROLLUP_FIELDS.get(collection)
+    days = rollups.setdefault(collection, {})
+    for entry in entries:
+        day = _day_of(entry) or 'undated'
+        value = entry.get(field) if field and isinstance(entry, dict) else None
+        counts = days.setdefault(day, {'total': 0})
+        counts['total'] += 1
+        if value:
+            counts[str(value)] = counts.get(str(value), 0) + 1
+
+
+def apply_retention(state: Dict[str, Any], collection: str, policy: RetentionPolicy,
+                    cold_storage: Optional[ColdStorage] = None, now: Optional[datetime] = None) -> int:
+    """
+    Expire entries of state[collection] beyond the policy.
+
+    Expired entries are written to cold storage first, then counted into
+    state['rollups'] and removed from the front of the collection. Returns the
+    number of entries expired.
+    """
+    entries = state.get(collection)
+    if not isinstance(entries, list) or not entries:
+        return 0
+
+    expired = expired_prefix(entries, policy, now or datetime.now())
+    if not expired:
+        return 0
+
+    old_entries = entries[:expired]
+    if cold_storage is not None:
+        cold_storage.archive(collection, old_entries)
+    rollup(state.setdefault(ROLLUPS_KEY, {}), collection, old_entries)
+    state[collection] = entries[expired:]
+
+    logger.info(f"Retention expired {expired} entries from {collection}")
+    return expired
@@ -0,0 +1,324 @@
+"""
+SQLite State Storage
+Stores each user's state in real tables so common lookups don't parse the whole document
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from ...utils import fast_json
+from .journal import StateChangeTracker
+from .storage import StateStorage, StateStorageError, JsonFileStorage, file_signature, parse_check_in_time
+
+logger = logging.getLogger(__name__)
+
+# Marker stored in the kv table for keys whose contents live in their own table
+TABLE_MARKER = '"__table__"'
+
+# Entity collections: table name -> (id column, extra indexed columns)
+ENTITY_TABLES = {
+    'goals': ('goal_id', []),
+    'tasks': ('task_id', ['goal_id', 'status']),
+    'progress_trackers': ('tracker_id', ['task_id', 'status', 'check_in_at']),
+}
+
+# Append-only collections stored in the shared log_entries table
+LOG_COLLECTIONS = ('tool_execution_log', 'gemini_api_log', 'hourly_reflections', 'insights')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS goals (
+    position INTEGER PRIMARY KEY,
+    goal_id INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_goals_id ON goals(goal_id);
+CREATE TABLE IF NOT EXISTS tasks (
+    position INTEGER PRIMARY KEY,
+    task_id INTEGER,
+    goal_id INTEGER,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_id ON tasks(task_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_goal ON tasks(goal_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+CREATE TABLE IF NOT EXISTS progress_trackers (
+    position INTEGER PRIMARY KEY,
+    tracker_id INTEGER,
+    task_id INTEGER,
+    status TEXT,
+    check_in_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trackers_id ON progress_trackers(tracker_id);
+CREATE INDEX IF NOT EXISTS idx_trackers_due ON progress_trackers(status, check_in_at);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    seq INTEGER PRIMARY KEY,
+    role TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_role ON chat_messages(role, seq);
+CREATE TABLE IF NOT EXISTS log_entries (
+    collection TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, seq)
+);
+"""
+
+
+def _dumps(value) -> str:
+    return fast_json.dumps_str(value)
+
+
+class SQLiteStorage(StateStorage):
+    """SQLite driver with per-entity tables for goals, tasks, trackers, messages and logs"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str, legacy_json: Optional[JsonFileStorage] = None):
+        super().__init__(path)
+        self.legacy_json = legacy_json
+        self.tracker = StateChangeTracker()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def supports_queries(self) -> bool:
+        return os.path.exists(self.path)
+
+    def exists(self) -> bool:
+        if os.path.exists(self.path):
+            return True
+        return bool(self.legacy_json and self.legacy_json.exists())
+
+    def read(self) -> Optional[Any]:
+        if not os.path.exists(self.path) and self.legacy_json and self.legacy_json.exists():
+            return self._migrate_from_json()
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                rows = conn.execute("SELECT key, value FROM kv ORDER BY rowid").fetchall()
+                if not rows:
+                    return None
+
+                state = {}
+                for key, value in rows:
+                    if value == TABLE_MARKER:
+                        state[key] = self._read_collection(conn, key)
+                    else:
+                        state[key] = fast_json.loads(value)
+                return state
+        except sqlite3.Error as e:
+            raise StateStorageError(f"Failed to read {self.path}: {e}") from e
+
+    def loaded(self, state: Dict[str, Any]):
+        self.tracker.reset(state)
+
+    def signature(self) -> Optional[tuple]:
+        # With WAL enabled, commits land in the -wal file until checkpointed
+        return file_signature(self.path, self.path + '-wal')
+
+    def write(self, state: Dict[str, Any]):
+        if not self.tracker.has_baseline:
+            self.write_full(state)
+            return
+
+        ops, pending = self.tracker.diff(state)
+        if ops:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    for op in ops:
+                        self._apply_op(conn, op)
+        self.tracker.commit(pending)
+
+    def write_full(self, state: Dict[str, Any]):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM kv")
+                for table in list(ENTITY_TABLES) + ['chat_messages', 'log_entries']:
+                    conn.execute(f"DELETE FROM {table}")
+                for key, value in state.items():
+                    self._apply_op(conn, {'op': 'set', 'key': key, 'value': value})
+        self.tracker.reset(state)
+
+    # --- Queries -----------------------------------------------------------
+
+    def due_progress_trackers(self, state: Dict[str, Any], now: datetime) -> List[Dict[str, Any]]:
+        if state is not None:
+            return super().due_progress_trackers(state, now)
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT data FROM progress_trackers "
+                "WHERE status = 'PENDING' AND check_in_at IS NOT NULL AND check_in_at <= ? "
+                "ORDER BY position",
+                (now.isoformat(),)
+            ).fetchall()
+        return [fast_json.loads(data) for (data,) in rows]
+
+    def recent_messages(self, state: Dict[str, Any], role: Optional[str] = None,
+                        limit: int = 10) -> List[Dict[str, Any]]:
+        if state is not None:
+            return super().recent_messages(state, role, limit)
+        with self._lock:
+            conn = self._connect()
+            if role:
+                rows = conn.execute(
+                    "SELECT data FROM chat_messages WHERE role = ? ORDER BY seq DESC LIMIT ?",
+                    (role, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT data FROM chat_messages ORDER BY seq DESC LIMIT ?", (limit,)
+                ).fetchall()
+        return [fast_json.loads(data) for (data,) in reversed(rows)]
+
+    # --- Internals ---------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _migrate_from_json(self) -> Optional[Any]:
+        """Import an existing state.json into a new database"""
+        data = self.legacy_json.read()
+        if not isinstance(data, dict):
+            return data
+
+        self.write_full(data)
+        self.tracker = StateChangeTracker()
+
+        legacy_path = self.legacy_json.path
+        os.replace(legacy_path, legacy_path + '.migrated')
+        self.legacy_json.journal.discard()
+        logger.info(f"Migrated {legacy_path} into {self.path}")
+        return data
+
+    def _read_collection(self, conn: sqlite3.Connection, key: str) -> List[Any]:
+        if key in ENTITY_TABLES:
+            rows = conn.execute(f"SELECT data FROM {key} ORDER BY position").fetchall()
+        elif key == 'chat_history':
+            rows = conn.execute("SELECT data FROM chat_messages ORDER BY seq").fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT data FROM log_entries WHERE collection = ? ORDER BY seq", (key,)
+            ).fetchall()
+        return [fast_json.loads(data) for (data,) in rows]
+
+    def _is_table_backed(self, key: str, value: Any) -> bool:
+        return isinstance(value, list) and (
+            key in ENTITY_TABLES or key == 'chat_history' or key in LOG_COLLECTIONS
+        )
+
+    def _apply_op(self, conn: sqlite3.Connection, op: Dict[str, Any]):
+        kind, key = op['op'], op['key']
+
+        if kind == 'del':
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+            self._clear_collection(conn, key)
+            return
+
+        if kind == 'set':
+            value = op['value']
+            self._clear_collection(conn, key)
+            if self._is_table_backed(key, value):
+                self._upsert_kv(conn, key, TABLE_MARKER)
+                self._append_items(conn, key, value)
+            else:
+                self._upsert_kv(conn, key, _dumps(value))
+            return
+
+        if kind == 'extend':
+            self._upsert_kv(conn, key, TABLE_MARKER)
+            drop = op.get('drop', 0)
+            if drop:
+                if key == 'chat_history':
+                    conn.execute(
+                        "DELETE FROM chat_messages WHERE seq IN "
+                        "(SELECT seq FROM chat_messages ORDER BY seq LIMIT ?)", (drop,)
+                    )
+                else:
+                    conn.execute(
+                        "DELETE FROM log_entries WHERE collection = ? AND seq IN "
+                        "(SELECT seq FROM log_entries WHERE collection = ? ORDER BY seq LIMIT ?)",
+                        (key, key, drop)
+                    )
+            self._append_items(conn, key, op.get('items', []))
+
+    def _upsert_kv(self, conn: sqlite3.Connection, key: str, value: str):
+        conn.execute(
+            "INSERT INTO kv (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def _clear_collection(self, conn: sqlite3.Connection, key: str):
+        if key in ENTITY_TABLES:
+            conn.execute(f"DELETE FROM {key}")
+        elif key == 'chat_history':
+            conn.execute("DELETE FROM chat_messages")
+        elif key in LOG_COLLECTIONS:
+            conn.execute("DELETE FROM log_entries WHERE collection = ?", (key,))
+
+    def _append_items(self, conn: sqlite3.Connection, key: str, items: List[Any]):
+        if key in ENTITY_TABLES:
+            id_column, extra_columns = ENTITY_TABLES[key]
+            columns = [id_column] + extra_columns
+            placeholders = ', '.join('?' for _ in range(len(columns) + 2))
+            start = conn.execute(f"SELECT COALESCE(MAX(position), -1) + 1 FROM {key}").fetchone()[0]
+            conn.executemany(
+                f"INSERT INTO {key} (position, {', '.join(columns)}, data) VALUES ({placeholders})",
+                [
+                    (start + i, *[self._column_value(item, column) for column in columns], _dumps(item))
+                    for i, item in enumerate(items)
+                ]
+            )
+        elif key == 'chat_history':
+            start = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM chat_messages").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO chat_messages (seq, role, timestamp, data) VALUES (?, ?, ?, ?)",
+                [
+                    (start + i, self._column_value(item, 'role'), self._column_value(item, 'timestamp'), _dumps(item))
+                    for i, item in enumerate(items)
+                ]
+            )
+        else:
+            start = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM log_entries WHERE collection = ?", (key,)
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO log_entries (collection, seq, timestamp, data) VALUES (?, ?, ?, ?)",
+                [
+                    (key, start + i, self._column_value(item, 'timestamp'), _dumps(item))
+                    for i, item in enumerate(items)
+                ]
+            )
+
+    @staticmethod
+    def _column_value(item: Any, column: str):
+        if not isinstance(item, dict):
+            return None
+        if column == 'check_in_at':
+            parsed = parse_check_in_time(item.get('check_in_time'))
+            return parsed.isoformat() if parsed else None
+        value = item.get(column)
+        return value if isinstance(value, (str, int, float)) or value is None else str(value)
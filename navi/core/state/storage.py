@@ -0,0 +1,323 @@
+"""
+State Storage Backends
+Pluggable persistence drivers behind StateManager
+"""
+
+import os
+import logging
+import functools
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from ...utils.atomic_write import atomic_write
+from .codec import StateCodec, StateCodecError
+from .archive import ARCHIVED_KEYS, HistoryArchive
+from .journal import StateChangeTracker, StateJournal
+from .lazy import LazyState
+
+logger = logging.getLogger(__name__)
+
+# Formats accepted for progress tracker check-in times
+CHECK_IN_TIME_FORMATS = [
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%d/%m/%y %H:%M",
+    "%d/%m/%Y %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f"
+]
+
+
+def parse_check_in_time(value: str) -> Optional[datetime]:
+    """Parse a tracker check-in time in any supported format, or return None."""
+    if not value or not isinstance(value, str):
+        return None
+    for fmt in CHECK_IN_TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def file_signature(*paths: str) -> tuple:
+    """(mtime_ns, size) for each path, or None for paths that don't exist"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def page_bounds(total: int, limit: int, before: Optional[int] = None):
+    """(start, stop) of the `limit` items just before index `before` (default: the end)"""
+    stop = total if before is None else max(0, min(before, total))
+    return max(0, stop - limit), stop
+
+
+def page_of(items: List[Any], limit: int, before: Optional[int] = None) -> Dict[str, Any]:
+    """A page of an in-memory list as {'items', 'start', 'total'}"""
+    start, stop = page_bounds(len(items), limit, before)
+    return {'items': items[start:stop], 'start': start, 'total': len(items)}
+
+
+class StateStorageError(Exception):
+    """Raised when a storage backend cannot read its data."""
+
+
+class StateStorage(ABC):
+    """Base class for state persistence drivers"""
+
+    name = 'base'
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @abstractmethod
+    def exists(self) -> bool:
+        """Whether any state has been stored yet"""
+
+    @abstractmethod
+    def read(self) -> Optional[Any]:
+        """Read the stored state, returning None when the store is empty"""
+
+    @abstractmethod
+    def write(self, state: Dict[str, Any]):
+        """Persist the state, incrementally where the driver supports it"""
+
+    def write_full(self, state: Dict[str, Any]):
+        """Persist the state from scratch (used on reset)"""
+        self.write(state)
+
+    def loaded(self, state: Dict[str, Any]):
+        """Called with the cleaned state once StateManager has finished loading it"""
+
+    def signature(self) -> Optional[tuple]:
+        """Cheap fingerprint of the stored files, used to notice writes from other processes"""
+        return None
+
+    # --- Queries -----------------------------------------------------------
+    # Drivers with real indexes answer these without materializing the whole
+    # state. The defaults scan an already loaded state dict.
+
+    def due_progress_trackers(self, state: Dict[str, Any], now: datetime) -> List[Dict[str, Any]]:
+        """PENDING progress trackers whose check-in time is at or before now"""
+        due = []
+        for tracker in state.get('progress_trackers', []):
+            if tracker.get('status') != 'PENDING':
+                continue
+            check_in_time = parse_check_in_time(tracker.get('check_in_time', ''))
+            if check_in_time and check_in_time <= now:
+                due.append(tracker)
+        return due
+
+    def recent_messages(self, state: Dict[str, Any], role: Optional[str] = None,
+                        limit: int = 10) -> List[Dict[str, Any]]:
+        """The last `limit` chat messages, optionally only those with the given role"""
+        history = state.get('chat_history', [])
+        if role:
+            history = [msg for msg in history if msg.get('role') == role]
+        return history[-limit:] if limit else []
+
+    def read_collection_page(self, key: str, limit: int, before: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Read a page of a collection that isn't loaded into memory (see page_of).
+
+        Returns None when the driver can't read the collection on its own.
+        """
+        return None
+
+    @property
+    def supports_queries(self) -> bool:
+        """Whether queries can be answered without loading the full state"""
+        return False
+
+
+class JsonFileStorage(StateStorage):
+    """One JSON document per user, optionally with an append-only journal and a history archive"""
+
+    name = 'json'
+
+    def __init__(self, path: str, journaled: bool = False, codec: Optional[StateCodec] = None,
+                 segmented: bool = False):
+        super().__init__(path)
+        # Journaled mode appends per-save changes to a write-ahead log instead of
+        # rewriting the whole file. The journal is always replayed on read, so
+        # switching modes never loses changes.
+        self.journaled = journaled
+        # Snapshots are written in the configured format (NAVI_STATE_FORMAT) and
+        # read in whatever format they are in; files in another format are
+        # rewritten on the next save
+        self.codec = codec or StateCodec()
+        self.journal = StateJournal(path, codec=self.codec)
+        self._needs_rewrite = False
+        # Segmented mode keeps chat history and logs in day-segmented archive
+        # files that are only read when those keys are accessed. As with the
+        # journal, an existing archive is always merged back in on read.
+        self.segmented = segmented
+        self.archive = HistoryArchive(os.path.splitext(path)[0] + '.history')
+        self.archive_tracker = StateChangeTracker()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def read(self) -> Optional[Any]:
+        with open(self.path, 'rb') as f:
+            raw_file_content = f.read()
+
+        try:
+            loaded_data = self.codec.decode(raw_file_content)
+        except StateCodecError as e:
+            raise StateStorageError(f"Failed to read {self.path}: {e}") from e
+        if loaded_data is None:
+            return None
+
+        self._needs_rewrite = not self.codec.matches(raw_file_content)
+
+        if isinstance(loaded_data, dict):
+            loaded_data = self.journal.replay(loaded_data)
+            loaded_data = self._attach_archive(loaded_data)
+        return loaded_data
+
+    def loaded(self, state: Dict[str, Any]):
+        if self.journaled:
+            self.journal.tracker.reset(self._core(state))
+
+    def signature(self) -> Optional[tuple]:
+        return file_signature(self.path, self.journal.journal_path, self.archive.index_path)
+
+    def write(self, state: Dict[str, Any]):
+        if self.segmented:
+            ops, pending = self.archive_tracker.diff(self._archived(state))
+            self.archive.apply(ops)
+            self.archive_tracker.commit(pending)
+            state = self._core(state)
+
+        if self.journaled:
+            if self._needs_rewrite:
+                self.journal.write_snapshot(state)
+                self._needs_rewrite = False
+            else:
+                self.journal.save(state)
+        else:
+            atomic_write(self.path, self.codec.encode(state))
+            self._needs_rewrite = False
+
+            # The full file now supersedes anything left in the journal
+            self.journal.discard()
+
+        if not self.segmented:
+            # ...and anything left in the archive
+            self.archive.clear()
+
+    def write_full(self, state: Dict[str, Any]):
+        if self.segmented:
+            archived = self._archived(state)
+            self.archive.replace_all(archived)
+            self.archive_tracker.reset(archived)
+            state = self._core(state)
+
+        if self.journaled:
+            self.journal.write_snapshot(state)
+        else:
+            atomic_write(self.path, self.codec.encode(state))
+            self.journal.discard()
+
+        if not self.segmented:
+            self.archive.clear()
+
+    def read_collection_page(self, key: str, limit: int, before: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        if key not in ARCHIVED_KEYS or key not in self.archive.collections():
+            return None
+        total = self.archive.count(key)
+        start, stop = page_bounds(total, limit, before)
+        return {'items': self.archive.read_range(key, start, stop), 'start': start, 'total': total}
+
+    # --- Archive helpers -----------------------------------------------------
+
+    def _attach_archive(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge archived collections into a freshly read state"""
+        self.archive.reload_index()
+        # Archived collections get their baseline as they are loaded; anything
+        # else found under an archived key has yet to be written to the archive
+        self.archive_tracker.reset({})
+        archived = [key for key in self.archive.collections() if key in ARCHIVED_KEYS]
+
+        if not self.segmented:
+            if not archived:
+                return state
+            # Leaving segmented mode: load everything and fold it into the snapshot
+            for key in archived:
+                state.setdefault(key, self.archive.read(key))
+            self._needs_rewrite = True
+            return state
+
+        # The archive is authoritative for the keys it holds; copies still in
+        # the snapshot are moved out on the next save
+        if any(key in state for key in ARCHIVED_KEYS):
+            self._needs_rewrite = True
+        for key in archived:
+            state.pop(key, None)
+        loaders = {key: functools.partial(self._load_collection, key) for key in archived}
+        return LazyState(state, loaders)
+
+    def _load_collection(self, key: str) -> List[Any]:
+        items = self.archive.read(key)
+        self.archive_tracker.track(key, items)
+        return items
+
+    @staticmethod
+    def _core(state: Dict[str, Any]) -> Dict[str, Any]:
+        items = state.loaded_items() if isinstance(state, LazyState) else state.items()
+        return {key: value for key, value in items if key not in ARCHIVED_KEYS}
+
+    @staticmethod
+    def _archived(state: Dict[str, Any]) -> Dict[str, Any]:
+        items = state.loaded_items() if isinstance(state, LazyState) else state.items()
+        return {key: value for key, value in items if key in ARCHIVED_KEYS}
+
+
+def storage_backend_from_env() -> str:
+    """Storage backend selected via NAVI_STATE_BACKEND (json or sqlite)"""
+    return os.environ.get('NAVI_STATE_BACKEND', 'json').lower()
+
+
+def journaling_enabled() -> bool:
+    """Whether journaled JSON storage is switched on via NAVI_STATE_JOURNAL"""
+    return os.environ.get('NAVI_STATE_JOURNAL', 'false').lower() in ('1', 'true', 'yes')
+
+
+def segmentation_enabled() -> bool:
+    """Whether history and logs are kept in segmented archives via NAVI_STATE_SEGMENTED"""
+    return os.environ.get('NAVI_STATE_SEGMENTED', 'false').lower() in ('1', 'true', 'yes')
+
+
+def create_storage(json_path: str, backend: Optional[str] = None,
+                   journaled: Optional[bool] = None, segmented: Optional[bool] = None) -> StateStorage:
+    """
+    Create the storage driver for a state file.
+
+    Args:
+        json_path: Path of the JSON state file; other drivers derive their path from it
+        backend: 'json' or 'sqlite' (defaults to NAVI_STATE_BACKEND)
+        journaled: Journal mode for the JSON driver (defaults to NAVI_STATE_JOURNAL)
+        segmented: History archive mode for the JSON driver (defaults to NAVI_STATE_SEGMENTED)
+    """
+    backend = backend or storage_backend_from_env()
+    if journaled is None:
+        journaled = journaling_enabled()
+    if segmented is None:
+        segmented = segmentation_enabled()
+
+    if backend == 'sqlite':
+        from .sqlite_storage import SQLiteStorage
+        db_path = os.path.splitext(json_path)[0] + '.db'
+        return SQLiteStorage(db_path, legacy_json=JsonFileStorage(json_path))
+
+    if backend != 'json':
+        logger.warning(f"Unknown state backend '{backend}', falling back to json")
+    return JsonFileStorage(json_path, journaled=journaled, segmented=segmented)
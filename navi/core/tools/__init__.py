@@ -21,10 +21,14 @@ from .goals import goal_functions
 from .tasks import task_functions 
 from .calendar_tools import calendar_functions
 from .utilities import utility_functions
+from .registry import ToolArgumentError, ToolParameter, ToolRegistry, ToolSpec
 
 # Combine all tool functions
 tool_functions = {**goal_functions, **task_functions, **calendar_functions, **utility_functions}
 
+# Global instance: every tool's schema, built once at import
+tool_registry = ToolRegistry.from_functions(tool_functions)
+
 __all__ = [
     # Goals
     'list_goals', 'add_goal', 'update_goal', 'check_goal_completion', 'list_goals_by_category',
@@ -39,5 +43,7 @@ __all__ = [
     'update_conversation_stage', 'add_progress_tracker', 'list_progress_trackers', 
     'update_progress_tracker', 'add_insight',
     # Combined functions dictionary
-    'tool_functions'
+    'tool_functions',
+    # Schemas and argument validation
+    'tool_registry', 'ToolRegistry', 'ToolSpec', 'ToolParameter', 'ToolArgumentError'
 ]
\ No newline at end of file
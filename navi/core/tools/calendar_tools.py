@@ -72,7 +72,12 @@ def _parse_datetime(date_string, for_api_query=False):
 
 
 def list_events(state_manager: StateManager, start_date: str, end_date: str):
-    """Lists calendar events between start_date and end_date (DD/MM/YY format)"""
+    """Lists calendar events between start_date and end_date (DD/MM/YY format)
+    
+    Args:
+        start_date: First day to list, in DD/MM/YY format
+        end_date: Last day to list, in DD/MM/YY format
+    """
     try:
         service = _get_calendar_service(state_manager)
     except Exception as e:
@@ -263,7 +268,13 @@ def add_daily_event(state_manager: StateManager, event_description: str, start_d
 
 
 def update_event(state_manager: StateManager, event_id: str, field_to_update: str, new_value: str):
-    """Updates a specific field of an existing calendar event"""
+    """Updates a specific field of an existing calendar event
+    
+    Args:
+        event_id: ID of the calendar event
+        field_to_update: Event field to change: title, description, start_time, end_time or location
+        new_value: New value; times in DD/MM/YY HH:MM format
+    """
     try:
         service = _get_calendar_service(state_manager)
     except Exception as e:
@@ -310,7 +321,11 @@ def update_event(state_manager: StateManager, event_id: str, field_to_update: st
 
 
 def delete_event(state_manager: StateManager, event_id: str):
-    """Deletes a calendar event by its ID"""
+    """Deletes a calendar event by its ID
+    
+    Args:
+        event_id: ID of the calendar event to delete
+    """
     try:
         service = _get_calendar_service(state_manager)
     except Exception as e:
@@ -336,7 +351,11 @@ def delete_event(state_manager: StateManager, event_id: str):
 
 
 def get_event_details(state_manager: StateManager, event_id: str):
-    """Gets detailed information about a specific calendar event"""
+    """Gets detailed information about a specific calendar event
+    
+    Args:
+        event_id: ID of the calendar event
+    """
     try:
         service = _get_calendar_service(state_manager)
     except Exception as e:
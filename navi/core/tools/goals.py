@@ -7,7 +7,7 @@ from ..state.manager import StateManager
 
 
 def _find_goal_by_id(goals, goal_id):
-    """Finds a goal in a list by its ID."""
+    """Finds a goal in a list by its ID (use state_manager.index.goal() for the live state)."""
     for goal in goals:
         if goal.get('goal_id') == goal_id:
             return goal
@@ -15,35 +15,51 @@ def _find_goal_by_id(goals, goal_id):
 
 
 def add_goal(state_manager: StateManager, title: str, category: str, description: str, end_condition: str, due_date: str, importance: str, urgency: str):
-    """Adds a new goal to the state."""
+    """Adds a new goal to the state.
+    
+    Args:
+        title: Short name of the goal
+        category: Life area, e.g. Health, Career, Learning, Relationships
+        description: What the goal is about and why it matters to the user
+        end_condition: How the user will know the goal is achieved
+        due_date: Target date in DD/MM/YY format
+        importance: How important the goal is to the user, e.g. High, Medium, Low
+        urgency: How soon it needs attention, e.g. High, Medium, Low
+    """
     state = state_manager.get_state()
     goal_id = state['metadata']['next_goal_id']
-    state['goals'].append({
+    goal = {
         "goal_id": goal_id, "title": title, "category": category, "description": description,
         "end_condition": end_condition, "due_date": due_date, "importance": importance, "urgency": urgency,
         "bot_goal_assesment_percentage": 0, "user_goal_assesment_percentage": 0, "goal_log": []
-    })
+    }
+    state['goals'].append(goal)
+    state_manager.index.note_added('goals', goal)
     state['metadata']['next_goal_id'] += 1
     return f"Added goal '{title}' with ID {goal_id}."
 
 
 def update_goal(state_manager: StateManager, goal_id: int, field_to_update: str, new_value: str):
-    """Updates a specific field of a goal."""
-    state = state_manager.get_state()
-    goal = _find_goal_by_id(state['goals'], goal_id)
+    """Updates a specific field of a goal.
+    
+    Args:
+        goal_id: ID of the goal to update
+        field_to_update: Goal field to change, e.g. title, description, end_condition, due_date, importance, urgency
+        new_value: New value for the field
+    """
+    goal = state_manager.index.goal(goal_id)
     if goal:
+        old_value = goal.get(field_to_update)
         goal[field_to_update] = new_value
+        state_manager.index.note_changed('goals', goal, field_to_update, old_value)
         return f"Updated goal {goal_id}."
     return f"Error: Goal with ID {goal_id} not found."
 
 
 def calculate_goal_progress(state_manager: StateManager, goal_id: int):
     """Calculate bot assessment percentage based on completed tasks for a goal"""
-    state = state_manager.get_state()
-    tasks = state.get('tasks', [])
-    
     # Get all tasks for this goal
-    goal_tasks = [task for task in tasks if task.get('goal_id') == goal_id]
+    goal_tasks = state_manager.index.tasks_for_goal(goal_id)
     
     if not goal_tasks:
         return 0
@@ -67,8 +83,7 @@ def update_goal_progress_on_task_completion(state_manager: StateManager, goal_id
     update_goal(state_manager, goal_id, 'bot_goal_assesment_percentage', str(new_percentage))
     
     # Add entry to goal log
-    state = state_manager.get_state()
-    goal = _find_goal_by_id(state['goals'], goal_id)
+    goal = state_manager.index.goal(goal_id)
     
     if goal:
         log_entry = f"{datetime.now().strftime('%d/%m/%y')}: Completed '{task_description}' - Goal now {new_percentage}% complete"
@@ -98,9 +113,12 @@ def list_goals(state_manager: StateManager):
 
 
 def check_goal_completion(state_manager: StateManager, goal_id: int):
-    """Check if a goal has all required fields and return completion status"""
-    goals = state_manager.get_state().get('goals', [])
-    goal = _find_goal_by_id(goals, goal_id)
+    """Check if a goal has all required fields and return completion status
+    
+    Args:
+        goal_id: ID of the goal to check
+    """
+    goal = state_manager.index.goal(goal_id)
     
     if not goal:
         return f"Goal with ID {goal_id} not found.", False
@@ -119,7 +137,11 @@ def check_goal_completion(state_manager: StateManager, goal_id: int):
 
 
 def list_goals_by_category(state_manager: StateManager, category: str):
-    """Filters and lists goals by a specific category."""
+    """Filters and lists goals by a specific category.
+    
+    Args:
+        category: Category to list goals for (case-insensitive)
+    """
     goals = state_manager.get_state().get('goals', [])
     filtered_goals = [g for g in goals if g.get('category', '').lower() == category.lower()]
     if not filtered_goals:
@@ -128,10 +150,12 @@ def list_goals_by_category(state_manager: StateManager, category: str):
 
 
 def calculate_goal_progress(state_manager: StateManager, goal_id: int):
-    """Calculate progress for a specific goal based on completed tasks"""
-    state = state_manager.get_state()
-    tasks = state.get('tasks', [])
-    goal_tasks = [t for t in tasks if t.get('goal_id') == goal_id]
+    """Calculate progress for a specific goal based on completed tasks
+    
+    Args:
+        goal_id: ID of the goal
+    """
+    goal_tasks = state_manager.index.tasks_for_goal(goal_id)
     
     if not goal_tasks:
         return 0  # No tasks = 0% progress
@@ -145,7 +169,6 @@ def display_goals_with_progress(state_manager: StateManager):
     """Display all goals with comprehensive data including progress bars"""
     state = state_manager.get_state()
     goals = state.get('goals', [])
-    tasks = state.get('tasks', [])
     
     if not goals:
         return "🎯 **No goals have been set yet.**\n\nReady to create your first goal? Just tell me what you'd like to achieve!"
@@ -171,7 +194,7 @@ def display_goals_with_progress(state_manager: StateManager):
         progress_bar = "█" * filled_blocks + "░" * empty_blocks
         
         # Count tasks
-        goal_tasks = [t for t in tasks if t.get('goal_id') == goal_id]
+        goal_tasks = state_manager.index.tasks_for_goal(goal_id)
         completed_tasks = [t for t in goal_tasks if t.get('status') == 'COMPLETED']
         pending_tasks = [t for t in goal_tasks if t.get('status') == 'PENDING']
         
@@ -274,11 +297,15 @@ def display_goal_summary(state_manager: StateManager):
 
 
 def update_goal_progress_on_task_completion(state_manager: StateManager, goal_id: int, task_title: str):
-    """Update goal progress and log when a task is completed"""
+    """Update goal progress and log when a task is completed
+    
+    Args:
+        goal_id: ID of the goal the completed task belongs to
+        task_title: Title of the task that was completed
+    """
     from datetime import datetime
     
-    state = state_manager.get_state()
-    goal = _find_goal_by_id(state['goals'], goal_id)
+    goal = state_manager.index.goal(goal_id)
     
     if not goal:
         return f"Goal with ID {goal_id} not found."
@@ -297,11 +324,15 @@ def update_goal_progress_on_task_completion(state_manager: StateManager, goal_id
 
 
 def update_user_goal_assessment(state_manager: StateManager, goal_id: int, user_percentage: int):
-    """Update user's self-assessment of goal progress"""
+    """Update user's self-assessment of goal progress
+    
+    Args:
+        goal_id: ID of the goal
+        user_percentage: The user's own estimate of their progress, 0-100
+    """
     from datetime import datetime
     
-    state = state_manager.get_state()
-    goal = _find_goal_by_id(state['goals'], goal_id)
+    goal = state_manager.index.goal(goal_id)
     
     if not goal:
         return f"Goal with ID {goal_id} not found."
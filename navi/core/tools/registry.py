@@ -0,0 +1,271 @@
+"""
+Tool Registry
+Declarative tool schemas (types, enums, descriptions from docstrings) built once and used to validate calls
+"""
+
+import re
+import inspect
+import logging
+import typing
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TASK_STATUSES = ('PENDING', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED')
+RECURRENCE_OPTIONS = ('DAILY', 'WEEKLY', 'MONTHLY')
+
+_SCHEMA_TYPES = {str: 'STRING', int: 'INTEGER', bool: 'BOOLEAN', float: 'NUMBER'}
+
+
+
+class ToolArgumentError(ValueError):
+    """A tool call's arguments don't match the tool's schema"""
+
+
+# Parameters injected by the engine rather than chosen by the model
+_BOUND_PARAMETERS = ('state_manager',)
+
+
+def _task_status_update(args: Dict[str, Any]) -> Optional[str]:
+    if str(args.get('field_to_update', '')).lower() == 'status' and \
+            str(args.get('new_value', '')).upper() not in TASK_STATUSES:
+        return f"new_value for status must be one of {', '.join(TASK_STATUSES)}"
+    return None
+
+
+# What a signature and docstring can't say: enums, formats and cross-field rules
+PARAMETER_OVERRIDES: Dict[str, Dict[str, Dict[str, Any]]] = {
+    'list_tasks': {'filter_by_status': {'enum': TASK_STATUSES}},
+    'add_event': {'recurrence': {
+        # DAILY_COUNT=N and raw RRULEs are accepted too, so this is a pattern rather than an enum
+        'pattern': rf"({'|'.join(RECURRENCE_OPTIONS)}|DAILY_COUNT=\d+|RRULE:.+)",
+    }},
+}
+TOOL_CHECKS: Dict[str, Tuple[Callable[[Dict[str, Any]], Optional[str]], ...]] = {
+    'update_task': (_task_status_update,),
+}
+
+
+def parse_docstring(doc: Optional[str]) -> Tuple[str, Dict[str, str]]:
+    """
+    Split a Google-style docstring into its description and per-argument descriptions.
+
+    Argument lines look like `name: text` or `name (type): text` under an
+    `Args:` heading; more-indented lines continue the previous argument.
+    """
+    if not doc:
+        return '', {}
+    lines = inspect.cleandoc(doc).splitlines()
+    summary, arguments = [], {}
+    current, in_args, args_indent = None, False, None
+
+    for line in lines:
+        stripped = line.strip()
+        if stripped in ('Args:', 'Arguments:', 'Parameters:'):
+            in_args, current, args_indent = True, None, None
+            continue
+        if not in_args:
+            summary.append(line)
+            continue
+        if not stripped:
+            current = None
+            continue
+        indent = len(line) - len(line.lstrip())
+        if args_indent is None:
+            args_indent = indent
+        if indent < args_indent:
+            # A new section ends the arguments
+            in_args = False
+            summary.append(line)
+            continue
+        match = re.match(r'(\w+)\s*(?:\([^)]*\))?\s*:\s*(.*)', stripped)
+        if indent == args_indent and match:
+            current = match.group(1)
+            arguments[current] = match.group(2).strip()
+        elif current:
+            arguments[current] = f"{arguments[current]} {stripped}".strip()
+
+    return '\n'.join(summary).strip(), arguments
+
+
+def _schema_type(annotation) -> Tuple[str, Optional[str], bool]:
+    """(schema type, item type for arrays, whether None is allowed) of an annotation"""
+    optional = False
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        members = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        optional = len(members) < len(typing.get_args(annotation))
+        annotation = members[0] if len(members) == 1 else str
+        origin = typing.get_origin(annotation)
+    if annotation in (list, List) or origin is list:
+        item = (typing.get_args(annotation) or (str,))[0]
+        return 'ARRAY', _SCHEMA_TYPES.get(item, 'STRING'), optional
+    return _SCHEMA_TYPES.get(annotation, 'STRING'), None, optional
+
+
+@dataclass(frozen=True)
+class ToolParameter:
+    """One argument of a tool as the model sees it"""
+    name: str
+    type: str = 'STRING'
+    description: str = ''
+    required: bool = True
+    enum: Tuple[str, ...] = ()
+    pattern: Optional[str] = None
+    items: Optional[str] = None
+
+    def schema(self) -> Dict[str, Any]:
+        schema = {'type': self.type, 'description': self.description}
+        if self.enum:
+            schema['enum'] = list(self.enum)
+            schema['format'] = 'enum'
+        if self.items:
+            schema['items'] = {'type': self.items}
+        return schema
+
+    def coerce(self, value: Any) -> Any:
+        """The value converted to this parameter's type; raises ValueError if it can't be"""
+        if self.type == 'INTEGER':
+            # Numbers arrive as floats from the API's JSON
+            if isinstance(value, bool):
+                raise ValueError('expected an integer')
+            if isinstance(value, float):
+                if not value.is_integer():
+                    raise ValueError(f"expected an integer, got {value}")
+                return int(value)
+            return int(str(value).strip())
+        if self.type == 'NUMBER':
+            if isinstance(value, bool):
+                raise ValueError('expected a number')
+            return float(value)
+        if self.type == 'BOOLEAN':
+            if isinstance(value, bool):
+                return value
+            text = str(value).strip().lower()
+            if text in ('true', 'yes', '1'):
+                return True
+            if text in ('false', 'no', '0'):
+                return False
+            raise ValueError(f"expected true or false, got {value!r}")
+        if self.type == 'ARRAY':
+            if isinstance(value, (str, bytes)) or not hasattr(value, '__iter__'):
+                raise ValueError('expected a list')
+            return list(value)
+
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        text = str(value)
+        if self.enum:
+            canonical = next((option for option in self.enum if option.lower() == text.strip().lower()), None)
+            if canonical is None:
+                raise ValueError(f"must be one of {', '.join(self.enum)}")
+            return canonical
+        if self.pattern and not re.fullmatch(self.pattern, text.strip(), re.IGNORECASE):
+            raise ValueError(f"{text!r} is not a valid {self.name}")
+        return text
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """A tool's declaration and the rules its arguments must follow"""
+    name: str
+    func: Callable
+    description: str
+    parameters: Tuple[ToolParameter, ...] = ()
+    checks: Tuple[Callable[[Dict[str, Any]], Optional[str]], ...] = field(default=())
+
+    def parameters_schema(self) -> Dict[str, Any]:
+        return {
+            'type': 'OBJECT',
+            'properties': {p.name: p.schema() for p in self.parameters},
+            'required': [p.name for p in self.parameters if p.required],
+        }
+
+    def validate(self, args: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """(arguments converted to their declared types, problems found); call only if there are none"""
+        known = {p.name: p for p in self.parameters}
+        errors = [f"unknown argument '{name}'" for name in args if name not in known]
+        clean = {}
+        for parameter in self.parameters:
+            value = args.get(parameter.name)
+            if value is None or (value == '' and not parameter.required):
+                if parameter.required:
+                    errors.append(f"missing required argument '{parameter.name}'")
+                continue
+            try:
+                clean[parameter.name] = parameter.coerce(value)
+            except (TypeError, ValueError) as e:
+                errors.append(f"{parameter.name}: {e}")
+        if not errors:
+            errors.extend(problem for problem in (check(clean) for check in self.checks) if problem)
+        return clean, errors
+
+
+def spec_from_function(func: Callable, name: Optional[str] = None,
+                       overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+                       checks: Tuple[Callable, ...] = ()) -> ToolSpec:
+    """Build a tool's spec from its signature and docstring, plus declared overrides"""
+    overrides = overrides or {}
+    description, argument_docs = parse_docstring(func.__doc__)
+    try:
+        hints = typing.get_type_hints(func)
+    except Exception:
+        hints = {}
+
+    parameters = []
+    for param_name, param in inspect.signature(func).parameters.items():
+        if param_name in _BOUND_PARAMETERS or param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        schema_type, items, optional = _schema_type(hints.get(param_name, param.annotation))
+        settings = dict(
+            name=param_name,
+            type=schema_type,
+            items=items,
+            description=argument_docs.get(param_name, ''),
+            required=param.default is inspect.Parameter.empty and not optional,
+        )
+        settings.update(overrides.get(param_name, {}))
+        parameters.append(ToolParameter(**settings))
+
+    return ToolSpec(name=name or func.__name__, func=func, description=description or (name or func.__name__),
+                    parameters=tuple(parameters), checks=tuple(checks))
+
+
+class ToolRegistry:
+    """The tools the model can call, each with its schema, built once"""
+
+    def __init__(self):
+        self._specs: Dict[str, ToolSpec] = {}
+
+    @classmethod
+    def from_functions(cls, functions: Dict[str, Callable]) -> 'ToolRegistry':
+        registry = cls()
+        for name, func in functions.items():
+            registry.register(func, name=name)
+        return registry
+
+    def register(self, func: Callable, name: Optional[str] = None) -> ToolSpec:
+        name = name or func.__name__
+        spec = spec_from_function(func, name, PARAMETER_OVERRIDES.get(name), TOOL_CHECKS.get(name, ()))
+        self._specs[name] = spec
+        return spec
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._specs.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def __iter__(self) -> Iterator[ToolSpec]:
+        return iter(self._specs.values())
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def validate(self, name: str, args: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """Check a call's arguments against its tool's schema (see ToolSpec.validate)"""
+        spec = self._specs.get(name)
+        if spec is None:
+            return args, [f"unknown tool '{name}'"]
+        return spec.validate(args)
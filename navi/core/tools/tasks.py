@@ -7,7 +7,7 @@ from ..state.manager import StateManager
 
 
 def _find_task_by_id(tasks, task_id):
-    """Finds a task in a list by its ID."""
+    """Finds a task in a list by its ID (use state_manager.index.task() for the live state)."""
     for task in tasks:
         if task.get('task_id') == task_id:
             return task
@@ -15,7 +15,19 @@ def _find_task_by_id(tasks, task_id):
 
 
 def add_task(state_manager: StateManager, goal_id: int, title: str, description: str, measure_of_success: str, start_time: str, end_time: str, importance: str, urgency: str, due_date: str = None):
-    """Adds a new task to a goal and automatically creates calendar event."""
+    """Adds a new task to a goal and automatically creates calendar event.
+    
+    Args:
+        goal_id: ID of the goal the task belongs to
+        title: Short, actionable name, at most 50 characters
+        description: Full details of what needs to be done, with bullet points for subtasks
+        measure_of_success: How the user will know the task is done
+        start_time: Start in DD/MM/YY HH:MM format
+        end_time: End in DD/MM/YY HH:MM format
+        importance: How important the task is, e.g. High, Medium, Low
+        urgency: How urgent the task is, e.g. High, Medium, Low
+        due_date: Optional deadline in DD/MM/YY format
+    """
     state = state_manager.get_state()
     task_id = state['metadata']['next_task_id']
     
@@ -26,6 +38,7 @@ def add_task(state_manager: StateManager, goal_id: int, title: str, description:
         "urgency": urgency, "status": "PENDING", "task_log": [], "calendar_event_id": None
     }
     state['tasks'].append(task)
+    state_manager.index.note_added('tasks', task)
     state['metadata']['next_task_id'] += 1
     
     # Automatically add to Google Calendar
@@ -53,15 +66,21 @@ def add_task(state_manager: StateManager, goal_id: int, title: str, description:
 
 
 def update_task(state_manager: StateManager, task_id: int, field_to_update: str, new_value: str):
-    """Updates a specific field of a task, e.g., its status."""
-    state = state_manager.get_state()
-    task = _find_task_by_id(state['tasks'], task_id)
+    """Updates a specific field of a task, e.g., its status.
+    
+    Args:
+        task_id: ID of the task to update
+        field_to_update: Task field to change, e.g. status, title, description, start_time, end_time, due_date
+        new_value: New value for the field; for status one of PENDING, IN_PROGRESS, COMPLETED, CANCELLED
+    """
+    task = state_manager.index.task(task_id)
     if not task:
         return f"Error: Task with ID {task_id} not found."
     
     # Store old value to check if status changed to COMPLETED
     old_value = task.get(field_to_update)
     task[field_to_update] = new_value
+    state_manager.index.note_changed('tasks', task, field_to_update, old_value)
     
     # If task was just marked as completed, update goal progress
     if (field_to_update.lower() == 'status' and 
@@ -82,10 +101,15 @@ def update_task(state_manager: StateManager, task_id: int, field_to_update: str,
 
 
 def list_tasks(state_manager: StateManager, filter_by_status: str = None):
-    """Lists all tasks, optionally filtering by status (e.g., 'PENDING', 'COMPLETED')."""
-    tasks = state_manager.get_state().get('tasks', [])
+    """Lists all tasks, optionally filtering by status (e.g., 'PENDING', 'COMPLETED').
+    
+    Args:
+        filter_by_status: Only list tasks with this status; all tasks if omitted
+    """
     if filter_by_status:
-        tasks = [t for t in tasks if t.get('status', '').lower() == filter_by_status.lower()]
+        tasks = state_manager.index.tasks_with_status(filter_by_status)
+    else:
+        tasks = state_manager.get_state().get('tasks', [])
     if not tasks:
         message = "No tasks found."
         if filter_by_status:
@@ -96,18 +120,16 @@ def list_tasks(state_manager: StateManager, filter_by_status: str = None):
 
 def display_tasks_for_user(state_manager: StateManager):
     """Display tasks in a user-friendly format without technical details"""
-    from .goals import _find_goal_by_id
-    
+    index = state_manager.index
     tasks = state_manager.get_state().get('tasks', [])
-    goals = state_manager.get_state().get('goals', [])
     
     if not tasks:
         return "You don't have any tasks yet! Want to add some?"
     
     # Group tasks by status for better organization
-    pending_tasks = [t for t in tasks if t.get('status', '').upper() == 'PENDING']
-    in_progress_tasks = [t for t in tasks if t.get('status', '').upper() == 'IN_PROGRESS']
-    completed_tasks = [t for t in tasks if t.get('status', '').upper() == 'COMPLETED']
+    pending_tasks = index.tasks_with_status('PENDING')
+    in_progress_tasks = index.tasks_with_status('IN_PROGRESS')
+    completed_tasks = index.tasks_with_status('COMPLETED')
     
     result = []
     
@@ -119,7 +141,7 @@ def display_tasks_for_user(state_manager: StateManager):
             # Find associated goal
             goal_name = ""
             if task.get('goal_id'):
-                goal = _find_goal_by_id(goals, task['goal_id'])
+                goal = index.goal(task['goal_id'])
                 if goal:
                     goal_name = f" (for {goal['title']})"
             
@@ -134,7 +156,7 @@ def display_tasks_for_user(state_manager: StateManager):
         for task in completed_tasks[-3:]:  # Show last 3 completed
             goal_name = ""
             if task.get('goal_id'):
-                goal = _find_goal_by_id(goals, task['goal_id'])
+                goal = index.goal(task['goal_id'])
                 if goal:
                     goal_name = f" (for {goal['title']})"
             task_title = task.get('title', task['description'])
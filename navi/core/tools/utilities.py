@@ -8,12 +8,15 @@ from ..state.manager import StateManager
 
 
 def set_user_timezone(state_manager: StateManager, timezone: str):
-    """Set user's timezone preference"""
+    """Set user's timezone preference
+    
+    Args:
+        timezone: IANA timezone name, e.g. Asia/Jerusalem or America/New_York
+    """
     state = state_manager.get_state()
     if 'user_preferences' not in state:
         state['user_preferences'] = {}
     state['user_preferences']['timezone'] = timezone
-    state_manager.save_state()
     return f"Timezone set to {timezone}"
 
 
@@ -69,7 +72,12 @@ def get_current_datetime(state_manager: StateManager):
 
 
 def add_user_detail(state_manager: StateManager, detail_key: str, detail_value: str):
-    """Saves a fundamental detail about the user, like their name, age, or location."""
+    """Saves a fundamental detail about the user, like their name, age, or location.
+    
+    Args:
+        detail_key: What the detail is, e.g. name, age, location
+        detail_value: The detail itself
+    """
     state = state_manager.get_state()
     if 'user_details' not in state:
         state['user_details'] = {}
@@ -79,15 +87,22 @@ def add_user_detail(state_manager: StateManager, detail_key: str, detail_value:
 
 
 def update_conversation_stage(state_manager: StateManager, new_stage: str):
-    """Updates the current stage of the conversation."""
+    """Updates the current stage of the conversation.
+    
+    Args:
+        new_stage: Name of the stage the conversation is moving to
+    """
     state = state_manager.get_state()
     state['conversation_stage'] = new_stage
     return f"Stage updated to '{new_stage}'."
 
 
 def add_progress_tracker(state_manager: StateManager, task_id: int, check_in_time: str):
-    """
-    Schedules a progress check-in for a task.
+    """Schedules a progress check-in for a task.
+    
+    Args:
+        task_id: ID of the task to check in on
+        check_in_time: When to check in, in DD/MM/YY HH:MM format
     """
     state = state_manager.get_state()
     tracker_id = state['metadata']['next_progress_tracker_id']
@@ -101,6 +116,7 @@ def add_progress_tracker(state_manager: StateManager, task_id: int, check_in_tim
     }
 
     state['progress_trackers'].append(new_tracker)
+    state_manager.index.note_added('progress_trackers', new_tracker)
     return f"Progress tracker {tracker_id} scheduled for task {task_id} at {check_in_time}."
 
 
@@ -121,32 +137,50 @@ def list_progress_trackers(state_manager: StateManager):
 
 
 def update_progress_tracker(state_manager: StateManager, tracker_id: int, field_to_update: str, new_value: str):
-    """Updates a specific field of a progress tracker"""
-    state = state_manager.get_state()
-    trackers = state.get('progress_trackers', [])
+    """Updates a specific field of a progress tracker
     
-    for tracker in trackers:
-        if tracker.get('tracker_id') == tracker_id:
-            tracker[field_to_update] = new_value
-            return f"Updated progress tracker {tracker_id}."
+    Args:
+        tracker_id: ID of the progress tracker
+        field_to_update: Tracker field to change, e.g. check_in_time, status
+        new_value: New value for the field
+    """
+    tracker = state_manager.index.tracker(tracker_id)
+    if tracker:
+        old_value = tracker.get(field_to_update)
+        tracker[field_to_update] = new_value
+        state_manager.index.note_changed('progress_trackers', tracker, field_to_update, old_value)
+        return f"Updated progress tracker {tracker_id}."
     
     return f"Error: Progress tracker with ID {tracker_id} not found."
 
 
 def add_insight(state_manager: StateManager, insight_text: str, insight_type: str = "general"):
-    """Adds an insight or reflection to the user's data"""
+    """Adds an insight or reflection to the user's data
+    
+    Args:
+        insight_text: The insight or reflection, in a sentence or two
+        insight_type: Kind of insight, e.g. general, pattern, motivation
+    """
     state = state_manager.get_state()
     if 'insights' not in state:
         state['insights'] = []
     
+    # Ids come from a counter so they stay unique once old insights expire
+    metadata = state.setdefault('metadata', {})
+    insight_id = metadata.get('next_insight_id') or max(
+        [i.get('insight_id', 0) for i in state['insights'] if isinstance(i, dict)] + [0]
+    ) + 1
+    metadata['next_insight_id'] = insight_id + 1
+    
     insight = {
-        "insight_id": len(state['insights']) + 1,
+        "insight_id": insight_id,
         "text": insight_text,
         "type": insight_type,
         "timestamp": datetime.now().isoformat()
     }
     
     state['insights'].append(insight)
+    state_manager.enforce_retention('insights')
     return f"Added insight: {insight_text}"
 
 
@@ -3,17 +3,21 @@ NAVI Interface Adapters
 Thin presentation layers over the unified conversation engine
 """
 
+import os
+import json
+import time
 import asyncio
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable, List, Set
 from abc import ABC, abstractmethod
 
-from telegram import Update
+from telegram import Update, Message
+from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 
 # Local imports - updated for new package structure
 from ..core.engine.conversation import NaviConversationEngine, NaviResponse
-from ..core.state.manager import StateManager
+from ..core.engine.pool import get_engine
 
 
 logger = logging.getLogger(__name__)
@@ -183,12 +187,195 @@ Available Commands:
             return True
 
 
+TELEGRAM_MESSAGE_LIMIT = 4096
+DEFAULT_EDIT_INTERVAL = 1.0
+
+
+def telegram_streaming_enabled() -> bool:
+    """Whether replies are streamed into Telegram as they're generated, via NAVI_TELEGRAM_STREAMING"""
+    return os.environ.get('NAVI_TELEGRAM_STREAMING', 'true').lower() in ('1', 'true', 'yes')
+
+
+class TelegramStreamingReply:
+    """
+    A Telegram reply that grows while the response streams in.
+    
+    The first text is sent as a new message, which is then edited in place at
+    most every `interval` seconds (NAVI_TELEGRAM_EDIT_INTERVAL), since Telegram
+    rate-limits edits. Partial text is sent plain; finish() applies Markdown.
+    """
+    
+    def __init__(self, message: Message, interval: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if interval is None:
+            try:
+                interval = float(os.environ.get('NAVI_TELEGRAM_EDIT_INTERVAL', DEFAULT_EDIT_INTERVAL))
+            except ValueError:
+                interval = DEFAULT_EDIT_INTERVAL
+        self.message = message
+        self.interval = interval
+        self.clock = clock
+        self.sent: Optional[Message] = None
+        self.shown = ''
+        self._last_edit = 0.0
+    
+    @property
+    def started(self) -> bool:
+        return self.sent is not None
+    
+    async def update(self, text: str):
+        """Show the text so far, unless the last edit was too recent"""
+        text = text.strip()
+        if not text or text == self.shown:
+            return
+        if len(text) > TELEGRAM_MESSAGE_LIMIT:
+            text = text[:TELEGRAM_MESSAGE_LIMIT - 1] + '…'
+        now = self.clock()
+        try:
+            if self.sent is None:
+                self.sent = await self.message.reply_text(text)
+            elif now - self._last_edit >= self.interval:
+                await self.sent.edit_text(text)
+            else:
+                return
+            self.shown = text
+            self._last_edit = now
+        except TelegramError as e:
+            logger.warning(f"Failed to update streaming reply: {e}")
+    
+    async def finish(self, text: str):
+        """Replace the streamed text with the final reply, continuing in new messages if it's too long"""
+        chunks = [text[i:i + TELEGRAM_MESSAGE_LIMIT] for i in range(0, len(text), TELEGRAM_MESSAGE_LIMIT)] or ['']
+        first, rest = chunks[0], chunks[1:]
+        try:
+            await self._show(first, parse_mode='Markdown')
+            for chunk in rest:
+                await self.message.reply_text(chunk, parse_mode='Markdown')
+        except TelegramError as markdown_error:
+            logger.warning(f"Markdown parsing failed, sending as plain text: {markdown_error}")
+            await self._show(first)
+            for chunk in rest:
+                await self.message.reply_text(chunk)
+    
+    async def _show(self, text: str, parse_mode: Optional[str] = None):
+        if self.sent is None:
+            self.sent = await self.message.reply_text(text, parse_mode=parse_mode)
+        elif text != self.shown or parse_mode:
+            await self.sent.edit_text(text, parse_mode=parse_mode)
+        self.shown = text
+
+
+DEFAULT_COALESCE_MS = 700
+DEFAULT_COALESCE_MAX_WAIT_MS = 3000
+
+
+def _env_seconds(name: str, default_ms: float) -> float:
+    try:
+        return max(0.0, float(os.environ.get(name, default_ms))) / 1000
+    except ValueError:
+        return default_ms / 1000
+
+
+class MessageCoalescer:
+    """
+    Per-user inbound queue that merges rapid-fire messages into one turn.
+
+    A user's first message waits until no other has arrived for `window`
+    seconds (NAVI_TELEGRAM_COALESCE_MS), though never longer than `max_wait`
+    (NAVI_TELEGRAM_COALESCE_MAX_WAIT_MS). Messages arriving while that user's
+    turn is running are queued and handled together as the next turn. The
+    handler gets the user's key and the batch of queued items, oldest first.
+    """
+
+    def __init__(self, handler: Callable[[Any, List[Any]], Awaitable[Any]], window: Optional[float] = None,
+                 max_wait: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.handler = handler
+        self.window = _env_seconds('NAVI_TELEGRAM_COALESCE_MS', DEFAULT_COALESCE_MS) if window is None else window
+        self.max_wait = (_env_seconds('NAVI_TELEGRAM_COALESCE_MAX_WAIT_MS', DEFAULT_COALESCE_MAX_WAIT_MS)
+                         if max_wait is None else max_wait)
+        self.clock = clock
+        self._pending: Dict[Any, List[Any]] = {}
+        self._last_arrival: Dict[Any, float] = {}
+        # Users whose queue is being drained by an earlier submit()
+        self._active: Set[Any] = set()
+
+    def pending(self, key) -> int:
+        return len(self._pending.get(key, ()))
+
+    async def submit(self, key, item) -> bool:
+        """
+        Queue an item for a user.
+
+        Returns False straight away if an earlier submit() is already draining
+        that user's queue (it will handle this item too); otherwise drains the
+        queue, batch by batch, and returns True once it's empty.
+        """
+        self._pending.setdefault(key, []).append(item)
+        self._last_arrival[key] = self.clock()
+        if key in self._active:
+            return False
+
+        self._active.add(key)
+        try:
+            while self._pending.get(key):
+                await self._debounce(key)
+                batch = self._pending.pop(key)
+                if len(batch) > 1:
+                    logger.info(f"Coalesced {len(batch)} messages from {key} into one turn")
+                try:
+                    await self.handler(key, batch)
+                except Exception as e:
+                    logger.error(f"Error handling coalesced messages from {key}: {e}")
+        finally:
+            self._active.discard(key)
+            self._last_arrival.pop(key, None)
+            if self._pending.get(key):
+                # Only if draining was cancelled; the next message picks these up
+                logger.warning(f"{len(self._pending[key])} queued messages from {key} left unhandled")
+        return True
+
+    async def _debounce(self, key):
+        """Wait until the user has been quiet for `window` seconds, or `max_wait` has passed"""
+        started = self.clock()
+        while True:
+            quiet_until = self._last_arrival.get(key, started) + self.window
+            remaining = min(quiet_until, started + self.max_wait) - self.clock()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+
 class NaviTelegramInterface(NaviInterface):
     """Telegram interface adapter"""
     
     def __init__(self, engine: NaviConversationEngine):
         super().__init__(engine)
     
+    async def stream_user_input(self, user_input: str, reply: TelegramStreamingReply,
+                                context: Dict[str, Any] = None) -> NaviResponse:
+        """Process user input, showing the reply in Telegram as it's generated"""
+        try:
+            text = ''
+            response = None
+            async for event in self.engine.stream_message(user_input, context):
+                if event.response is not None:
+                    response = event.response
+                else:
+                    text += event.text
+                    await reply.update(text)
+            
+            # Save state after processing
+            self.engine.save_state()
+            
+            return response
+            
+        except Exception as e:
+            logger.error(f"Telegram error streaming input: {e}")
+            return NaviResponse(
+                message_text="Sorry, I encountered an error processing your message. Please try again!",
+                error=str(e)
+            )
+    
     async def handle_user_input(self, user_input: str, context: Dict[str, Any] = None):
         """Process user input and return response for Telegram"""
         try:
@@ -290,13 +477,43 @@ class NaviWebInterface(NaviInterface):
                 "message": "Sorry, I encountered an error processing your message.",
                 "error": str(e)
             }
+    
+    async def stream_user_input(self, user_input: str, context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """
+        Process user input as server-sent events.
+        
+        'delta' events carry pieces of the reply as they're generated; the
+        final 'done' event carries the same fields as handle_user_input.
+        """
+        try:
+            async for event in self.engine.stream_message(user_input, context):
+                if event.response is None:
+                    yield self._sse('delta', {"text": event.text})
+                    continue
+                self.engine.save_state()
+                yield self._sse('done', {
+                    "message": event.response.message_text,
+                    "strategize": event.response.strategize_text,
+                    "tool_executions": event.response.tool_executions,
+                    "error": event.response.error
+                })
+        
+        except Exception as e:
+            logger.error(f"Web error streaming input: {e}")
+            yield self._sse('done', {
+                "message": "Sorry, I encountered an error processing your message.",
+                "error": str(e)
+            })
+    
+    @staticmethod
+    def _sse(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 # Factory function for creating engines
 def create_navi_engine(user_email: str) -> NaviConversationEngine:
-    """Factory function to create a NAVI conversation engine for a user"""
-    state_manager = StateManager(user_email=user_email)
-    return NaviConversationEngine(state_manager)
+    """Factory function returning the user's pooled NAVI conversation engine"""
+    return get_engine(user_email)
 
 
 # Factory functions for creating interfaces
@@ -9,7 +9,7 @@ import json
 import logging
 import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import List, Optional
 
 import google.generativeai as genai
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -18,8 +18,10 @@ from dotenv import load_dotenv
 
 # Local imports - updated for new package structure
 from ...core.auth.telegram_auth import TelegramSimpleAuth
-from ..adapters import create_telegram_interface
-from ...core.state.manager import StateManager
+from ..adapters import create_telegram_interface, NaviTelegramInterface, telegram_streaming_enabled, TelegramStreamingReply, MessageCoalescer
+from ...core.state.registry import get_state_manager
+from ...core.engine.pool import engine_pool
+from ...core.engine.dispatcher import turn_dispatcher
 
 # Load environment variables from project root
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
@@ -50,7 +52,10 @@ class NaviTelegramBot:
     
     def __init__(self):
         self.telegram_auth = TelegramSimpleAuth()
-        self.user_interfaces: Dict[int, object] = {}  # user_id -> NaviTelegramInterface
+        # Updates are handled concurrently; the turn dispatcher runs each user's turns
+        # (including scheduler check-ins) in order, interactive ones first
+        # A user's rapid-fire messages are merged into one turn
+        self.coalescer = MessageCoalescer(self._handle_message_batch)
         
         # Setup Gemini API
         try:
@@ -61,10 +66,7 @@ class NaviTelegramBot:
             sys.exit(1)
     
     def get_user_interface(self, user_id: int) -> Optional[object]:
-        """Get or create user interface"""
-        if user_id in self.user_interfaces:
-            return self.user_interfaces[user_id]
-        
+        """Get user interface over the user's pooled engine"""
         # Check if user is authenticated
         user_email = self.telegram_auth.get_user_email_from_telegram(user_id)
         if not user_email:
@@ -72,10 +74,7 @@ class NaviTelegramBot:
         
         # Create interface for authenticated user
         try:
-            interface = create_telegram_interface(user_email)
-            self.user_interfaces[user_id] = interface
-            logger.info(f"Created interface for user {user_id} ({user_email})")
-            return interface
+            return create_telegram_interface(user_email)
         except Exception as e:
             logger.error(f"Failed to create interface for user {user_id}: {e}")
             return None
@@ -147,9 +146,31 @@ Let's get you set up! 🚀
             )
             return
         
+        # Queue it; messages sent in quick succession or during a reply are answered together
+        await self.coalescer.submit(user_id, update)
+    
+    async def _handle_message_batch(self, user_id: int, updates: List[Update]):
+        """Run one turn for a user's queued messages, replying to the latest"""
+        update = updates[-1]
+        user_message = "\n".join(queued.message.text for queued in updates)
+        
+        user_email = self.telegram_auth.get_user_email_from_telegram(user_id)
+        if not user_email:
+            await update.message.reply_text("🔐 You need to authenticate first! Send me your 6-digit code.")
+            return
+        
         # Process message through unified interface
         try:
-            response = await interface.handle_user_input(user_message)
+            reply = None
+            # The engine is looked up once the user's turn is ours
+            async with turn_dispatcher.turn(get_state_manager(user_email)) as engine:
+                interface = NaviTelegramInterface(engine)
+                if telegram_streaming_enabled():
+                    # Show the reply while it's being generated
+                    reply = TelegramStreamingReply(update.message)
+                    response = await interface.stream_user_input(user_message, reply)
+                else:
+                    response = await interface.handle_user_input(user_message)
             
             # Format and send response
             telegram_text = response.message_text or "🤖 I'm processing your request..."
@@ -159,8 +180,11 @@ Let's get you set up! 🚀
                 tools_info = "\n\n" + "\n".join(response.tool_executions)
                 telegram_text += tools_info
             
-            # Send response
-            await self._send_response(update, telegram_text)
+            # Send response, replacing the streamed text if there was any
+            if reply is not None and reply.started:
+                await reply.finish(self._format_for_telegram(telegram_text))
+            else:
+                await self._send_response(update, telegram_text)
             
         except Exception as e:
             logger.error(f"Error processing message for user {user_id}: {e}")
@@ -362,12 +386,11 @@ Ready to boost your productivity? Just start talking! 😊
                 # Clear telegram authentication mapping
                 self.telegram_auth.clear_user_mapping(user_id)
                 
-                # Clear user interface from memory
-                if user_id in self.user_interfaces:
-                    del self.user_interfaces[user_id]
+                # Drop the user's engine so the next message starts a fresh chat
+                engine_pool.discard(user_email)
                 
                 # Clear user state and conversation history
-                sm = StateManager(user_email=user_email)
+                sm = get_state_manager(user_email)
                 sm.reset_all_data()
                 
                 logger.info(f"Reset completed for user {user_id} ({user_email})")
@@ -427,7 +450,8 @@ Ready to boost your productivity? Just start talking! 😊
         logger.info(f"Bot token configured (last 4 chars): ...{bot_token[-4:]}")
         
         # Create application
-        application = Application.builder().token(bot_token).build()
+        # Engine calls don't block the event loop, so serve users concurrently
+        application = Application.builder().token(bot_token).concurrent_updates(True).build()
         
         # Log successful connection
         logger.info("Telegram application created successfully")
@@ -2,15 +2,22 @@
 NAVI Web UI - Simple Flask interface for viewing NAVI data
 """
 
-from flask import Flask, render_template, jsonify, request, redirect, url_for, session
+from flask import Flask, Response, render_template, jsonify, request, redirect, url_for, session, stream_with_context
 import json
 import os
+import asyncio
+import threading
 from datetime import datetime
 
 # Local imports - updated for new package structure
-from ...core.state.manager import StateManager
+from ...core.state.registry import get_state_manager
 from ...core.auth.base import navi_auth
+from ...utils.atomic_write import atomic_write_json
+from ...utils.file_lock import lock_for
 from ...core.tools import list_events, list_goals, list_tasks
+from ...core.engine.usage import usage_series
+from ..adapters import create_web_interface
+import google.generativeai as genai
 from google_auth_oauthlib.flow import Flow
 from google.auth.transport.requests import Request
 import secrets
@@ -78,8 +85,7 @@ def get_current_user_state():
     else:
         user_email = session['user_email']
     
-    state_manager = StateManager(user_email=user_email)
-    return state_manager
+    return get_state_manager(user_email)
 
 def require_auth(f):
     """Decorator to require authentication"""
@@ -275,14 +281,107 @@ def settings():
 
 # API Endpoints for data
 
+def _format_timestamp(timestamp):
+    """Format an ISO/UTC timestamp for display, falling back to the raw value"""
+    if not timestamp:
+        return 'Unknown time'
+    try:
+        # Parse UTC timestamp
+        dt = datetime.fromisoformat(timestamp.replace(' UTC', '+00:00'))
+        return dt.strftime('%Y-%m-%d %H:%M:%S')
+    except:
+        return timestamp
+
+def _conversation_message_items(chat_history, gemini_api_log):
+    """Turn chat messages into conversation items, matching model messages to API log timestamps"""
+    import re
+    items = []
+    model_message_index = 0  # Track model messages for API log matching
+    for msg in chat_history:
+        if msg.get('role') in ['user', 'model', 'system']:
+            # Extract text from parts
+            text_content = ""
+            function_calls = []
+            
+            for part in msg.get('parts', []):
+                if isinstance(part, dict):
+                    if 'text' in part:
+                        text_content += part['text']
+                    elif 'function_call' in part:
+                        function_calls.append(part['function_call'])
+            
+            # Get the correct timestamp based on message role
+            actual_timestamp = msg.get('timestamp', '')
+            
+            if msg.get('role') == 'user' and text_content:
+                # For user messages: extract actual conversation time from content
+                time_match = re.search(r'Current Time: ([0-9T:.-]+)', text_content)
+                if time_match:
+                    actual_timestamp = time_match.group(1)
+                    # Ensure it has timezone info
+                    if not actual_timestamp.endswith('+00:00') and not 'Z' in actual_timestamp:
+                        actual_timestamp += '+00:00'
+            
+            elif msg.get('role') == 'model':
+                # For model messages: use Gemini API log timestamp
+                if model_message_index < len(gemini_api_log):
+                    actual_timestamp = gemini_api_log[model_message_index].get('timestamp', actual_timestamp)
+                    model_message_index += 1
+            
+            items.append({
+                'type': 'message',
+                'role': msg.get('role'),
+                'content': text_content,
+                'function_calls': function_calls,
+                'timestamp': actual_timestamp,
+                'formatted_timestamp': _format_timestamp(actual_timestamp)
+            })
+    return items
+
+def _tool_call_items(tool_executions):
+    """Turn tool execution log entries into conversation items"""
+    items = []
+    for tool_exec in tool_executions:
+        timestamp = tool_exec.get('timestamp', '')
+        items.append({
+            'type': 'tool_call',
+            'tool_name': tool_exec.get('tool_name', ''),
+            'args': tool_exec.get('args', {}),
+            'result': tool_exec.get('result', ''),
+            'timestamp': timestamp,
+            'formatted_timestamp': _format_timestamp(timestamp)
+        })
+    return items
+
+def _parse_timestamp_for_sorting(item):
+    timestamp = item.get('timestamp', '')
+    if timestamp:
+        try:
+            # Parse ISO timestamp
+            return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        except:
+            # Fallback to string sorting if parsing fails
+            return datetime.min
+    return datetime.min
+
 @app.route('/api/conversations')
 @require_auth
 def api_conversations():
-    """Get chat history data with tool calls in chronological order"""
+    """
+    Get chat history data with tool calls in chronological order.
+
+    With ?limit=N (and optionally ?before=<index>) only that page of the chat
+    history is read, and the response is {'items', 'start', 'total'}; pass the
+    returned 'start' as 'before' to fetch the previous page.
+    """
     try:
         sm = get_current_user_state()
         if not sm:
             return jsonify({'error': 'Not authenticated'}), 401
+
+        if request.args.get('limit'):
+            return jsonify(_conversations_page(sm, request.args.get('limit', type=int),
+                                               request.args.get('before', type=int)))
             
         state = sm.get_state()
         chat_history = state.get('chat_history', [])
@@ -290,104 +389,40 @@ def api_conversations():
         gemini_api_log = state.get('gemini_api_log', [])
         
         # Combine chat messages and tool calls in chronological order
-        all_items = []
-        
-        # Process chat history
-        model_message_index = 0  # Track model messages for API log matching
-        for msg in chat_history:
-            if msg.get('role') in ['user', 'model', 'system']:
-                # Extract text from parts
-                text_content = ""
-                function_calls = []
-                
-                for part in msg.get('parts', []):
-                    if isinstance(part, dict):
-                        if 'text' in part:
-                            text_content += part['text']
-                        elif 'function_call' in part:
-                            function_calls.append(part['function_call'])
-                
-                # Get the correct timestamp based on message role
-                actual_timestamp = msg.get('timestamp', '')
-                
-                if msg.get('role') == 'user' and text_content:
-                    # For user messages: extract actual conversation time from content
-                    import re
-                    time_match = re.search(r'Current Time: ([0-9T:.-]+)', text_content)
-                    if time_match:
-                        actual_timestamp = time_match.group(1)
-                        # Ensure it has timezone info
-                        if not actual_timestamp.endswith('+00:00') and not 'Z' in actual_timestamp:
-                            actual_timestamp += '+00:00'
-                
-                elif msg.get('role') == 'model':
-                    # For model messages: use Gemini API log timestamp
-                    if model_message_index < len(gemini_api_log):
-                        actual_timestamp = gemini_api_log[model_message_index].get('timestamp', actual_timestamp)
-                        model_message_index += 1
-                
-                # Parse timestamp properly
-                if actual_timestamp:
-                    try:
-                        from datetime import datetime
-                        # Parse UTC timestamp
-                        dt = datetime.fromisoformat(actual_timestamp.replace(' UTC', '+00:00'))
-                        formatted_time = dt.strftime('%Y-%m-%d %H:%M:%S')
-                    except:
-                        formatted_time = actual_timestamp
-                else:
-                    formatted_time = 'Unknown time'
-                
-                all_items.append({
-                    'type': 'message',
-                    'role': msg.get('role'),
-                    'content': text_content,
-                    'function_calls': function_calls,
-                    'timestamp': actual_timestamp,
-                    'formatted_timestamp': formatted_time
-                })
-        
-        # Process tool executions
-        for tool_exec in tool_executions:
-            timestamp = tool_exec.get('timestamp', '')
-            if timestamp:
-                try:
-                    from datetime import datetime
-                    # Parse UTC timestamp
-                    dt = datetime.fromisoformat(timestamp.replace(' UTC', '+00:00'))
-                    formatted_time = dt.strftime('%Y-%m-%d %H:%M:%S')
-                except:
-                    formatted_time = timestamp
-            else:
-                formatted_time = 'Unknown time'
-            
-            all_items.append({
-                'type': 'tool_call',
-                'tool_name': tool_exec.get('tool_name', ''),
-                'args': tool_exec.get('args', {}),
-                'result': tool_exec.get('result', ''),
-                'timestamp': timestamp,
-                'formatted_timestamp': formatted_time
-            })
+        all_items = _conversation_message_items(chat_history, gemini_api_log)
+        all_items.extend(_tool_call_items(tool_executions))
         
         # Sort all items by timestamp (convert to datetime for proper sorting)
-        def parse_timestamp_for_sorting(item):
-            timestamp = item.get('timestamp', '')
-            if timestamp:
-                try:
-                    # Parse ISO timestamp
-                    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                except:
-                    # Fallback to string sorting if parsing fails
-                    return datetime.min
-            return datetime.min
-        
-        all_items.sort(key=parse_timestamp_for_sorting)
+        all_items.sort(key=_parse_timestamp_for_sorting)
         
         return jsonify(all_items)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _conversations_page(sm, limit, before):
+    """One page of conversation items, reading only the archive segments it covers"""
+    page = sm.get_history_page('chat_history', limit=max(1, limit or 1), before=before)
+
+    # Model messages can't be matched to API log entries without the earlier
+    # history, so paged items use each message's own timestamp
+    items = _conversation_message_items(page['items'], [])
+    if items:
+        lower = _parse_timestamp_for_sorting(items[0]) if page['start'] > 0 else None
+        is_newest_page = page['start'] + len(page['items']) >= page['total']
+        upper = None if is_newest_page else _parse_timestamp_for_sorting(items[-1])
+        for tool_item in _tool_call_items(sm.get_state().get('tool_execution_log', [])):
+            ts = _parse_timestamp_for_sorting(tool_item)
+            try:
+                in_page = (lower is None or ts >= lower) and (upper is None or ts <= upper)
+            except TypeError:
+                # Naive vs aware timestamps can't be compared; keep the tool call
+                in_page = True
+            if in_page:
+                items.append(tool_item)
+    items.sort(key=_parse_timestamp_for_sorting)
+
+    return {'items': items, 'start': page['start'], 'total': page['total']}
+
 @app.route('/api/api-calls')
 @require_auth
 def api_api_calls():
@@ -416,6 +451,9 @@ def api_api_calls():
                 'name': tool_exec.get('tool_name', ''),
                 'args': tool_exec.get('args', {}),
                 'result': tool_exec.get('result', ''),
+                'duration_ms': tool_exec.get('duration_ms', 0),
+                'cached': tool_exec.get('cached', False),
+                'cache_hit_rate': tool_exec.get('cache_hit_rate'),
                 'timestamp': tool_exec.get('timestamp', 'Unknown time')
             })
         
@@ -429,6 +467,11 @@ def api_api_calls():
                 'response_time_ms': api_call.get('response_time_ms', 0),
                 'tokens_in': api_call.get('tokens_in', 0),
                 'tokens_out': api_call.get('tokens_out', 0),
+                'cached_tokens': api_call.get('cached_tokens', 0),
+                'total_tokens': api_call.get('total_tokens', 0),
+                'flow': api_call.get('flow', 'chat'),
+                'estimated': api_call.get('estimated', 'total_tokens' not in api_call),
+                'budget_exhausted': api_call.get('budget_exhausted'),
                 'timestamp': api_call.get('timestamp', 'Unknown time')
             })
         
@@ -440,6 +483,21 @@ def api_api_calls():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/usage')
+@require_auth
+def api_usage():
+    """Get daily token usage per flow (chat, reflection, tracker) as time series"""
+    try:
+        sm = get_current_user_state()
+        if not sm:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        days = request.args.get('days', 30, type=int)
+        days = max(1, min(days, 365)) if days else None
+        return jsonify(usage_series(sm.get_state(), days))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/goals-tasks')
 @require_auth
 def api_goals_tasks():
@@ -452,15 +510,11 @@ def api_goals_tasks():
         state = sm.get_state()
         
         goals = state.get('goals', [])
-        tasks = state.get('tasks', [])
         
-        # Import the enhanced goal functions
-        from ...core.tools.goals import calculate_goal_progress
-        
-        # Group tasks by goal and add progress data
+        # Group tasks by goal (via the goal_id index) and add progress data
         goals_with_tasks = []
         for goal in goals:
-            goal_tasks = [task for task in tasks if task.get('goal_id') == goal.get('goal_id')]
+            goal_tasks = sm.index.tasks_for_goal(goal.get('goal_id'))
             
             # Calculate progress data
             bot_assessment = goal.get('bot_goal_assesment_percentage', 0)
@@ -509,7 +563,7 @@ def api_goals_tasks():
         
         return jsonify({
             'goals': goals_with_tasks,
-            'orphan_tasks': [task for task in tasks if not any(task.get('goal_id') == g.get('goal_id') for g in goals)]
+            'orphan_tasks': sm.index.orphan_tasks()
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -653,22 +707,6 @@ def api_progress_trackers():
             
         state = sm.get_state()
         trackers = state.get('progress_trackers', [])
-        tasks = state.get('tasks', [])
-        goals = state.get('goals', [])
-        
-        # Helper function to find task by ID
-        def find_task_by_id(task_id):
-            for task in tasks:
-                if task.get('task_id') == task_id:
-                    return task
-            return None
-        
-        # Helper function to find goal by ID
-        def find_goal_by_id(goal_id):
-            for goal in goals:
-                if goal.get('goal_id') == goal_id:
-                    return goal
-            return None
         
         # Separate task-specific trackers from general check-ins
         task_trackers = []
@@ -687,9 +725,9 @@ def api_progress_trackers():
                 })
             else:
                 # Task-specific tracker
-                task = find_task_by_id(task_id)
+                task = sm.index.task(task_id)
                 if task:
-                    goal = find_goal_by_id(task.get('goal_id'))
+                    goal = sm.index.goal(task.get('goal_id'))
                     task_trackers.append({
                         'tracker_id': tracker.get('tracker_id'),
                         'task_id': task_id,
@@ -729,6 +767,64 @@ def api_progress_trackers():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# One chat turn at a time per user; a second tab gets a 409 rather than interleaving
+_chat_locks = {}
+_chat_locks_guard = threading.Lock()
+_gemini_configured = False
+
+
+def _iterate_async(agen):
+    """Drive an async generator from Flask's synchronous response streaming"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+@require_auth
+def api_chat_stream():
+    """Send a message to NAVI and stream the reply as server-sent events"""
+    global _gemini_configured
+    sm = get_current_user_state()
+    if not sm:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    payload = request.get_json(silent=True) or request.form
+    message = (payload.get('message') or '').strip()
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    with _chat_locks_guard:
+        lock = _chat_locks.setdefault(sm.user_email, threading.Lock())
+    if not lock.acquire(blocking=False):
+        return jsonify({'error': 'Another message is still being answered'}), 409
+    
+    try:
+        if not _gemini_configured and os.environ.get('GEMINI_API_KEY'):
+            genai.configure(api_key=os.environ['GEMINI_API_KEY'])
+            _gemini_configured = True
+        interface = create_web_interface(sm.user_email)
+        interface.engine.sync_history()
+    except Exception as e:
+        lock.release()
+        return jsonify({'error': str(e)}), 500
+    
+    def events():
+        try:
+            yield from _iterate_async(interface.stream_user_input(message))
+        finally:
+            lock.release()
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/generate-auth-code', methods=['POST'])
 def generate_auth_code():
     """Generate a new authentication code for Telegram bot"""
@@ -760,24 +856,24 @@ def generate_auth_code():
         # Set expiration time (30 minutes)
         expiry = datetime.now() + timedelta(minutes=30)
         
-        # Load existing codes
+        # Load existing codes (locked against the bot redeeming one meanwhile)
         codes_file = os.path.join(PROJECT_ROOT, 'telegram_auth_codes.json')
-        try:
-            with open(codes_file, 'r') as f:
-                codes_data = json.load(f)
-        except FileNotFoundError:
-            codes_data = {}
-        
-        # Store new code
-        codes_data[code] = {
-            'email': user_email,
-            'expires_at': expiry.isoformat(),
-            'used': False
-        }
-        
-        # Save codes
-        with open(codes_file, 'w') as f:
-            json.dump(codes_data, f, indent=2)
+        with lock_for(codes_file).write():
+            try:
+                with open(codes_file, 'r') as f:
+                    codes_data = json.load(f)
+            except FileNotFoundError:
+                codes_data = {}
+            
+            # Store new code
+            codes_data[code] = {
+                'email': user_email,
+                'expires_at': expiry.isoformat(),
+                'used': False
+            }
+            
+            # Save codes
+            atomic_write_json(codes_file, codes_data, indent=2)
         
         # Log the generated code
         auth_logger.info(f"WEB_UI: Generated auth code '{code}' for user {user_email}, expires at {expiry.isoformat()}")
@@ -802,7 +898,7 @@ def get_current_auth_code():
         # Load codes
         codes_file = os.path.join(PROJECT_ROOT, 'telegram_auth_codes.json')
         try:
-            with open(codes_file, 'r') as f:
+            with lock_for(codes_file).read(), open(codes_file, 'r') as f:
                 codes_data = json.load(f)
         except FileNotFoundError:
             return jsonify({'code': None, 'expiry': None})
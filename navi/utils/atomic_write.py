@@ -0,0 +1,153 @@
+"""
+Atomic File Writes
+Crash-safe replacement of JSON stores via temp file, fsync and rename
+"""
+
+import os
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def _fsync_directory(directory: str):
+    """Make a rename inside directory durable (no-op where directories can't be opened)"""
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_temp(path: str, data: bytes) -> str:
+    """Write data next to path in a uniquely named temp file and fsync it"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def _replace_file(path: str, data: bytes, sync_directory: bool = True):
+    tmp_path = _write_temp(path, data)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if sync_directory:
+        _fsync_directory(os.path.dirname(path))
+
+
+class _Batch:
+    """Writes collected during one group-commit window"""
+
+    def __init__(self):
+        self.items: Dict[str, bytes] = {}
+        self.errors: Dict[str, Exception] = {}
+        self.done = threading.Event()
+
+
+class GroupCommitter:
+    """
+    Batches atomic writes that arrive within a short window.
+
+    Writers block until the batch holding their data is durable. Repeated writes to
+    the same path within a window collapse into one write, and each directory is
+    fsynced once per batch however many files in it were replaced.
+    """
+
+    def __init__(self, window_ms: float):
+        self.window = window_ms / 1000.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._open = _Batch()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, path: str, data: bytes):
+        with self._lock:
+            batch = self._open
+            batch.items[path] = data
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='atomic-write-commit', daemon=True)
+                self._thread.start()
+            self._wakeup.set()
+
+        batch.done.wait()
+        error = batch.errors.get(path)
+        if error is not None:
+            raise error
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.window)
+            with self._lock:
+                batch, self._open = self._open, _Batch()
+                self._wakeup.clear()
+            self._commit(batch)
+
+    def _commit(self, batch: _Batch):
+        directories = set()
+        for path, data in batch.items.items():
+            try:
+                _replace_file(path, data, sync_directory=False)
+                directories.add(os.path.dirname(path))
+            except Exception as e:
+                logger.error(f"Atomic write of {path} failed: {e}")
+                batch.errors[path] = e
+        for directory in directories:
+            _fsync_directory(directory)
+        batch.done.set()
+
+
+_committer: Optional[GroupCommitter] = None
+_committer_lock = threading.Lock()
+
+
+def _group_committer() -> Optional[GroupCommitter]:
+    """The shared committer when NAVI_FSYNC_BATCH_MS enables group commit"""
+    global _committer
+    window_ms = float(os.environ.get('NAVI_FSYNC_BATCH_MS', '0') or 0)
+    if window_ms <= 0:
+        return None
+    with _committer_lock:
+        if _committer is None or _committer.window != window_ms / 1000.0:
+            _committer = GroupCommitter(window_ms)
+        return _committer
+
+
+def atomic_write(path: str, data: Union[str, bytes]):
+    """
+    Replace the file at path with data so readers see either the old or the new
+    contents, never a truncated mix, even if the process or machine crashes.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    committer = _group_committer()
+    if committer is not None:
+        committer.write(path, data)
+    else:
+        _replace_file(path, data)
+
+
+def atomic_write_json(path: str, obj: Any, **dump_kwargs):
+    """Serialize obj with json.dumps(**dump_kwargs) and write it atomically."""
+    # Serialize up front so an unserializable value never touches the file
+    atomic_write(path, json.dumps(obj, **dump_kwargs))
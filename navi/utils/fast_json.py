@@ -0,0 +1,54 @@
+"""
+Fast JSON
+JSON encoding and decoding that uses orjson when it is installed
+"""
+
+import json
+import logging
+from typing import Any, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON document from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, pretty: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    Serialize obj to UTF-8 JSON bytes.
+
+    pretty indents the output for files people read by hand (two spaces with
+    orjson, four with the standard library); otherwise output is compact.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # orjson is stricter than json for a few inputs (e.g. ints over 64 bits);
+            # let the standard library decide whether the value is serializable
+            pass
+
+    if pretty:
+        text = json.dumps(obj, indent=4, sort_keys=sort_keys)
+    else:
+        text = json.dumps(obj, sort_keys=sort_keys, separators=(',', ':'))
+    return text.encode('utf-8')
+
+
+def dumps_str(obj: Any, sort_keys: bool = False) -> str:
+    """Compact JSON as a str, for fingerprints and log lines."""
+    return dumps(obj, sort_keys=sort_keys).decode('utf-8')
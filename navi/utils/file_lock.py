@@ -0,0 +1,140 @@
+"""
+File Locking
+Advisory inter-process read/write locks for files shared by the web and Telegram processes
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+# How long to wait for a lock before giving up, in seconds
+DEFAULT_TIMEOUT = 30.0
+POLL_INTERVAL = 0.01
+
+
+class LockTimeout(TimeoutError):
+    """Raised when a file lock can't be acquired within the timeout."""
+
+
+def lock_timeout() -> float:
+    """Lock wait limit configured via NAVI_LOCK_TIMEOUT (seconds)"""
+    try:
+        return float(os.environ.get('NAVI_LOCK_TIMEOUT', DEFAULT_TIMEOUT))
+    except ValueError:
+        return DEFAULT_TIMEOUT
+
+
+class FileLock:
+    """
+    flock()-based lock on `<path>.lock`, held shared by readers or exclusively by a writer.
+
+    Other processes are excluded by the flock; threads of this process by an
+    RLock, so both modes are exclusive within a process. The lock is reentrant
+    per thread: taking write() inside read() upgrades the flock and drops back
+    to shared afterwards. Use lock_for() so every user of a path shares one
+    instance. Without fcntl (Windows) only the in-process lock is taken.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.timeout = lock_timeout() if timeout is None else timeout
+        self._thread_lock = threading.RLock()
+        self._fd: Optional[int] = None
+        self._exclusive = False
+        self._depth = 0
+
+    @contextmanager
+    def read(self):
+        """Hold the lock shared (other processes may read concurrently)"""
+        with self._hold(exclusive=False):
+            yield
+
+    @contextmanager
+    def write(self):
+        """Hold the lock exclusively"""
+        with self._hold(exclusive=True):
+            yield
+
+    @contextmanager
+    def _hold(self, exclusive: bool):
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise LockTimeout(f"Timed out waiting for {self.lock_path}")
+        try:
+            was_exclusive = self._exclusive
+            if self._depth == 0:
+                self._open()
+                self._flock(exclusive)
+            elif exclusive and not was_exclusive:
+                self._flock(True)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._close()
+                elif self._exclusive != was_exclusive:
+                    self._flock(was_exclusive)
+        finally:
+            self._thread_lock.release()
+
+    def _open(self):
+        if fcntl is None:
+            return
+        directory = os.path.dirname(self.lock_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _flock(self, exclusive: bool):
+        if self._fd is None:
+            self._exclusive = exclusive
+            return
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(self._fd, operation | fcntl.LOCK_NB)
+                self._exclusive = exclusive
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    if self._depth == 0:
+                        self._close()
+                    raise LockTimeout(f"Timed out waiting for {self.lock_path}")
+                time.sleep(POLL_INTERVAL)
+
+    def _close(self):
+        self._exclusive = False
+        if self._fd is None:
+            return
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+_locks: Dict[str, FileLock] = {}
+_locks_guard = threading.Lock()
+
+
+def lock_for(path: str) -> FileLock:
+    """The process-wide FileLock for a path"""
+    key = os.path.abspath(path)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = FileLock(key)
+        return lock
@@ -0,0 +1,52 @@
+"""
+Stress test: several processes saving the same user's state at once
+"""
+
+import multiprocessing
+import time
+
+import pytest
+
+from navi.core.state.manager import StateManager
+from navi.core.tools.goals import add_goal
+
+PROCESSES = 4
+TURNS = 15
+
+
+def _run_turns(path, worker, journaled, start):
+    manager = StateManager(filepath=path, backend='json', journaled=journaled, segmented=False)
+    manager.get_state()
+    start.wait(10)
+    for turn in range(TURNS):
+        state = manager.get_state()
+        add_goal(manager, f"goal {worker}-{turn}", 'Test', '', '', '', '', '')
+        state['chat_history'].append({'role': 'user', 'parts': [{'text': f"message {worker}-{turn}"}]})
+        # A turn takes a while; others save in the meantime
+        time.sleep(0.002)
+        manager.save_state()
+
+
+@pytest.mark.parametrize('journaled', [False, True])
+def test_processes_hammering_one_user_lose_nothing(tmp_path, journaled):
+    path = str(tmp_path / 'state.json')
+    StateManager(filepath=path, backend='json', journaled=journaled, segmented=False).get_state()
+
+    ctx = multiprocessing.get_context('fork')
+    start = ctx.Barrier(PROCESSES)
+    workers = [ctx.Process(target=_run_turns, args=(path, w, journaled, start)) for w in range(PROCESSES)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(60)
+        assert process.exitcode == 0
+
+    state = StateManager(filepath=path, backend='json', journaled=journaled, segmented=False).get_state()
+    expected = {f"{w}-{t}" for w in range(PROCESSES) for t in range(TURNS)}
+
+    goal_ids = [g['goal_id'] for g in state['goals']]
+    assert {g['title'].split()[1] for g in state['goals']} == expected
+    assert len(goal_ids) == len(set(goal_ids)) == PROCESSES * TURNS
+    assert state['metadata']['next_goal_id'] > max(goal_ids)
+    assert {m['parts'][0]['text'].split()[1] for m in state['chat_history']} == expected
+    assert state['metadata']['version'] == PROCESSES * TURNS + 1
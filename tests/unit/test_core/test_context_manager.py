@@ -0,0 +1,50 @@
+"""
+Test suite for the per-turn context, which only lists the goals when they changed
+"""
+
+from navi.core.engine.conversation import GOALS_UNCHANGED, NaviContextManager
+from navi.core.state.manager import StateManager
+
+
+def _context_manager(tmp_path):
+    manager = StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                           journaled=False, segmented=False)
+    manager.get_state()['goals'] = [{'goal_id': 1, 'title': 'Run a 10k', 'category': 'Health'}]
+    return NaviContextManager(manager), manager
+
+
+class TestGoalsDiffing:
+    """The goals block is sent once, then again only after a change"""
+
+    def test_unchanged_goals_are_not_resent(self, tmp_path):
+        context_manager, _ = _context_manager(tmp_path)
+
+        first = context_manager.build_context('hello')
+        second = context_manager.build_context('and again')
+
+        assert 'Run a 10k' in first
+        assert 'Run a 10k' not in second
+        assert GOALS_UNCHANGED in second
+
+    def test_changed_goals_are_resent(self, tmp_path):
+        context_manager, manager = _context_manager(tmp_path)
+        context_manager.build_context('hello')
+
+        manager.get_state()['goals'].append({'goal_id': 2, 'title': 'Read 12 books', 'category': 'Learning'})
+        context = context_manager.build_context('I added one')
+
+        assert 'Run a 10k' in context and 'Read 12 books' in context
+
+    def test_goals_are_resent_after_the_chat_is_replaced(self, tmp_path):
+        context_manager, _ = _context_manager(tmp_path)
+        context_manager.build_context('hello')
+
+        context_manager.forget_sent_goals()
+
+        assert 'Run a 10k' in context_manager.build_context('hello again')
+
+    def test_system_notifications_pass_through(self, tmp_path):
+        context_manager, _ = _context_manager(tmp_path)
+        message = "**SYSTEM NOTIFICATION: check in**"
+        assert context_manager.build_context(message) == message
+        assert 'Run a 10k' in context_manager.build_context('hello')
@@ -0,0 +1,121 @@
+"""
+Test suite for the token-budgeted context window and its rolling digest
+"""
+
+from unittest.mock import Mock, patch
+
+from navi.core.engine.context_window import (
+    ContextWindowManager, DIGEST_OPEN, digest_messages, estimate_tokens, strip_digest
+)
+from navi.core.engine.conversation import NaviConversationEngine
+from navi.core.state.manager import StateManager
+
+
+def _message(role, text):
+    return {'role': role, 'parts': [{'text': text}]}
+
+
+def _conversation(turns, reply_size=10, first=0):
+    history = []
+    for turn in range(first, first + turns):
+        history.append(_message('user', f"question {turn}"))
+        history.append(_message('model', f"<strategize>thinking {turn}</strategize><message>answer {turn} "
+                                         + 'x' * reply_size + "</message>"))
+    return history
+
+
+class TestEstimateTokens:
+    """Per-message token estimates"""
+
+    def test_counts_are_cached_on_the_message(self):
+        message = _message('user', 'a' * 400)
+        assert estimate_tokens(message) == 104
+        message['parts'][0]['text'] = ''
+        assert estimate_tokens(message) == 104
+
+    def test_function_calls_count(self):
+        message = {'role': 'model', 'parts': [{'function_call': {'name': 'add_task', 'args': {'title': 'Run'}}}]}
+        assert estimate_tokens(message) > 4
+
+
+class TestContextWindowManager:
+    """What is kept, and what goes into the digest"""
+
+    def test_history_under_budget_is_kept(self):
+        history = _conversation(30)
+        state = {}
+        manager = ContextWindowManager(max_tokens=10000, recent_messages=4)
+
+        assert manager.fit(history, state) is history
+        assert 'context_digest' not in state
+
+    def test_older_turns_fold_into_digest(self):
+        history = _conversation(30)
+        state = {}
+        manager = ContextWindowManager(max_tokens=1200, recent_messages=4, digest_tokens=1000)
+
+        kept = manager.fit(history, state)
+        folded = len(history) - len(kept)
+
+        assert len(kept) >= 4 and kept[0]['role'] == 'user'
+        assert kept == history[folded:]
+        digest = state['context_digest']
+        assert digest['messages'] == folded
+        assert digest['lines'][:2] == ['User: question 0', 'Navi: answer 0 ' + 'x' * 10]
+        assert 'thinking' not in ' '.join(digest['lines'])
+
+    def test_huge_messages_dont_keep_the_window(self):
+        history = _conversation(5, reply_size=4000)
+        state = {}
+        manager = ContextWindowManager(max_tokens=1500, recent_messages=20, digest_tokens=200)
+
+        kept = manager.fit(history, state)
+
+        # Only the last turn fits; it is kept even though it alone is close to the budget
+        assert kept == history[-2:]
+        assert state['context_digest']['messages'] == 8
+
+    def test_digest_rolls_over(self):
+        state = {}
+        manager = ContextWindowManager(max_tokens=100, recent_messages=2, digest_tokens=30)
+
+        manager.fit(_conversation(10), state)
+        first = state['context_digest']
+        kept = manager.fit(_conversation(10, first=10), state)
+
+        assert state['context_digest']['messages'] == first['messages'] + 20 - len(kept)
+        assert sum(len(line) for line in state['context_digest']['lines']) <= 30 * 4
+        # The oldest lines made way for the ones just folded
+        assert first['lines'][0] not in state['context_digest']['lines']
+        assert state['context_digest']['lines'][-1].startswith(f"Navi: answer {10 + (19 - len(kept)) // 2}")
+
+    def test_digest_messages_round_trip(self):
+        pair = digest_messages({'lines': ['User: hi'], 'messages': 1})
+        history = pair + _conversation(1)
+
+        assert pair[0]['parts'][0]['text'].startswith(DIGEST_OPEN)
+        assert strip_digest(history) == history[2:]
+        assert digest_messages({}) == []
+
+
+class TestEngineContext:
+    """The engine folds the saved history once and sends the digest in front of it"""
+
+    def test_loads_fold_once(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('NAVI_CONTEXT_MAX_TOKENS', '200')
+        monkeypatch.setenv('NAVI_CONTEXT_RECENT_MESSAGES', '4')
+        monkeypatch.setenv('NAVI_CONTEXT_DIGEST_TOKENS', '50')
+        state_manager = StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                                     journaled=False, segmented=False)
+        state_manager.get_state()['chat_history'] = _conversation(30)
+        model = Mock()
+
+        with patch('navi.core.engine.conversation.get_model', return_value=model):
+            NaviConversationEngine(state_manager)
+            folded = state_manager.get_state()['context_digest']['messages']
+            NaviConversationEngine(state_manager)
+
+        assert state_manager.get_state()['context_digest']['messages'] == folded
+        sent = model.start_chat.call_args.kwargs['history']
+        assert sent[0]['parts'][0]['text'].startswith(DIGEST_OPEN)
+        assert len(sent) == 2 + len(state_manager.get_state()['chat_history'])
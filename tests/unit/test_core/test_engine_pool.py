@@ -0,0 +1,134 @@
+"""
+Test suite for the shared model cache and the per-user engine pool
+"""
+
+import gc
+import time
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+from navi.core.engine import model_cache
+from navi.core.engine.dispatcher import TurnDispatcher
+from navi.core.engine.pool import EnginePool
+from navi.core.state.manager import StateManager
+
+
+@pytest.fixture
+def model():
+    """Shared model stub; every chat starts with the history it was given"""
+    model = Mock()
+    model.start_chat.side_effect = lambda history: Mock(history=list(history))
+    with patch('navi.core.engine.conversation.get_model', return_value=model):
+        yield model
+
+
+@pytest.fixture
+def managers(tmp_path):
+    def make(name):
+        manager = StateManager(filepath=str(tmp_path / f'{name}.json'), backend='json',
+                               journaled=False, segmented=False)
+        manager.user_email = name
+        return manager
+    return make
+
+
+class TestModelCache:
+    """The model and declarations are built once per process"""
+
+    def test_built_once(self, monkeypatch):
+        monkeypatch.setenv('NAVI_PROMPT_CACHE', 'off')
+        model_cache.clear_model_cache()
+        try:
+            with patch.object(model_cache.genai, 'GenerativeModel') as model_class, \
+                    patch.object(model_cache, 'build_tool_declarations', wraps=model_cache.build_tool_declarations) as build:
+                first = model_cache.get_model()
+                second = model_cache.get_model()
+                model_cache.get_tool_declarations()
+
+            assert first is second
+            model_class.assert_called_once()
+            build.assert_called_once()
+        finally:
+            model_cache.clear_model_cache()
+
+
+class TestEnginePool:
+    """Reuse, eviction and history revalidation of pooled engines"""
+
+    def test_same_user_gets_same_engine(self, model, managers):
+        pool = EnginePool(max_size=4, idle_seconds=60)
+        a, b = managers('a'), managers('b')
+
+        engine = pool.get(a)
+        assert pool.get(a) is engine
+        assert pool.get(b) is not engine
+        assert model.start_chat.call_count == 2
+
+    def test_idle_engines_are_evicted(self, model, managers):
+        pool = EnginePool(max_size=4, idle_seconds=60)
+        a = managers('a')
+        pool.get(a)
+
+        assert pool.evict_idle(time.monotonic() + 30) == 0
+        assert pool.evict_idle(time.monotonic() + 61) == 1
+        assert 'a' not in pool
+
+        gc.collect()
+        pool.get(a)
+        assert model.start_chat.call_count == 2
+
+    def test_least_recently_used_engine_is_evicted(self, model, managers):
+        pool = EnginePool(max_size=2, idle_seconds=60)
+        a, b, c = managers('a'), managers('b'), managers('c')
+        pool.get(a)
+        pool.get(b)
+        pool.get(a)
+        pool.get(c)
+
+        assert 'a' in pool and 'c' in pool
+        assert 'b' not in pool
+
+    def test_evicted_engine_still_in_use_is_reused(self, model, managers):
+        pool = EnginePool(max_size=1, idle_seconds=60)
+        a, b = managers('a'), managers('b')
+        held = pool.get(a)
+        pool.get(b)
+
+        assert 'a' not in pool
+        assert pool.get(a) is held
+
+    def test_reloads_history_saved_elsewhere_at_the_next_turn(self, model, managers):
+        pool = EnginePool(max_size=4, idle_seconds=60)
+        a = managers('a')
+        engine = pool.get(a)
+
+        async def turn():
+            async with TurnDispatcher().turn(engine):
+                return list(engine.chat.history)
+
+        # Our own saves don't invalidate the chat
+        engine.save_state()
+        assert asyncio.run(turn()) == []
+
+        a.get_state()['chat_history'] = [{'role': 'user', 'parts': [{'text': 'hi'}]}]
+        a.save_state()
+        # Looking the engine up leaves the chat alone; the turn reloads it
+        assert pool.get(a) is engine
+        assert engine.chat.history == []
+        assert asyncio.run(turn()) == [{'role': 'user', 'parts': [{'text': 'hi'}]}]
+
+    def test_lookup_during_a_turn_keeps_its_chat(self, model, managers):
+        pool = EnginePool(max_size=4, idle_seconds=60)
+        a = managers('a')
+        engine = pool.get(a)
+
+        async def scenario():
+            async with TurnDispatcher().turn(engine):
+                chat = engine.chat
+                a.save_state()
+                assert pool.get(a) is engine
+                return engine.chat is chat
+
+        assert asyncio.run(scenario())
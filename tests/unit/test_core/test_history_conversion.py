@@ -0,0 +1,105 @@
+"""
+Test suite for the engine's incremental conversion of chat history on save
+"""
+
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from navi.core.engine.conversation import NaviConversationEngine
+from navi.core.state.journal import StateChangeTracker
+from navi.core.state.manager import StateManager
+
+
+def _content(role, text):
+    return SimpleNamespace(role=role, parts=[SimpleNamespace(text=text, function_call=None)])
+
+
+def _engine(tmp_path, saved_history=None):
+    state_manager = StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                                 journaled=False, segmented=False)
+    state_manager.get_state()['chat_history'] = saved_history or []
+    model = Mock()
+    model.start_chat.side_effect = lambda history: Mock(history=list(history))
+    with patch('navi.core.engine.conversation.get_model', return_value=model):
+        engine = NaviConversationEngine(state_manager)
+    return engine, state_manager, model
+
+
+class TestIncrementalConversion:
+    """Only new messages are converted, and saved messages keep their timestamps"""
+
+    def test_only_new_messages_are_converted(self, tmp_path):
+        saved = [{'role': 'user', 'parts': [{'text': 'hi'}], 'timestamp': '2025-07-01T09:00:00'}]
+        engine, state_manager, _ = _engine(tmp_path, saved)
+
+        engine.chat.history += [_content('model', 'hello'), _content('user', 'plan my day')]
+        with patch.object(NaviConversationEngine, '_convert_message',
+                          wraps=NaviConversationEngine._convert_message) as convert:
+            engine.save_state()
+            assert convert.call_count == 2
+            first_save = [dict(m) for m in state_manager.get_state()['chat_history']]
+
+            engine.chat.history.append(_content('model', 'sure'))
+            engine.save_state()
+            assert convert.call_count == 3
+
+        history = state_manager.get_state()['chat_history']
+        assert [m['parts'][0]['text'] for m in history] == ['hi', 'hello', 'plan my day', 'sure']
+        assert history[0]['timestamp'] == '2025-07-01T09:00:00'
+        assert [m['timestamp'] for m in history[:3]] == [m['timestamp'] for m in first_save]
+
+    def test_messages_without_text_or_calls_are_skipped(self, tmp_path):
+        engine, state_manager, _ = _engine(tmp_path)
+        function_response = SimpleNamespace(role='user', parts=[SimpleNamespace(text='', function_call=None)])
+        engine.chat.history += [_content('user', 'hi'), function_response, _content('model', 'hello')]
+
+        engine.save_state()
+        engine.save_state()
+
+        assert len(state_manager.get_state()['chat_history']) == 2
+
+    def test_rollback_drops_converted_records(self, tmp_path):
+        engine, state_manager, _ = _engine(tmp_path)
+        engine.chat.history.append(_content('user', 'hi'))
+        engine.save_state()
+
+        engine.chat.history.append(_content('model', 'abandoned'))
+        engine.save_state()
+        engine._restart_chat(engine.chat.history[:1])
+        engine.chat.history.append(_content('model', 'hello'))
+        engine.save_state()
+
+        assert [m['parts'][0]['text'] for m in state_manager.get_state()['chat_history']] == ['hi', 'hello']
+
+    def test_folded_messages_leave_the_chat(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('NAVI_CONTEXT_MAX_TOKENS', '200')
+        monkeypatch.setenv('NAVI_CONTEXT_RECENT_MESSAGES', '4')
+        monkeypatch.setenv('NAVI_CONTEXT_DIGEST_TOKENS', '50')
+        engine, state_manager, _ = _engine(tmp_path)
+        for turn in range(20):
+            engine.chat.history += [_content('user', f'question {turn} ' + 'x' * 40),
+                                    _content('model', f'answer {turn} ' + 'y' * 40)]
+
+        engine.save_state()
+        folded = state_manager.get_state()['context_digest']['messages']
+        engine.save_state()
+
+        # Folded once, and the chat now sends the digest instead of them
+        assert state_manager.get_state()['context_digest']['messages'] == folded
+        assert len(engine.chat.history) == 2 + len(state_manager.get_state()['chat_history'])
+
+
+class TestMessageFingerprints:
+    """The journal tracker serializes each chat message once"""
+
+    def test_known_messages_are_not_serialized_again(self):
+        tracker = StateChangeTracker()
+        history = [{'role': 'user', 'parts': [{'text': f'message {i}'}]} for i in range(5)]
+        tracker.reset({'chat_history': history})
+
+        history.append({'role': 'model', 'parts': [{'text': 'reply'}]})
+        with patch.object(StateChangeTracker, '_fingerprint', wraps=StateChangeTracker._fingerprint) as fingerprint:
+            ops, _ = tracker.diff({'chat_history': list(history)})
+
+        assert fingerprint.call_count == 1
+        assert ops == [{'op': 'extend', 'key': 'chat_history', 'items': [history[-1]]}]
@@ -84,6 +84,7 @@ class TestHourlyReflectionScheduler:
         """Create mock conversation engine"""
         engine = Mock()
         engine.save_state = Mock()
+        engine.turn_lock = asyncio.Lock()
         return engine
     
     def test_scheduler_initialization(self, mock_bot):
@@ -134,13 +135,13 @@ class TestHourlyReflectionScheduler:
             assert mappings == {}
     
     @pytest.mark.asyncio
-    @patch('navi.core.scheduler.hourly_reflection_scheduler.StateManager')
-    @patch('navi.core.scheduler.hourly_reflection_scheduler.NaviConversationEngine')
-    async def test_process_user_reflection_sends_message(self, mock_engine_class, mock_sm_class, scheduler, mock_state_manager, mock_conversation_engine):
+    @patch('navi.core.scheduler.hourly_reflection_scheduler.get_state_manager')
+    @patch('navi.core.scheduler.hourly_reflection_scheduler.engine_pool')
+    async def test_process_user_reflection_sends_message(self, mock_engine_pool, mock_sm_class, scheduler, mock_state_manager, mock_conversation_engine):
         """Test reflection that results in sending a proactive message"""
         # Setup mocks
         mock_sm_class.return_value = mock_state_manager
-        mock_engine_class.return_value = mock_conversation_engine
+        mock_engine_pool.get.return_value = mock_conversation_engine
         
         # Mock AI response that decides to send a message
         ai_response = Mock()
@@ -176,13 +177,13 @@ class TestHourlyReflectionScheduler:
                         assert log_call['message_content'] == corrected_response.message_text
     
     @pytest.mark.asyncio
-    @patch('navi.core.scheduler.hourly_reflection_scheduler.StateManager')
-    @patch('navi.core.scheduler.hourly_reflection_scheduler.NaviConversationEngine')
-    async def test_process_user_reflection_silent(self, mock_engine_class, mock_sm_class, scheduler, mock_state_manager, mock_conversation_engine):
+    @patch('navi.core.scheduler.hourly_reflection_scheduler.get_state_manager')
+    @patch('navi.core.scheduler.hourly_reflection_scheduler.engine_pool')
+    async def test_process_user_reflection_silent(self, mock_engine_pool, mock_sm_class, scheduler, mock_state_manager, mock_conversation_engine):
         """Test reflection that results in silent reflection (no message sent)"""
         # Setup mocks
         mock_sm_class.return_value = mock_state_manager
-        mock_engine_class.return_value = mock_conversation_engine
+        mock_engine_pool.get.return_value = mock_conversation_engine
         
         # Mock AI response that decides to stay silent
         ai_response = Mock()
@@ -350,9 +351,9 @@ class TestHourlyReflectionScheduler:
         mock_state_manager.save_state.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('navi.core.scheduler.hourly_reflection_scheduler.StateManager')
-    @patch('navi.core.scheduler.hourly_reflection_scheduler.NaviConversationEngine')
-    async def test_run_hourly_reflections_multiple_users(self, mock_engine_class, mock_sm_class, scheduler, mock_telegram_mappings):
+    @patch('navi.core.scheduler.hourly_reflection_scheduler.get_state_manager')
+    @patch('navi.core.scheduler.hourly_reflection_scheduler.engine_pool')
+    async def test_run_hourly_reflections_multiple_users(self, mock_engine_pool, mock_sm_class, scheduler, mock_telegram_mappings):
         """Test running reflections for multiple users"""
         with patch.object(scheduler, 'telegram_mappings_path', mock_telegram_mappings):
             with patch.object(scheduler, '_process_user_reflection') as mock_process:
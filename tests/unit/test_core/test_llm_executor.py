@@ -0,0 +1,66 @@
+"""
+Test suite for off-loop LLM calls and their timeouts
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from navi.core.engine.conversation import NaviConversationEngine
+from navi.core.engine.llm_executor import LLMTimeout, run_llm_call
+from navi.core.state.manager import StateManager
+
+
+class TestRunLLMCall:
+    """The bounded pool and its timeout"""
+
+    def test_runs_off_the_event_loop(self):
+        async def main():
+            loop_thread = threading.get_ident()
+            return await run_llm_call(threading.get_ident), loop_thread
+
+        worker_thread, loop_thread = asyncio.run(main())
+        assert worker_thread != loop_thread
+
+    def test_timeout(self):
+        async def main():
+            started = time.monotonic()
+            with pytest.raises(LLMTimeout):
+                await run_llm_call(time.sleep, 1, timeout=0.05)
+            return time.monotonic() - started
+
+        assert asyncio.run(main()) < 0.5
+
+    def test_slow_call_doesnt_block_others(self):
+        async def main():
+            slow = asyncio.ensure_future(run_llm_call(time.sleep, 0.3))
+            fast_started = time.monotonic()
+            await run_llm_call(lambda: None)
+            fast_elapsed = time.monotonic() - fast_started
+            await slow
+            return fast_elapsed
+
+        assert asyncio.run(main()) < 0.2
+
+
+class TestEngineTimeout:
+    """A timed-out turn is rolled back"""
+
+    def test_timeout_restarts_chat(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('NAVI_LLM_TIMEOUT', '0.05')
+        state_manager = StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                                     journaled=False, segmented=False)
+        chat = Mock(history=['earlier turn'])
+        chat.send_message.side_effect = lambda content: time.sleep(1)
+        model = Mock()
+
+        with patch.object(NaviConversationEngine, '_initialize_ai', return_value=(model, chat)):
+            engine = NaviConversationEngine(state_manager)
+        response = asyncio.run(engine.process_message('hello'))
+
+        assert response.error == 'timeout'
+        model.start_chat.assert_called_once_with(history=['earlier turn'])
+        assert engine.chat is model.start_chat.return_value
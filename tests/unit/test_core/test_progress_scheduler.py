@@ -0,0 +1,57 @@
+"""
+Test suite for ProgressTrackerScheduler
+Tests that due trackers are handled as one background turn on the user's pooled engine
+"""
+
+import asyncio
+from unittest.mock import Mock, AsyncMock, patch
+
+import pytest
+from telegram import Bot
+
+from navi.core.engine.pool import EnginePool
+from navi.core.scheduler.progress_scheduler import ProgressTrackerScheduler
+from navi.core.state.manager import StateManager
+
+
+class TestProgressTrackerScheduler:
+    """Due trackers are notified and marked within the user's turn"""
+
+    @pytest.fixture
+    def state_manager(self, tmp_path):
+        manager = StateManager(filepath=str(tmp_path / 'user.json'), backend='json',
+                               journaled=False, segmented=False)
+        manager.user_email = 'user@example.com'
+        manager.get_state()['tasks'] = [{'task_id': 1, 'description': 'Run 5k', 'status': 'PENDING'}]
+        manager.get_state()['progress_trackers'] = [
+            {'tracker_id': 1, 'task_id': 1, 'check_in_time': '2020-01-01 09:00', 'status': 'PENDING'}
+        ]
+        manager.save_state()
+        return manager
+
+    @pytest.fixture
+    def pool(self):
+        model = Mock()
+        model.start_chat.side_effect = lambda history: Mock(history=list(history))
+        with patch('navi.core.engine.conversation.get_model', return_value=model):
+            pool = EnginePool(max_size=4, idle_seconds=60)
+            with patch('navi.core.scheduler.progress_scheduler.engine_pool', pool):
+                yield pool
+
+    def test_tracker_update_leaves_the_engine_current(self, state_manager, pool):
+        scheduler = ProgressTrackerScheduler(bot=Mock(spec=Bot))
+        engine = pool.get(state_manager)
+        seen = []
+
+        async def notify(telegram_id, user_email, tracker, manager, locked):
+            seen.append((locked, locked.turn_lock.locked()))
+
+        with patch('navi.core.scheduler.progress_scheduler.get_state_manager', return_value=state_manager), \
+                patch.object(scheduler, '_send_progress_notification', AsyncMock(side_effect=notify)):
+            asyncio.run(scheduler._check_user_trackers('42', 'user@example.com'))
+
+        assert seen == [(engine, True)]
+        assert state_manager.index.tracker(1)['status'] == 'NOTIFIED'
+        # Saved through the engine, so its chat isn't reloaded at the next turn
+        assert not engine.history_is_stale
+        assert not engine.turn_lock.locked()
@@ -0,0 +1,122 @@
+"""
+Test suite for provider-side prompt caching and its local stand-in
+"""
+
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+from navi.core.engine import model_cache
+from navi.core.engine.conversation import NaviConversationEngine
+from navi.core.engine.prompt_cache import LocalCachedContent, PromptCache
+from navi.core.state.manager import StateManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def models():
+    """Every model built from a cache is a distinct stub"""
+    with patch('navi.core.engine.prompt_cache.genai.GenerativeModel', side_effect=lambda **kwargs: Mock(**kwargs)):
+        yield
+
+
+@pytest.fixture
+def cache(models):
+    clock = Clock()
+    cache = PromptCache('gemini-2.5-flash', 'system prompt', ['tools'], mode='local',
+                        ttl=600, refresh_margin=60, clock=clock)
+    yield cache, clock
+    cache.close()
+
+
+class TestPromptCache:
+    """Creation, refreshing and recreation of the cached prompt"""
+
+    def test_created_once_and_reused(self, cache):
+        cache, clock = cache
+        model = cache.model()
+
+        assert cache.content.system_instruction == 'system prompt'
+        assert cache.content.model == 'models/gemini-2.5-flash'
+        clock.now += 500
+        assert cache.model() is model
+        assert cache.generation == 1
+
+    def test_extended_before_expiry(self, cache):
+        cache, clock = cache
+        model = cache.model()
+        content = cache.content
+        first_expiry = content.expire_time
+
+        clock.now += 550
+        with patch.object(content, 'update', wraps=content.update) as update:
+            assert cache.model() is model
+        update.assert_called_once()
+        assert content.expire_time >= first_expiry
+        assert cache.generation == 1
+
+        # Extended by a full TTL from the refresh
+        clock.now += 500
+        assert cache.model() is model
+
+    def test_recreated_when_extension_fails(self, cache):
+        cache, clock = cache
+        model = cache.model()
+        old_name = cache.content.name
+        cache.content.delete()
+
+        clock.now += 550
+        new_model = cache.model()
+        assert new_model is not model
+        assert cache.content.name != old_name
+        assert cache.generation == 2
+
+    def test_creation_failure_backs_off(self, cache):
+        cache, clock = cache
+        with patch.object(LocalCachedContent, 'create', side_effect=RuntimeError('quota')) as create:
+            assert cache.model() is None
+            clock.now += 30
+            assert cache.model() is None
+            assert create.call_count == 1
+
+        clock.now += 31
+        assert cache.model() is not None
+
+
+class TestSharedModel:
+    """The shared model uses the cache and engines follow it when it changes"""
+
+    def test_get_model_uses_local_cache(self, models, monkeypatch):
+        monkeypatch.setenv('NAVI_PROMPT_CACHE', 'local')
+        model_cache.clear_model_cache()
+        try:
+            model = model_cache.get_model()
+            assert model is model_cache.get_model()
+            assert model.system_instruction == model_cache.system_prompt
+        finally:
+            model_cache.clear_model_cache()
+
+    def test_engine_moves_chat_to_new_model(self, tmp_path):
+        state_manager = StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                                     journaled=False, segmented=False)
+        old_model, new_model = Mock(), Mock()
+        old_model.start_chat.return_value = Mock(history=['earlier turn'])
+        new_chat = new_model.start_chat.return_value
+        new_chat.send_message.return_value = Mock(candidates=[])
+
+        with patch('navi.core.engine.conversation.get_model', return_value=old_model):
+            engine = NaviConversationEngine(state_manager)
+        with patch('navi.core.engine.conversation.get_model', return_value=new_model):
+            asyncio.run(engine._send_message('hello', 'chat'))
+
+        new_model.start_chat.assert_called_once_with(history=['earlier turn'])
+        new_chat.send_message.assert_called_once_with('hello')
+        assert engine.model is new_model
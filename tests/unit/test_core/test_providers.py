@@ -0,0 +1,127 @@
+"""
+Test suite for the LLM provider interface and the scripted fake provider
+"""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from navi.core.engine import providers
+from navi.core.engine.conversation import NaviConversationEngine
+from navi.core.engine.fake_llm import FakeProvider, load_script
+from navi.core.state.manager import StateManager
+
+SCRIPT = [
+    {'when': 'weather', 'text': '<message>No idea, sorry.</message>'},
+    {'function_calls': [{'name': 'list_goals', 'args': {}}]},
+    {'text': '<message>You have one goal.</message>'},
+]
+
+
+@pytest.fixture
+def fake():
+    sleep = Mock()
+    provider = FakeProvider(SCRIPT, latency=0.25, sleep=sleep)
+    providers.set_provider(provider)
+    yield provider
+    providers.set_provider(None)
+
+
+def _engine(tmp_path):
+    state_manager = StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                                 journaled=False, segmented=False)
+    state_manager.get_state()['goals'] = [{'goal_id': 1, 'title': 'Run a marathon', 'category': 'Health'}]
+    return NaviConversationEngine(state_manager), state_manager
+
+
+class TestFakeChat:
+    """Scripted replies, history and reported usage"""
+
+    def test_replays_script_in_order_and_matches_patterns(self, fake):
+        chat = fake.model().start_chat(history=[{'role': 'user', 'parts': [{'text': 'earlier'}]}])
+
+        first = chat.send_message('plan my day')
+        assert first.candidates[0].content.parts[0].function_call.name == 'list_goals'
+        assert chat.send_message('what is the weather?').text == '<message>No idea, sorry.</message>'
+        assert chat.send_message([{'function_response': {'name': 'list_goals'}}]).text == \
+            '<message>You have one goal.</message>'
+        # The sequence starts over once it runs out
+        assert chat.send_message('again').candidates[0].content.parts[0].function_call
+
+        assert len(chat.history) == 1 + 2 * 4
+        assert fake.sleep.call_count == 4
+
+    def test_usage_grows_with_the_history(self, fake):
+        chat = fake.model().start_chat(history=[])
+        first = chat.send_message('hello there')
+        second = chat.send_message('what is the weather?')
+
+        assert first.usage_metadata.prompt_token_count > 0
+        assert second.usage_metadata.prompt_token_count > first.usage_metadata.total_token_count
+        assert fake.count_tokens('x' * 40) == 10
+
+    def test_streamed_response_arrives_in_chunks(self):
+        sleep = Mock()
+        provider = FakeProvider([{'text': 'a' * 100}], latency=0.5, chunk_chars=40, sleep=sleep)
+        response = provider.model().start_chat(history=[]).send_message('hi', stream=True)
+        sleep.assert_not_called()
+
+        assert [len(chunk.text) for chunk in response] == [40, 40, 20]
+        sleep.assert_called_once_with(0.5)
+        assert response.text == 'a' * 100
+
+    def test_jitter_is_seeded(self):
+        first = FakeProvider(latency=0.1, jitter=0.2, seed=7)
+        second = FakeProvider(latency=0.1, jitter=0.2, seed=7)
+        latencies = [first.latency() for _ in range(5)]
+        assert latencies == [second.latency() for _ in range(5)]
+        assert all(0.1 <= latency <= 0.3 for latency in latencies)
+
+
+class TestProviderSelection:
+    """NAVI_LLM_PROVIDER picks the backend"""
+
+    def test_fake_from_env(self, tmp_path, monkeypatch):
+        script = tmp_path / 'script.jsonl'
+        script.write_text('{"text": "one"}\n{"response_data": "two"}\n')
+        monkeypatch.setenv('NAVI_LLM_PROVIDER', 'fake')
+        monkeypatch.setenv('NAVI_FAKE_LLM_SCRIPT', str(script))
+        monkeypatch.setenv('NAVI_FAKE_LLM_LATENCY', '0.01')
+
+        provider = providers.create_provider()
+
+        assert isinstance(provider, FakeProvider)
+        assert provider.base_latency == 0.01
+        assert [entry.get('text', entry.get('response_data')) for entry in provider.script] == ['one', 'two']
+
+    def test_unknown_provider(self):
+        with pytest.raises(ValueError):
+            providers.create_provider('gpt')
+
+    def test_unreadable_script_is_empty(self, tmp_path):
+        assert load_script(str(tmp_path / 'missing.json')) == []
+
+
+class TestEngineOnFake:
+    """The engine runs whole turns, tool calls included, on the fake provider"""
+
+    def test_turn_with_a_tool_round(self, fake, tmp_path):
+        engine, state_manager = _engine(tmp_path)
+
+        response = asyncio.run(engine.process_message('plan my day'))
+
+        assert response.message_text == 'You have one goal.'
+        assert state_manager.get_state()['tool_execution_log'][-1]['tool_name'] == 'list_goals'
+        # Usage comes from the fake's reported counts rather than the word-count estimate
+        assert 'estimated' not in state_manager.get_state()['gemini_api_log'][-1]
+
+    def test_streamed_turn(self, fake, tmp_path):
+        engine, _ = _engine(tmp_path)
+
+        async def collect():
+            return [event async for event in engine.stream_message('plan my day')]
+
+        events = asyncio.run(collect())
+        assert ''.join(event.text for event in events if event.text) == 'You have one goal.'
+        assert events[-1].response.message_text == 'You have one goal.'
@@ -0,0 +1,129 @@
+"""
+Test suite for segmented history archives
+"""
+
+import os
+import json
+import pytest
+
+from navi.core.state.archive import HistoryArchive
+from navi.core.state.lazy import LazyState
+from navi.core.state.manager import StateManager
+
+
+def _message(i, day='2025-07-06'):
+    return {'role': 'user' if i % 2 == 0 else 'model', 'parts': [{'text': f'm{i}'}], 'timestamp': f'{day}T10:00:{i % 60:02d}'}
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / 'state.json')
+
+
+def _segmented(path):
+    return StateManager(filepath=path, backend='json', journaled=False, segmented=True)
+
+
+class TestHistoryArchive:
+    """Segment files and index"""
+
+    def test_items_are_split_by_day(self, tmp_path):
+        archive = HistoryArchive(str(tmp_path / 'history'))
+        items = [_message(0, '2025-07-05'), _message(1, '2025-07-05'), _message(2, '2025-07-06')]
+        archive.apply([{'op': 'set', 'key': 'chat_history', 'value': items}])
+
+        assert len(os.listdir(tmp_path / 'history' / 'chat_history')) == 2
+        assert HistoryArchive(str(tmp_path / 'history')).read('chat_history') == items
+
+    def test_extend_with_drop_trims_front(self, tmp_path):
+        archive = HistoryArchive(str(tmp_path / 'history'))
+        archive.apply([{'op': 'set', 'key': 'tool_execution_log', 'value': [{'n': i} for i in range(4)]}])
+        archive.apply([{'op': 'extend', 'key': 'tool_execution_log', 'items': [{'n': 4}], 'drop': 3}])
+
+        assert archive.read('tool_execution_log') == [{'n': 3}, {'n': 4}]
+        assert archive.read_range('tool_execution_log', 1, 2) == [{'n': 4}]
+        assert archive.count('tool_execution_log') == 2
+
+    def test_unindexed_tail_from_crashed_append_is_ignored(self, tmp_path):
+        archive = HistoryArchive(str(tmp_path / 'history'))
+        archive.apply([{'op': 'set', 'key': 'insights_log', 'value': [{'n': 0}]}])
+        segment_dir = tmp_path / 'history' / 'insights_log'
+        segment = segment_dir / os.listdir(segment_dir)[0]
+        with open(segment, 'ab') as f:
+            f.write(b'{"n": 1}\n{"n"')
+
+        reopened = HistoryArchive(str(tmp_path / 'history'))
+        assert reopened.read('insights_log') == [{'n': 0}]
+        reopened.apply([{'op': 'extend', 'key': 'insights_log', 'items': [{'n': 2}]}])
+        assert HistoryArchive(str(tmp_path / 'history')).read('insights_log') == [{'n': 0}, {'n': 2}]
+
+
+class TestSegmentedStateManager:
+    """History and logs live outside the main state document"""
+
+    def test_history_is_not_stored_in_state_file(self, state_path):
+        sm = _segmented(state_path)
+        sm.state['chat_history'].extend(_message(i) for i in range(3))
+        sm.state['goals'].append({'goal_id': 1, 'title': 'Run'})
+        sm.save_state()
+
+        with open(state_path) as f:
+            core = json.load(f)
+        assert 'chat_history' not in core
+        assert core['goals'] == [{'goal_id': 1, 'title': 'Run'}]
+
+    def test_loading_core_state_does_not_read_history(self, state_path):
+        sm = _segmented(state_path)
+        sm.state['chat_history'].extend(_message(i) for i in range(3))
+        sm.save_state()
+
+        fresh = _segmented(state_path)
+        state = fresh.get_state()
+        assert isinstance(state, LazyState)
+        assert state['goals'] == []
+        assert not state.is_loaded('chat_history')
+        assert 'chat_history' in state
+
+        assert [m['parts'][0]['text'] for m in state['chat_history']] == ['m0', 'm1', 'm2']
+
+    def test_appends_and_trims_round_trip(self, state_path):
+        sm = _segmented(state_path)
+        sm.state['chat_history'].extend(_message(i) for i in range(5))
+        sm.save_state()
+
+        sm.state['chat_history'] = sm.state['chat_history'][2:] + [_message(5)]
+        sm.save_state()
+
+        texts = [m['parts'][0]['text'] for m in _segmented(state_path).state['chat_history']]
+        assert texts == ['m2', 'm3', 'm4', 'm5']
+
+    def test_history_page_reads_without_loading_collection(self, state_path):
+        sm = _segmented(state_path)
+        sm.state['chat_history'].extend(_message(i) for i in range(10))
+        sm.save_state()
+
+        fresh = _segmented(state_path)
+        page = fresh.get_history_page('chat_history', limit=3, before=5)
+
+        assert page['start'] == 2 and page['total'] == 10
+        assert [m['parts'][0]['text'] for m in page['items']] == ['m2', 'm3', 'm4']
+        assert not fresh.get_state().is_loaded('chat_history')
+
+    def test_existing_state_file_is_migrated_and_back(self, state_path):
+        plain = StateManager(filepath=state_path, backend='json', journaled=False, segmented=False)
+        plain.state['chat_history'].append(_message(0))
+        plain.save_state()
+
+        segmented = _segmented(state_path)
+        segmented.get_state()
+        segmented.save_state()
+        with open(state_path) as f:
+            assert 'chat_history' not in json.load(f)
+        assert _segmented(state_path).state['chat_history'] == [_message(0)]
+
+        back = StateManager(filepath=state_path, backend='json', journaled=False, segmented=False)
+        assert back.state['chat_history'] == [_message(0)]
+        back.save_state()
+        with open(state_path) as f:
+            assert json.load(f)['chat_history'] == [_message(0)]
+        assert not os.path.exists(os.path.splitext(state_path)[0] + '.history/index.json')
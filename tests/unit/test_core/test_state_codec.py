@@ -0,0 +1,84 @@
+"""
+Test suite for compact on-disk state formats
+"""
+
+import json
+import pytest
+
+from navi.core.state.codec import StateCodec, decode_state, detect_format
+from navi.core.state.manager import StateManager
+
+
+def _sample_state():
+    return {'goals': [{'goal_id': 1, 'title': 'Run'}], 'chat_history': [{'role': 'user', 'parts': [{'text': 'hi'}]}]}
+
+
+class TestStateCodec:
+    """Encoding and format detection"""
+
+    def test_compact_json_round_trip(self):
+        codec = StateCodec('compact', 'none')
+        data = codec.encode(_sample_state())
+
+        assert b'\n' not in data
+        assert detect_format(data) == 'json'
+        assert decode_state(data) == _sample_state()
+
+    def test_pretty_and_compact_are_told_apart(self):
+        pretty = StateCodec('json', 'none').encode(_sample_state())
+
+        assert StateCodec('json', 'none').matches(pretty)
+        assert not StateCodec('compact', 'none').matches(pretty)
+
+    def test_msgpack_round_trip(self):
+        pytest.importorskip('ormsgpack')
+        codec = StateCodec('msgpack', 'none')
+        data = codec.encode(_sample_state())
+
+        assert detect_format(data) == 'msgpack'
+        assert decode_state(data) == _sample_state()
+
+    def test_zstd_round_trip(self):
+        pytest.importorskip('zstandard')
+        codec = StateCodec('compact', 'zstd')
+        data = codec.encode(_sample_state())
+
+        assert detect_format(data) == 'zstd'
+        assert decode_state(data) == _sample_state()
+
+    def test_unknown_format_falls_back_to_json(self):
+        assert StateCodec('yaml', 'lz4').format == 'json'
+
+
+class TestStateFormatMigration:
+    """Existing files are read in any format and rewritten in the configured one"""
+
+    def test_pretty_state_file_is_migrated_on_next_save(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'state.json')
+        legacy = StateManager(filepath=path, backend='json', journaled=False)
+        legacy.state['user_details']['name'] = 'Ada'
+        legacy.save_state()
+
+        monkeypatch.setenv('NAVI_STATE_FORMAT', 'compact')
+        sm = StateManager(filepath=path, backend='json', journaled=False)
+        assert sm.state['user_details'] == {'name': 'Ada'}
+
+        sm.save_state()
+        with open(path, 'rb') as f:
+            data = f.read()
+        assert b'\n' not in data
+        assert json.loads(data)['user_details'] == {'name': 'Ada'}
+
+    def test_journaled_mode_rewrites_snapshot_in_new_format(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'state.json')
+        StateManager(filepath=path, backend='json', journaled=True).save_state()
+
+        monkeypatch.setenv('NAVI_STATE_FORMAT', 'compact')
+        sm = StateManager(filepath=path, backend='json', journaled=True)
+        sm.state['conversation_stage'] = 'Goal Definition'
+        sm.save_state()
+
+        with open(path, 'rb') as f:
+            assert b'\n' not in f.read()
+        reloaded = StateManager(filepath=path, backend='json', journaled=True)
+        assert reloaded.state['conversation_stage'] == 'Goal Definition'
@@ -0,0 +1,73 @@
+"""
+Test suite for the goal/task/tracker secondary indexes
+"""
+
+import pytest
+
+from navi.core.state.manager import StateManager
+from navi.core.tools.goals import add_goal, calculate_goal_progress, update_goal
+from navi.core.tools.tasks import add_task, list_tasks, update_task
+from navi.core.tools.utilities import add_progress_tracker, update_progress_tracker
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr('navi.core.tools.calendar_tools.add_event', lambda *args: 'Calendar unavailable')
+    return StateManager(filepath=str(tmp_path / 'state.json'), backend='json', journaled=False, segmented=False)
+
+
+def _add_task(manager, goal_id, title):
+    add_task(manager, goal_id, title, title, 'done', '2025-07-01T10:00', '2025-07-01T11:00', 'High', 'Low')
+
+
+class TestStateIndex:
+    """Lookups stay correct as the tools mutate state"""
+
+    def test_lookups_follow_tool_mutations(self, manager):
+        add_goal(manager, 'Run', 'Health', 'Run a 10k', 'Finish', '2025-12-01', 'High', 'Low')
+        add_goal(manager, 'Save', 'Finance', 'Save money', 'Saved', '2025-12-01', 'High', 'Low')
+        _add_task(manager, 1, 'Jog')
+        _add_task(manager, 1, 'Sprint')
+        _add_task(manager, 2, 'Budget')
+        _add_task(manager, 99, 'Stray')
+        index = manager.index
+
+        assert index.goal(2)['title'] == 'Save'
+        assert [t['title'] for t in index.tasks_for_goal(1)] == ['Jog', 'Sprint']
+        assert [t['title'] for t in index.orphan_tasks()] == ['Stray']
+
+        update_task(manager, 1, 'status', 'COMPLETED')
+        assert calculate_goal_progress(manager, 1) == 50
+        assert [t['title'] for t in index.tasks_with_status('pending')] == ['Sprint', 'Budget', 'Stray']
+
+        # Moving a task keeps its new group in list order
+        update_task(manager, 3, 'goal_id', 1)
+        assert [t['title'] for t in index.tasks_for_goal(1)] == ['Jog', 'Sprint', 'Budget']
+        assert index.tasks_for_goal(2) == []
+
+        update_goal(manager, 2, 'goal_id', 7)
+        assert index.goal(2) is None and index.goal(7)['title'] == 'Save'
+
+    def test_trackers(self, manager):
+        add_progress_tracker(manager, 5, '2025-07-01T10:00')
+        add_progress_tracker(manager, 5, '2025-07-02T10:00')
+
+        assert update_progress_tracker(manager, 2, 'status', 'NOTIFIED') == 'Updated progress tracker 2.'
+        assert [t['tracker_id'] for t in manager.index.trackers_for_task(5)] == [1, 2]
+        assert 'not found' in update_progress_tracker(manager, 3, 'status', 'NOTIFIED')
+
+    def test_rebuilds_after_direct_changes(self, manager):
+        _add_task(manager, 1, 'Jog')
+        assert manager.index.task(1)['title'] == 'Jog'
+
+        # Appends and replacements that bypass the tools are picked up on the next lookup
+        manager.get_state()['tasks'].append({'task_id': 2, 'goal_id': 1, 'status': 'PENDING', 'title': 'Swim', 'description': ''})
+        assert manager.index.task(2)['title'] == 'Swim'
+        assert 'Swim' in list_tasks(manager, 'PENDING')
+
+        manager.get_state()['tasks'] = [{'task_id': 9, 'goal_id': 1, 'status': 'PENDING', 'title': 'Row', 'description': ''}]
+        assert manager.index.task(1) is None
+        assert [t['title'] for t in manager.index.tasks_for_goal(1)] == ['Row']
+
+        manager.state = manager.get_default_state()
+        assert manager.index.task(9) is None
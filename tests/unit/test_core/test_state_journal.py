@@ -0,0 +1,118 @@
+"""
+Test suite for the journaled StateManager storage mode
+"""
+
+import os
+import json
+import pytest
+
+from navi.core.state.manager import StateManager
+from navi.core.state.journal import StateChangeTracker, apply_ops
+
+
+def _message(role, text):
+    return {'role': role, 'parts': [{'text': text}]}
+
+
+class TestStateChangeTracker:
+    """Diffing state into journal ops"""
+
+    def test_append_only_list_produces_extend(self):
+        tracker = StateChangeTracker()
+        state = {'chat_history': [_message('user', 'hi')], 'goals': []}
+        tracker.reset(state)
+
+        state['chat_history'].append(_message('model', 'hello'))
+        ops, pending = tracker.diff(state)
+
+        assert ops == [{'op': 'extend', 'key': 'chat_history', 'items': [_message('model', 'hello')]}]
+
+    def test_trimmed_log_records_dropped_items(self):
+        tracker = StateChangeTracker()
+        state = {'tool_execution_log': [{'n': i} for i in range(5)]}
+        tracker.reset(state)
+
+        state['tool_execution_log'] = state['tool_execution_log'][2:] + [{'n': 5}]
+        ops, _ = tracker.diff(state)
+
+        assert ops == [{'op': 'extend', 'key': 'tool_execution_log', 'items': [{'n': 5}], 'drop': 2}]
+        replayed = apply_ops({'tool_execution_log': [{'n': i} for i in range(5)]}, ops)
+        assert replayed == state
+
+    def test_in_place_entity_change_produces_set(self):
+        tracker = StateChangeTracker()
+        state = {'tasks': [{'task_id': 1, 'status': 'PENDING'}]}
+        tracker.reset(state)
+
+        state['tasks'][0]['status'] = 'COMPLETED'
+        ops, _ = tracker.diff(state)
+
+        assert ops == [{'op': 'set', 'key': 'tasks', 'value': [{'task_id': 1, 'status': 'COMPLETED'}]}]
+
+    def test_unchanged_state_produces_no_ops(self):
+        tracker = StateChangeTracker()
+        state = {'chat_history': [_message('user', 'hi')], 'goals': [{'goal_id': 1}]}
+        tracker.reset(state)
+
+        ops, _ = tracker.diff(state)
+        assert ops == []
+
+
+class TestJournaledStateManager:
+    """Round trips through snapshot plus journal"""
+
+    @pytest.fixture
+    def state_path(self, tmp_path):
+        return str(tmp_path / 'state.json')
+
+    def test_save_appends_instead_of_rewriting(self, state_path):
+        sm = StateManager(filepath=state_path, journaled=True)
+        sm.get_state()
+        snapshot_mtime = os.path.getmtime(state_path)
+
+        sm.state['chat_history'].append(dict(_message('user', 'hello'), timestamp='2025-07-06T10:00:00'))
+        sm.save_state()
+
+        assert os.path.exists(state_path + '.journal')
+        assert os.path.getmtime(state_path) == snapshot_mtime
+
+        reloaded = StateManager(filepath=state_path, journaled=True)
+        assert reloaded.state['chat_history'][-1]['parts'][0]['text'] == 'hello'
+
+    def test_compaction_folds_journal_into_snapshot(self, state_path):
+        sm = StateManager(filepath=state_path, journaled=True)
+        for i in range(3):
+            sm.state['tool_execution_log'] = sm.state.get('tool_execution_log', []) + [{'n': i}]
+            sm.save_state()
+
+        sm.storage.journal.compact()
+
+        with open(state_path) as f:
+            snapshot = json.load(f)
+        assert [entry['n'] for entry in snapshot['tool_execution_log']] == [0, 1, 2]
+        assert os.path.getsize(state_path + '.journal') == 0
+
+        reloaded = StateManager(filepath=state_path, journaled=True)
+        assert [entry['n'] for entry in reloaded.state['tool_execution_log']] == [0, 1, 2]
+
+    def test_truncated_journal_record_is_ignored(self, state_path):
+        sm = StateManager(filepath=state_path, journaled=True)
+        sm.state['user_details']['name'] = 'Ada'
+        sm.save_state()
+
+        with open(state_path + '.journal', 'a') as f:
+            f.write('{"seq": 99, "ops": [')
+
+        reloaded = StateManager(filepath=state_path, journaled=True)
+        assert reloaded.state['user_details'] == {'name': 'Ada'}
+
+    def test_plain_mode_replays_and_discards_journal(self, state_path):
+        sm = StateManager(filepath=state_path, journaled=True)
+        sm.state['conversation_stage'] = 'Goal Definition'
+        sm.save_state()
+
+        plain = StateManager(filepath=state_path, journaled=False)
+        assert plain.state['conversation_stage'] == 'Goal Definition'
+
+        plain.save_state()
+        assert not os.path.exists(state_path + '.journal')
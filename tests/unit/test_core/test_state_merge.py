@@ -0,0 +1,93 @@
+"""
+Test suite for merging concurrent saves
+"""
+
+from navi.core.state.journal import StateChangeTracker
+from navi.core.state.manager import StateManager
+from navi.core.state.merge import merge_concurrent
+from navi.core.tools.goals import add_goal
+
+
+def _goal(goal_id, title):
+    return {'goal_id': goal_id, 'title': title}
+
+
+def _base():
+    return {
+        'metadata': {'next_goal_id': 2, 'version': 1},
+        'goals': [_goal(1, 'Run')],
+        'tasks': [{'task_id': 1, 'goal_id': 1, 'status': 'PENDING'}],
+        'chat_history': [{'role': 'user', 'parts': [{'text': 'hi'}]}],
+        'user_details': {'name': 'Ann'},
+    }
+
+
+def _tracker(state):
+    tracker = StateChangeTracker()
+    tracker.reset(state)
+    return tracker
+
+
+class TestMergeConcurrent:
+    """Three-way merge of our changes onto another process's save"""
+
+    def test_both_sides_add_records_and_messages(self):
+        baseline = _tracker(_base())
+        ours, theirs = _base(), _base()
+
+        ours['goals'].append(_goal(2, 'Save'))
+        ours['tasks'].append({'task_id': 2, 'goal_id': 2, 'status': 'PENDING'})
+        ours['metadata']['next_goal_id'] = 3
+        ours['chat_history'].append({'role': 'user', 'parts': [{'text': 'ours'}]})
+        ours['user_details']['age'] = 30
+
+        theirs['goals'].append(_goal(2, 'Read'))
+        theirs['metadata']['next_goal_id'] = 3
+        theirs['chat_history'].append({'role': 'user', 'parts': [{'text': 'theirs'}]})
+        theirs['user_details']['city'] = 'Oslo'
+
+        conflicts = merge_concurrent(theirs, ours, baseline)
+
+        assert conflicts == []
+        # Our goal was renumbered and the task pointing at it followed
+        assert theirs['goals'] == [_goal(1, 'Run'), _goal(2, 'Read'), _goal(3, 'Save')]
+        assert theirs['tasks'][-1]['goal_id'] == 3
+        assert theirs['metadata']['next_goal_id'] == 4
+        assert [m['parts'][0]['text'] for m in theirs['chat_history']] == ['hi', 'theirs', 'ours']
+        assert theirs['user_details'] == {'name': 'Ann', 'age': 30, 'city': 'Oslo'}
+
+    def test_same_field_changed_on_both_sides(self):
+        baseline = _tracker(_base())
+        ours, theirs = _base(), _base()
+        ours['tasks'][0]['status'] = 'COMPLETED'
+        theirs['tasks'][0]['status'] = 'IN_PROGRESS'
+        theirs['goals'].pop()
+        ours['goals'].pop()
+
+        conflicts = merge_concurrent(theirs, ours, baseline)
+
+        assert conflicts == ['tasks[1]']
+        assert theirs['tasks'][0]['status'] == 'COMPLETED'
+        assert theirs['goals'] == []
+
+
+class TestConcurrentSave:
+    """StateManager merges instead of overwriting"""
+
+    def test_stale_save_merges(self, tmp_path):
+        path = str(tmp_path / 'state.json')
+        first = StateManager(filepath=path, backend='json', journaled=False, segmented=False)
+        second = StateManager(filepath=path, backend='json', journaled=False, segmented=False)
+        first.get_state()
+        second.get_state()
+
+        add_goal(first, 'Run', 'Health', '', '', '', '', '')
+        first.save_state()
+        add_goal(second, 'Read', 'Learning', '', '', '', '', '')
+        second.save_state()
+
+        reloaded = StateManager(filepath=path, backend='json', journaled=False, segmented=False)
+        goals = reloaded.get_state()['goals']
+        assert [(g['goal_id'], g['title']) for g in goals] == [(1, 'Run'), (2, 'Read')]
+        assert reloaded.version == 3
+        assert second.index.goal(2)['title'] == 'Read'
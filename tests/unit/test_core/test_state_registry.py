@@ -0,0 +1,96 @@
+"""
+Test suite for the process-wide StateManager registry
+"""
+
+import time
+import pytest
+
+from navi.core.state.manager import StateManager
+from navi.core.state.registry import StateManagerRegistry
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    # User state files are created relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return StateManagerRegistry(max_size=2)
+
+
+class TestStateManagerRegistry:
+    """Sharing, eviction and revalidation of cached managers"""
+
+    def test_same_user_gets_same_instance(self, registry):
+        first = registry.get('a@example.com')
+        second = registry.get('a@example.com')
+
+        assert first is second
+        assert registry.get('b@example.com') is not first
+
+    def test_writes_through_one_handle_are_visible_through_another(self, registry):
+        registry.get('a@example.com').state['user_details']['name'] = 'Ada'
+
+        assert registry.get('a@example.com').state['user_details'] == {'name': 'Ada'}
+
+    def test_least_recently_used_manager_is_evicted(self, registry):
+        registry.get('a@example.com')
+        registry.get('b@example.com')
+        registry.get('a@example.com')
+        registry.get('c@example.com')
+
+        assert 'a@example.com' in registry
+        assert 'b@example.com' not in registry
+        assert len(registry) == 2
+
+    def test_evicted_manager_still_in_use_is_reused(self, registry):
+        held = registry.get('a@example.com')
+        registry.get('b@example.com')
+        registry.get('c@example.com')
+
+        assert 'a@example.com' not in registry
+        assert registry.get('a@example.com') is held
+
+    def test_reloads_in_place_when_another_process_writes(self, registry):
+        manager = registry.get('a@example.com')
+        state = manager.get_state()
+
+        # Simulate another process writing the same user's state
+        other = StateManager(user_email='a@example.com')
+        other.state['conversation_stage'] = 'Goal Definition'
+        time.sleep(0.01)
+        other.save_state()
+
+        assert registry.get('a@example.com') is manager
+        assert state['conversation_stage'] == 'Goal Definition'
+        assert manager.get_state() is state
+
+    def test_reload_keeps_unsaved_changes(self, registry):
+        manager = registry.get('a@example.com')
+        manager.state['goals'].append({'goal_id': 1, 'title': 'g'})
+
+        other = StateManager(user_email='a@example.com')
+        other.state['conversation_stage'] = 'Goal Definition'
+        time.sleep(0.01)
+        other.save_state()
+
+        assert registry.get('a@example.com') is manager
+        assert manager.state['conversation_stage'] == 'Goal Definition'
+        assert [goal['title'] for goal in manager.state['goals']] == ['g']
+
+        manager.save_state()
+        stored = StateManager(user_email='a@example.com').get_state()
+        assert stored['conversation_stage'] == 'Goal Definition'
+        assert [goal['title'] for goal in stored['goals']] == ['g']
+
+    def test_own_saves_do_not_trigger_reload(self, registry):
+        manager = registry.get('a@example.com')
+        manager.state['user_details']['name'] = 'Ada'
+        manager.save_state()
+
+        assert not manager.is_stale()
+        assert not manager.reload_if_stale()
+
+    def test_discard_forgets_manager(self, registry):
+        manager = registry.get('a@example.com')
+        registry.discard('a@example.com')
+
+        assert registry.get('a@example.com') is not manager
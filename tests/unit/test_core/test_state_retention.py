@@ -0,0 +1,88 @@
+"""
+Test suite for reflection and insight retention policies
+"""
+
+import time
+from datetime import datetime
+
+from navi.core.state.manager import StateManager
+from navi.core.state.retention import ColdStorage, RetentionPolicy, apply_retention, expired_prefix
+from navi.core.tools.utilities import add_insight
+
+
+def _reflection(day, action):
+    return {'timestamp': f'2025-07-{day:02d}T10:00:00', 'action_taken': action}
+
+
+class TestRetentionPolicy:
+    """Which entries expire"""
+
+    def test_parse(self):
+        policy = RetentionPolicy.parse('count=10, age_days=7,bytes=2048')
+        assert (policy.max_count, policy.max_age_days, policy.max_bytes) == (10, 7.0, 2048)
+
+    def test_count_and_age_limits(self):
+        entries = [_reflection(d, 'silent_reflection') for d in range(1, 11)]
+
+        assert expired_prefix(entries, RetentionPolicy(max_count=4), datetime(2025, 7, 11)) == 6
+        assert expired_prefix(entries, RetentionPolicy(max_age_days=3), datetime(2025, 7, 11)) == 7
+
+    def test_aware_timestamps_are_compared_in_local_time(self, monkeypatch):
+        monkeypatch.setenv('TZ', 'Etc/GMT-5')  # UTC+5
+        time.tzset()
+        try:
+            # 01:00 on the 11th locally, inside a one-day window ending 00:30 on the 12th
+            entries = [{'timestamp': '2025-07-10T20:00:00+00:00'}]
+            assert expired_prefix(entries, RetentionPolicy(max_age_days=1), datetime(2025, 7, 12, 0, 30)) == 0
+        finally:
+            monkeypatch.undo()
+            time.tzset()
+
+    def test_byte_limit(self):
+        entries = [{'text': 'x' * 100} for _ in range(10)]
+        assert expired_prefix(entries, RetentionPolicy(max_bytes=350), datetime.now()) == 7
+
+
+class TestApplyRetention:
+    """Rollups and cold storage of expired entries"""
+
+    def test_expired_reflections_are_rolled_up_and_archived(self, tmp_path):
+        state = {'hourly_reflections': [
+            _reflection(1, 'silent_reflection'),
+            _reflection(1, 'message_sent'),
+            _reflection(1, 'silent_reflection'),
+            _reflection(2, 'silent_reflection'),
+        ]}
+        cold = ColdStorage(str(tmp_path / 'cold'))
+
+        expired = apply_retention(state, 'hourly_reflections', RetentionPolicy(max_count=1), cold)
+
+        assert expired == 3
+        assert state['hourly_reflections'] == [_reflection(2, 'silent_reflection')]
+        assert state['rollups']['hourly_reflections']['2025-07-01'] == {
+            'total': 3, 'silent_reflection': 2, 'message_sent': 1
+        }
+        assert len(cold.read('hourly_reflections')) == 3
+
+    def test_cold_storage_appends_across_runs(self, tmp_path):
+        cold = ColdStorage(str(tmp_path / 'cold'))
+        cold.archive('insights', [{'timestamp': '2025-07-01T00:00:00', 'n': 1}])
+        cold.archive('insights', [{'timestamp': '2025-07-02T00:00:00', 'n': 2}])
+
+        assert [e['n'] for e in cold.read('insights')] == [1, 2]
+
+
+class TestInsightRetention:
+    """add_insight keeps ids unique while old insights expire"""
+
+    def test_insight_ids_stay_unique_after_expiry(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('NAVI_RETENTION_INSIGHTS', 'count=2')
+        sm = StateManager(filepath=str(tmp_path / 'state.json'), backend='json')
+
+        for i in range(4):
+            add_insight(sm, f'insight {i}')
+
+        insights = sm.state['insights']
+        assert [i['insight_id'] for i in insights] == [3, 4]
+        assert sm.state['rollups']['insights']
+        assert len(ColdStorage(str(tmp_path / 'state.cold')).read('insights')) == 2
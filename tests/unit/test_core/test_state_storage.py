@@ -0,0 +1,92 @@
+"""
+Test suite for pluggable StateManager storage backends
+"""
+
+import os
+import pytest
+from datetime import datetime
+
+from navi.core.state.manager import StateManager
+
+
+def _tracker(tracker_id, check_in_time, status='PENDING'):
+    return {'tracker_id': tracker_id, 'task_id': 1, 'check_in_time': check_in_time, 'status': status}
+
+
+class TestSQLiteStorage:
+    """SQLite driver round trips and indexed queries"""
+
+    @pytest.fixture
+    def state_path(self, tmp_path):
+        return str(tmp_path / 'state.json')
+
+    def test_round_trip_preserves_state(self, state_path):
+        sm = StateManager(filepath=state_path, backend='sqlite')
+        sm.state['goals'].append({'goal_id': 1, 'title': 'Run a marathon', 'category': 'Health'})
+        sm.state['tasks'].append({'task_id': 1, 'goal_id': 1, 'status': 'PENDING', 'description': 'Run 5k'})
+        sm.state['chat_history'].append({'role': 'user', 'parts': [{'text': 'hi'}], 'timestamp': '2025-07-06T10:00:00'})
+        sm.state['user_details']['name'] = 'Ada'
+        sm.save_state()
+
+        reloaded = StateManager(filepath=state_path, backend='sqlite')
+        assert reloaded.filepath.endswith('state.db')
+        assert reloaded.state == sm.state
+
+    def test_due_trackers_query_does_not_load_state(self, state_path):
+        sm = StateManager(filepath=state_path, backend='sqlite')
+        sm.state['progress_trackers'] = [
+            _tracker(1, '01/07/25 09:00'),
+            _tracker(2, '2099-01-01 09:00'),
+            _tracker(3, '01/07/25 09:00', status='NOTIFIED'),
+        ]
+        sm.save_state()
+
+        fresh = StateManager(filepath=state_path, backend='sqlite')
+        due = fresh.get_due_progress_trackers(datetime(2025, 7, 2))
+
+        assert [t['tracker_id'] for t in due] == [1]
+        assert not fresh.is_loaded
+
+    def test_recent_messages_query(self, state_path):
+        sm = StateManager(filepath=state_path, backend='sqlite')
+        for i in range(15):
+            sm.state['chat_history'].append({'role': 'user', 'parts': [{'text': f'u{i}'}]})
+            sm.state['chat_history'].append({'role': 'model', 'parts': [{'text': f'm{i}'}]})
+        sm.save_state()
+
+        fresh = StateManager(filepath=state_path, backend='sqlite')
+        recent = fresh.get_recent_messages(role='user', limit=10)
+
+        assert [m['parts'][0]['text'] for m in recent] == [f'u{i}' for i in range(5, 15)]
+
+    def test_incremental_saves_apply_appends_and_trims(self, state_path):
+        sm = StateManager(filepath=state_path, backend='sqlite')
+        sm.state['tool_execution_log'] = [{'n': i} for i in range(3)]
+        sm.save_state()
+
+        sm.state['tool_execution_log'] = sm.state['tool_execution_log'][1:] + [{'n': 3}]
+        sm.save_state()
+
+        reloaded = StateManager(filepath=state_path, backend='sqlite')
+        assert reloaded.state['tool_execution_log'] == [{'n': 1}, {'n': 2}, {'n': 3}]
+
+    def test_migrates_existing_json_state(self, state_path):
+        legacy = StateManager(filepath=state_path, backend='json')
+        legacy.state['goals'].append({'goal_id': 1, 'title': 'Learn Spanish'})
+        legacy.save_state()
+
+        migrated = StateManager(filepath=state_path, backend='sqlite')
+        assert migrated.state['goals'] == [{'goal_id': 1, 'title': 'Learn Spanish'}]
+        assert not os.path.exists(state_path)
+        assert os.path.exists(state_path + '.migrated')
+
+
+class TestJsonStorageQueries:
+    """The JSON driver answers the same queries by scanning loaded state"""
+
+    def test_due_trackers_scan(self, tmp_path):
+        sm = StateManager(filepath=str(tmp_path / 'state.json'), backend='json')
+        sm.state['progress_trackers'] = [_tracker(1, '01/07/25 09:00'), _tracker(2, 'not a date')]
+
+        due = sm.get_due_progress_trackers(datetime(2025, 7, 2))
+        assert [t['tracker_id'] for t in due] == [1]
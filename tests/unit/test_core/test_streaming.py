@@ -0,0 +1,112 @@
+"""
+Test suite for streamed responses: the tag parser, the stream pump and the engine's streaming turn
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from navi.core.engine.conversation import NaviConversationEngine
+from navi.core.engine.llm_executor import LLMTimeout, iterate_llm_stream
+from navi.core.engine.streaming import StreamingTagParser
+from navi.core.state.manager import StateManager
+
+
+def _parse(chunks):
+    parser = StreamingTagParser()
+    pieces = [parser.feed(chunk) for chunk in chunks]
+    return pieces, parser.close()
+
+
+class TestStreamingTagParser:
+    """Only <message> content reaches the user, however the chunks fall"""
+
+    def test_tags_split_across_chunks(self):
+        pieces, tail = _parse(['<strat', 'egize>plan ', 'it</strategize><mes', 'sage>Hel', 'lo there</message>'])
+
+        assert ''.join(pieces) + tail == 'Hello there'
+        assert pieces[3] == 'Hel'
+
+    def test_every_split_point(self):
+        text = '<strategize>a<b</strategize>\n<message>x < y and <b>bold</b></message>'
+        for cut in range(len(text) + 1):
+            pieces, tail = _parse([text[:cut], text[cut:]])
+            assert ''.join(pieces) + tail == 'x < y and <b>bold</b>', cut
+
+    def test_no_message_section_is_shown_whole(self):
+        pieces, tail = _parse(['Just ', 'plain text <strategize>hidden</strategize> '])
+
+        assert pieces == ['', '']
+        assert tail == 'Just plain text'
+
+
+class TestIterateLLMStream:
+    """Blocking streams are pumped off the event loop"""
+
+    def test_yields_items_from_a_worker_thread(self):
+        def produce():
+            for i in range(3):
+                yield i, threading.get_ident()
+
+        async def main():
+            return [item async for item in iterate_llm_stream(produce())], threading.get_ident()
+
+        items, loop_thread = asyncio.run(main())
+        assert [i for i, _ in items] == [0, 1, 2]
+        assert all(thread != loop_thread for _, thread in items)
+
+    def test_stall_times_out(self):
+        def produce():
+            yield 1
+            time.sleep(1)
+            yield 2
+
+        async def main():
+            seen = []
+            with pytest.raises(LLMTimeout):
+                async for item in iterate_llm_stream(produce(), timeout=0.05):
+                    seen.append(item)
+            return seen
+
+        assert asyncio.run(main()) == [1]
+
+
+class FakeStream:
+    """A streamed response: iterable chunks, then the full text"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.text = ''.join(chunks)
+        self.candidates = []
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield SimpleNamespace(text=chunk)
+
+
+class TestEngineStreaming:
+    """stream_message yields the visible text, then the finished response"""
+
+    def test_stream_message(self, tmp_path):
+        state_manager = StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                                     journaled=False, segmented=False)
+        chunks = ['<strategize>Greet', ' them</strategize><message>Hi ', 'Ada!', '</message>']
+        chat = Mock(history=[])
+        chat.send_message.return_value = FakeStream(chunks)
+
+        with patch.object(NaviConversationEngine, '_initialize_ai', return_value=(Mock(), chat)):
+            engine = NaviConversationEngine(state_manager)
+
+        async def main():
+            return [event async for event in engine.stream_message('hello')]
+
+        events = asyncio.run(main())
+        assert ''.join(event.text for event in events) == 'Hi Ada!'
+        assert events[-1].response.message_text == 'Hi Ada!'
+        assert events[-1].response.strategize_text == 'Greet them'
+        assert chat.send_message.call_args.kwargs == {'stream': True}
+        assert state_manager.get_state()['gemini_api_log'][-1]['call_type'] == 'chat.send_message (stream)'
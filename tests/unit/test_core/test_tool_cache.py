@@ -0,0 +1,93 @@
+"""
+Test suite for the per-turn cache of read-only tool results
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from navi.core.engine.conversation import NaviToolManager
+from navi.core.engine.tool_cache import ToolResultCache, is_cacheable
+from navi.core.state.manager import StateManager
+
+
+def _response(*calls):
+    parts = [SimpleNamespace(text='', function_call=SimpleNamespace(name=name, args=args)) for name, args in calls]
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))])
+
+
+class TestToolResultCache:
+    """Which calls are cached and what invalidates them"""
+
+    def test_only_deterministic_reads_are_cacheable(self):
+        assert is_cacheable('list_goals', {})
+        assert is_cacheable('list_events', {'start_date': '01/07/25', 'end_date': '07/07/25'})
+        assert not is_cacheable('add_goal', {'title': 'Run'})
+        assert not is_cacheable('get_current_datetime', {})
+        assert not is_cacheable('unknown_tool', {})
+
+    def test_keyed_by_arguments(self):
+        cache = ToolResultCache()
+        cache.store('list_events', {'start_date': '01/07/25'}, 'week one')
+
+        assert cache.lookup('list_events', {'start_date': '01/07/25'}) == (True, 'week one')
+        assert cache.lookup('list_events', {'start_date': '08/07/25'}) == (False, None)
+        assert cache.hit_rate == 0.5
+
+    def test_writes_invalidate_overlapping_reads(self):
+        cache = ToolResultCache()
+        cache.store('list_goals', {}, 'goals')
+        cache.store('list_tasks', {}, 'tasks')
+        cache.store('get_event_details', {'event_id': 'a'}, 'event a')
+        cache.store('get_event_details', {'event_id': 'b'}, 'event b')
+
+        assert cache.invalidate('add_goal', {'title': 'Run'}) == 1
+        assert cache.invalidate('delete_event', {'event_id': 'a'}) == 1
+        assert cache.lookup('list_tasks', {})[0]
+        assert cache.lookup('get_event_details', {'event_id': 'b'})[0]
+        assert not cache.lookup('list_goals', {})[0]
+
+    def test_failures_are_not_cached(self):
+        cache = ToolResultCache()
+        cache.store('list_events', {}, 'Error fetching calendar events: timeout')
+        assert not cache.lookup('list_events', {})[0]
+
+
+class TestToolManagerCache:
+    """Repeated reads within a turn don't run the tool again"""
+
+    def _manager(self, tmp_path):
+        state_manager = StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                                     journaled=False, segmented=False)
+        manager = NaviToolManager(state_manager)
+        list_goals = Mock(return_value='- ID 1: Run')
+        add_goal = Mock(return_value='Added goal')
+        manager.executable_tools = {'list_goals': list_goals, 'add_goal': add_goal}
+        return manager, state_manager, list_goals
+
+    def test_repeated_reads_hit_until_a_write(self, tmp_path):
+        manager, state_manager, list_goals = self._manager(tmp_path)
+        manager.start_turn()
+
+        asyncio.run(manager.execute_tools(_response(('list_goals', {}))))
+        results = asyncio.run(manager.execute_tools(_response(('list_goals', {}))))
+        assert list_goals.call_count == 1
+        assert results[0]['function_response']['response']['result'] == '- ID 1: Run'
+
+        # A write earlier in the same response makes the read run again
+        goal = {'title': 'Swim', 'category': 'Health', 'description': 'Swim weekly', 'end_condition': '20 swims',
+                'due_date': '01/12/25', 'importance': 'High', 'urgency': 'Low'}
+        asyncio.run(manager.execute_tools(_response(('add_goal', goal), ('list_goals', {}))))
+        assert list_goals.call_count == 2
+
+        log = state_manager.get_state()['tool_execution_log']
+        assert [entry['cached'] for entry in log] == [False, True, False, False]
+        assert log[-1]['cache_hit_rate'] == round(1 / 3, 2)
+
+    def test_cache_is_per_turn(self, tmp_path):
+        manager, _, list_goals = self._manager(tmp_path)
+        manager.start_turn()
+        asyncio.run(manager.execute_tools(_response(('list_goals', {}))))
+        manager.start_turn()
+        asyncio.run(manager.execute_tools(_response(('list_goals', {}))))
+        assert list_goals.call_count == 2
@@ -0,0 +1,99 @@
+"""
+Test suite for the declarative tool registry: schemas and argument validation
+"""
+
+import asyncio
+from types import SimpleNamespace
+from typing import List, Optional
+from unittest.mock import Mock
+
+from navi.core.engine.conversation import NaviToolManager
+from navi.core.state.manager import StateManager
+from navi.core.tools import tool_registry
+from navi.core.tools.registry import parse_docstring, spec_from_function
+
+
+def sample_tool(state_manager, title: str, count: int, tags: List[str], note: Optional[str] = None):
+    """Does something with a title.
+
+    Args:
+        state_manager: State manager instance
+        title: What to call it
+        count: How many; this description
+            continues on the next line
+        tags: Labels to attach
+    """
+
+
+class TestSchemas:
+    """Schemas built from signatures, docstrings and overrides"""
+
+    def test_parse_docstring(self):
+        description, arguments = parse_docstring(sample_tool.__doc__)
+        assert description == 'Does something with a title.'
+        assert arguments['title'] == 'What to call it'
+        assert arguments['count'] == 'How many; this description continues on the next line'
+
+    def test_types_and_required(self):
+        schema = spec_from_function(sample_tool).parameters_schema()
+        properties = schema['properties']
+        assert 'state_manager' not in properties
+        assert properties['count']['type'] == 'INTEGER'
+        assert properties['tags'] == {'type': 'ARRAY', 'description': 'Labels to attach', 'items': {'type': 'STRING'}}
+        assert properties['note']['type'] == 'STRING'
+        assert schema['required'] == ['title', 'count', 'tags']
+
+    def test_registered_tools_have_descriptions_and_enums(self):
+        add_task = tool_registry.get('add_task').parameters_schema()
+        assert add_task['properties']['title']['description']
+        assert 'due_date' not in add_task['required']
+
+        status = tool_registry.get('list_tasks').parameters_schema()['properties']['filter_by_status']
+        assert status['enum'] == ['PENDING', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED']
+        assert tool_registry.get('list_tasks').description.startswith('Lists all tasks')
+
+
+class TestValidation:
+    """Calls are checked and converted before they run"""
+
+    def test_numbers_are_converted(self):
+        args, problems = tool_registry.validate('update_task', {'task_id': 3.0, 'field_to_update': 'title',
+                                                                'new_value': 'Run'})
+        assert problems == []
+        assert args['task_id'] == 3 and isinstance(args['task_id'], int)
+
+    def test_missing_and_unknown_arguments(self):
+        _, problems = tool_registry.validate('update_task', {'task_id': 1, 'field': 'title'})
+        assert "missing required argument 'field_to_update'" in problems
+        assert "unknown argument 'field'" in problems
+
+    def test_enums_are_canonicalized(self):
+        args, problems = tool_registry.validate('list_tasks', {'filter_by_status': 'completed'})
+        assert problems == [] and args['filter_by_status'] == 'COMPLETED'
+        _, problems = tool_registry.validate('list_tasks', {'filter_by_status': 'DONE'})
+        assert problems
+
+    def test_recurrence_formats(self):
+        base = {'event_description': 'Gym', 'start_time': '01/07/25 08:00', 'end_time': '01/07/25 09:00'}
+        for recurrence in ('WEEKLY', 'daily_count=30', 'RRULE:FREQ=DAILY'):
+            assert tool_registry.validate('add_event', dict(base, recurrence=recurrence))[1] == []
+        assert tool_registry.validate('add_event', dict(base, recurrence='every tuesday'))[1]
+
+    def test_task_status_updates(self):
+        args = {'task_id': 1, 'field_to_update': 'status', 'new_value': 'DONE'}
+        assert tool_registry.validate('update_task', args)[1]
+        args['new_value'] = 'COMPLETED'
+        assert tool_registry.validate('update_task', args)[1] == []
+
+    def test_malformed_call_is_not_run(self, tmp_path):
+        manager = NaviToolManager(StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                                               journaled=False, segmented=False))
+        update_task = Mock(return_value='Updated')
+        manager.executable_tools['update_task'] = update_task
+        call = SimpleNamespace(text='', function_call=SimpleNamespace(name='update_task', args={'task_id': 'abc'}))
+        response = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[call]))])
+
+        results = asyncio.run(manager.execute_tools(response))
+
+        update_task.assert_not_called()
+        assert results[0]['function_response']['response']['result'].startswith('ERROR: Invalid arguments for update_task')
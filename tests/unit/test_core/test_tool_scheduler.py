@@ -0,0 +1,73 @@
+"""
+Test suite for concurrent tool call scheduling
+"""
+
+import asyncio
+import threading
+import time
+
+from navi.core.engine.tool_scheduler import plan_tool_calls, run_tool_calls, tool_metrics
+
+
+class TestPlanToolCalls:
+    """Which calls wait for which"""
+
+    def test_reads_overlap_writes_serialize(self):
+        calls = [
+            ('list_events', {'start_date': '01/07/25', 'end_date': '07/07/25'}),
+            ('list_goals', {}),
+            ('add_event', {'event_description': 'Gym'}),
+            ('get_event_details', {'event_id': 'a'}),
+            ('update_event', {'event_id': 'b'}),
+            ('update_event', {'event_id': 'a'}),
+        ]
+        assert plan_tool_calls(calls) == [[], [], [0], [2], [0, 2], [0, 2, 3]]
+
+    def test_event_waits_for_timezone_change(self):
+        calls = [('set_user_timezone', {'timezone': 'Asia/Jerusalem'}),
+                 ('add_event', {'event_description': 'Gym'}),
+                 ('add_task', {'title': 'Read'})]
+        assert plan_tool_calls(calls) == [[], [0], [0, 1]]
+
+    def test_unknown_tools_run_alone(self):
+        calls = [('list_goals', {}), ('mystery_tool', {}), ('list_tasks', {})]
+        assert plan_tool_calls(calls) == [[], [0], [1]]
+
+
+class TestRunToolCalls:
+    """Concurrency, ordering and metrics"""
+
+    def test_independent_calls_overlap_and_keep_order(self):
+        tool_metrics.reset()
+        calls = [('list_events', {}), ('list_goals', {}), ('add_goal', {}), ('update_goal', {})]
+        order = []
+        lock = threading.Lock()
+
+        def tool(name, delay):
+            def run():
+                time.sleep(delay)
+                with lock:
+                    order.append(name)
+                return name
+            return run
+
+        thunks = [tool('events', 0.2), tool('goals', 0.2), tool('add', 0.01), tool('update', 0.0)]
+        started = time.monotonic()
+        results = asyncio.run(run_tool_calls(calls, thunks, parallel=True))
+        elapsed = time.monotonic() - started
+
+        assert [r.result for r in results] == ['events', 'goals', 'add', 'update']
+        # Writes to goals wait for the read of goals, and for each other
+        assert order.index('add') > order.index('goals') and order.index('update') > order.index('add')
+        assert elapsed < 0.35
+        snapshot = tool_metrics.snapshot()
+        assert snapshot['tools']['list_events']['calls'] == 1
+        assert snapshot['speedup'] > 1.2
+
+    def test_errors_are_returned(self):
+        def fail():
+            raise ValueError('boom')
+
+        results = asyncio.run(run_tool_calls([('list_goals', {}), ('list_tasks', {})],
+                                             [fail, lambda: 'ok'], parallel=True))
+        assert isinstance(results[0].error, ValueError) and results[1].result == 'ok'
@@ -0,0 +1,87 @@
+"""
+Test suite for per-turn budgets on the tool-call loop
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from navi.core.engine.conversation import NaviConversationEngine
+from navi.core.engine.turn_budget import LATENCY, ROUNDS, TOKENS, TOOL_CALLS, TurnBudget
+from navi.core.state.manager import StateManager
+
+
+def _call_response(calls=1, total_tokens=0):
+    parts = [SimpleNamespace(text='', function_call=SimpleNamespace(name='no_such_tool', args={}))
+             for _ in range(calls)]
+    return SimpleNamespace(
+        candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))],
+        usage_metadata=SimpleNamespace(prompt_token_count=total_tokens, candidates_token_count=0,
+                                       cached_content_token_count=0, total_token_count=total_tokens),
+    )
+
+
+class TestTurnBudget:
+    """Which budget, if any, rules out another round"""
+
+    def test_rounds(self):
+        budget = TurnBudget(max_rounds=2, max_tool_calls=0, max_seconds=0, max_tokens=0)
+        budget.add_round(1)
+        assert budget.exhausted(1) is None
+        budget.add_round(1)
+        assert budget.exhausted(1) == ROUNDS
+
+    def test_tool_calls_include_pending(self):
+        budget = TurnBudget(max_rounds=0, max_tool_calls=5, max_seconds=0, max_tokens=0)
+        budget.add_round(3)
+        assert budget.exhausted(2) is None
+        assert budget.exhausted(3) == TOOL_CALLS
+
+    def test_latency(self):
+        now = [100.0]
+        budget = TurnBudget(max_rounds=0, max_tool_calls=0, max_seconds=30, max_tokens=0, clock=lambda: now[0])
+        assert budget.exhausted(1) is None
+        now[0] = 131.0
+        assert budget.exhausted(1) == LATENCY
+
+    def test_tokens(self):
+        budget = TurnBudget(max_rounds=0, max_tool_calls=0, max_seconds=0, max_tokens=1000)
+        budget.add_response(_call_response(total_tokens=600))
+        assert budget.exhausted(1) is None
+        budget.add_response(_call_response(total_tokens=600))
+        assert budget.exhausted(1) == TOKENS
+
+    def test_limits_from_environment(self, monkeypatch):
+        monkeypatch.setenv('NAVI_TURN_MAX_ROUNDS', '3')
+        monkeypatch.setenv('NAVI_TURN_MAX_SECONDS', '0')
+        budget = TurnBudget()
+        assert budget.max_rounds == 3
+        assert budget.max_seconds == 0
+
+
+class TestEngineTurnBudget:
+    """A model that keeps calling tools is stopped and the turn closed off"""
+
+    def test_endless_tool_calls_stop_at_round_budget(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('NAVI_TURN_MAX_ROUNDS', '3')
+        state_manager = StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                                     journaled=False, segmented=False)
+        model = Mock()
+        chat = Mock(history=[])
+        chat.send_message.return_value = _call_response()
+        model.start_chat.return_value = chat
+        with patch('navi.core.engine.conversation.get_model', return_value=model):
+            engine = NaviConversationEngine(state_manager)
+        engine.uses_shared_model = False
+
+        response = asyncio.run(engine.process_message('plan my week'))
+
+        assert chat.send_message.call_count == 4
+        assert response.budget_exhausted == ROUNDS
+        assert response.error is None
+        assert state_manager.get_state()['gemini_api_log'][-1]['budget_exhausted'] == ROUNDS
+
+        # The pending call is answered and the reply closed off in the chat
+        closing = model.start_chat.call_args.kwargs['history'][-2:]
+        assert closing[0]['parts'][0]['function_response']['name'] == 'no_such_tool'
+        assert closing[1]['role'] == 'model'
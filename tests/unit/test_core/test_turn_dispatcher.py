@@ -0,0 +1,145 @@
+"""
+Test suite for the turn dispatcher: per-user serialization, the global cap and priorities
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from navi.core.engine.dispatcher import BACKGROUND, INTERACTIVE, PrioritySemaphore, TurnDispatcher
+from navi.core.state.manager import StateManager
+
+
+def _engine():
+    return SimpleNamespace(turn_lock=PrioritySemaphore(1))
+
+
+class TestPrioritySemaphore:
+    """Freed slots go to the highest-priority waiter, in arrival order within a priority"""
+
+    def test_interactive_waiters_go_first(self):
+        async def scenario():
+            slots = PrioritySemaphore(1)
+            order = []
+
+            async def waiter(name, priority):
+                await slots.acquire(priority)
+                order.append(name)
+                slots.release()
+
+            await slots.acquire()
+            tasks = [asyncio.create_task(waiter(name, priority)) for name, priority in
+                     (('reflection', BACKGROUND), ('check-in', BACKGROUND), ('message', INTERACTIVE))]
+            await asyncio.sleep(0)
+            assert slots.waiting == 3
+            slots.release()
+            await asyncio.gather(*tasks)
+            return order, slots
+
+        order, slots = asyncio.run(scenario())
+        assert order == ['message', 'reflection', 'check-in']
+        assert slots.in_use == 0
+
+    def test_cancelled_waiter_gives_up_its_place(self):
+        async def scenario():
+            slots = PrioritySemaphore(1)
+            await slots.acquire()
+            cancelled = asyncio.create_task(slots.acquire(INTERACTIVE))
+            waiting = asyncio.create_task(slots.acquire(BACKGROUND))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+            slots.release()
+            await waiting
+            return slots
+
+        slots = asyncio.run(scenario())
+        assert slots.in_use == 1 and slots.waiting == 0
+
+
+class TestTurnDispatcher:
+    """One turn per user, a bounded number overall"""
+
+    def test_turns_are_serialized_per_user_and_capped_overall(self):
+        async def scenario():
+            dispatcher = TurnDispatcher(max_concurrent=2)
+            engines = {'alice': _engine(), 'bob': _engine(), 'carol': _engine()}
+            running, peak, per_user_peak = {}, [0], {}
+
+            async def turn(user):
+                async with dispatcher.turn(engines[user]):
+                    running[user] = running.get(user, 0) + 1
+                    per_user_peak[user] = max(per_user_peak.get(user, 0), running[user])
+                    peak[0] = max(peak[0], sum(running.values()))
+                    await asyncio.sleep(0.01)
+                    running[user] -= 1
+
+            await asyncio.gather(*(turn(user) for user in ('alice', 'alice', 'bob', 'carol', 'alice')))
+            return dispatcher, peak[0], per_user_peak
+
+        dispatcher, peak, per_user_peak = asyncio.run(scenario())
+        assert peak == 2
+        assert set(per_user_peak.values()) == {1}
+        assert dispatcher.in_flight == 0
+
+    def test_message_is_admitted_before_queued_reflections(self):
+        async def scenario():
+            dispatcher = TurnDispatcher(max_concurrent=1)
+            order = []
+
+            async def turn(name, engine, priority):
+                async with dispatcher.turn(engine, priority=priority):
+                    order.append(name)
+                    await asyncio.sleep(0)
+
+            await dispatcher.slots.acquire()
+            tasks = [asyncio.create_task(turn(f'reflection {i}', _engine(), 'background')) for i in range(3)]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(turn('message', _engine(), 'interactive')))
+            await asyncio.sleep(0)
+            dispatcher.slots.release()
+            await asyncio.gather(*tasks)
+            return order
+
+        assert asyncio.run(scenario())[0] == 'message'
+
+    def test_plain_locks_still_work(self):
+        async def scenario():
+            engine = SimpleNamespace(turn_lock=asyncio.Lock())
+            async with TurnDispatcher(max_concurrent=1).turn(engine, priority='background'):
+                assert engine.turn_lock.locked()
+            return engine
+
+        assert not asyncio.run(scenario()).turn_lock.locked()
+
+    def test_state_manager_turn_locks_the_pooled_engine(self, tmp_path):
+        manager = StateManager(filepath=str(tmp_path / 'a.json'), backend='json')
+        old, new = _engine(), _engine()
+        pool = SimpleNamespace(engine=old)
+        pool.get = lambda state_manager: pool.engine
+
+        async def turn():
+            async with TurnDispatcher().turn(manager, pool=pool) as engine:
+                assert engine.turn_lock.locked()
+                return engine
+
+        async def scenario():
+            # Another turn holds the old engine while the pool replaces it
+            await old.turn_lock.acquire()
+            waiting = asyncio.create_task(turn())
+            await asyncio.sleep(0)
+            pool.engine = new
+            old.turn_lock.release()
+            return await waiting
+
+        assert asyncio.run(scenario()) is new
+        assert not old.turn_lock.locked() and not new.turn_lock.locked()
+
+    def test_unknown_priority(self):
+        async def scenario():
+            async with TurnDispatcher().turn(_engine(), priority='urgent'):
+                pass
+
+        with pytest.raises(ValueError):
+            asyncio.run(scenario())
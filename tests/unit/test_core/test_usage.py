@@ -0,0 +1,108 @@
+"""
+Test suite for token usage accounting from the provider's usage metadata
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from navi.core.engine.conversation import NaviConversationEngine
+from navi.core.engine.usage import extract_usage, record_usage, usage_series
+from navi.core.state.manager import StateManager
+
+
+def _response(text, prompt=0, candidates=0, cached=0, total=0):
+    part = SimpleNamespace(text=text, function_call=None)
+    return SimpleNamespace(
+        text=text,
+        candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))],
+        usage_metadata=SimpleNamespace(prompt_token_count=prompt, candidates_token_count=candidates,
+                                       cached_content_token_count=cached, total_token_count=total),
+    )
+
+
+class TestExtractUsage:
+    """Reading usage_metadata off a response"""
+
+    def test_reads_reported_counts(self):
+        usage = extract_usage(_response('hi', prompt=1200, candidates=80, cached=1000, total=1280))
+        assert usage == {'prompt_tokens': 1200, 'candidates_tokens': 80, 'cached_tokens': 1000, 'total_tokens': 1280}
+
+    def test_total_derived_when_missing(self):
+        assert extract_usage(_response('hi', prompt=10, candidates=5))['total_tokens'] == 15
+
+    def test_none_without_metadata(self):
+        assert extract_usage(SimpleNamespace(text='hi')) is None
+        assert extract_usage(_response('hi')) is None
+
+
+class TestUsageStats:
+    """Daily aggregation per flow and the time series built from it"""
+
+    def test_aggregates_per_day_and_flow(self):
+        state = {}
+        day = datetime(2025, 3, 1, tzinfo=timezone.utc)
+        usage = {'prompt_tokens': 100, 'candidates_tokens': 10, 'cached_tokens': 50, 'total_tokens': 110}
+        record_usage(state, 'chat', usage, 200, when=day)
+        record_usage(state, 'chat', usage, 300, when=day)
+        record_usage(state, 'reflection', usage, 100, when=day)
+
+        totals = state['usage_stats']['2025-03-01']
+        assert totals['chat']['calls'] == 2
+        assert totals['chat']['prompt_tokens'] == 200
+        assert totals['chat']['response_time_ms'] == 500
+        assert totals['reflection']['total_tokens'] == 110
+
+    def test_series_fills_missing_days(self):
+        state = {}
+        usage = {'prompt_tokens': 100, 'candidates_tokens': 10, 'cached_tokens': 0, 'total_tokens': 110}
+        record_usage(state, 'tracker', usage, when=datetime(2025, 3, 1, tzinfo=timezone.utc))
+        record_usage(state, 'tracker', usage, when=datetime(2025, 3, 3, tzinfo=timezone.utc))
+
+        series = usage_series(state, days=3, today=datetime(2025, 3, 3, tzinfo=timezone.utc))
+        assert series['days'] == ['2025-03-01', '2025-03-02', '2025-03-03']
+        assert series['flows']['tracker']['total_tokens'] == [110, 0, 110]
+        assert series['flows']['chat']['calls'] == [0, 0, 0]
+        assert series['totals']['tracker']['calls'] == 2
+
+
+class TestEngineUsage:
+    """The engine logs what the provider reported, under the turn's flow"""
+
+    def _engine(self, tmp_path, response):
+        state_manager = StateManager(filepath=str(tmp_path / 'state.json'), backend='json',
+                                     journaled=False, segmented=False)
+        model = Mock()
+        chat = model.start_chat.return_value
+        chat.history = []
+        chat.send_message.return_value = response
+        with patch('navi.core.engine.conversation.get_model', return_value=model):
+            engine = NaviConversationEngine(state_manager)
+        return engine, state_manager
+
+    def test_reported_usage_is_logged_and_aggregated(self, tmp_path):
+        engine, state_manager = self._engine(
+            tmp_path, _response('<message>Done</message>', prompt=900, candidates=40, cached=800, total=940))
+        engine.uses_shared_model = False
+
+        asyncio.run(engine.process_message('hello', flow='reflection'))
+
+        state = state_manager.get_state()
+        entry = state['gemini_api_log'][-1]
+        assert entry['flow'] == 'reflection'
+        assert (entry['tokens_in'], entry['tokens_out'], entry['cached_tokens']) == (900, 40, 800)
+        assert 'estimated' not in entry
+        day = next(iter(state['usage_stats'].values()))
+        assert day['reflection']['total_tokens'] == 940
+
+    def test_estimates_are_marked(self, tmp_path):
+        engine, state_manager = self._engine(tmp_path, _response('<message>Done</message>'))
+        engine.uses_shared_model = False
+
+        asyncio.run(engine.process_message('hello'))
+
+        state = state_manager.get_state()
+        assert state['gemini_api_log'][-1]['estimated'] is True
+        assert state['gemini_api_log'][-1]['flow'] == 'chat'
+        assert 'usage_stats' not in state
@@ -0,0 +1,97 @@
+"""
+Test suite for merging a user's rapid-fire Telegram messages into one turn
+"""
+
+import asyncio
+
+from navi.interfaces.adapters import MessageCoalescer
+
+
+class Recorder:
+    """Handler that records each batch, optionally holding the turn until released"""
+
+    def __init__(self, hold: bool = False):
+        self.batches = []
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        if not hold:
+            self.release.set()
+
+    async def __call__(self, key, batch):
+        self.batches.append((key, list(batch)))
+        self.started.set()
+        await self.release.wait()
+
+
+class TestMessageCoalescer:
+    """Messages within the window, or during a turn, become one turn"""
+
+    def test_burst_is_one_turn(self):
+        async def scenario():
+            handler = Recorder()
+            coalescer = MessageCoalescer(handler, window=0.05, max_wait=1.0)
+            drained = await asyncio.gather(*(coalescer.submit(1, text) for text in ('hey', 'one more', 'thing')))
+            return handler, drained
+
+        handler, drained = asyncio.run(scenario())
+        assert handler.batches == [(1, ['hey', 'one more', 'thing'])]
+        assert drained == [True, False, False]
+
+    def test_messages_during_a_turn_are_the_next_turn(self):
+        async def scenario():
+            handler = Recorder(hold=True)
+            coalescer = MessageCoalescer(handler, window=0.01, max_wait=1.0)
+            first = asyncio.create_task(coalescer.submit(1, 'plan my day'))
+            await handler.started.wait()
+
+            await coalescer.submit(1, 'also the gym')
+            await coalescer.submit(1, 'at 6')
+            assert coalescer.pending(1) == 2
+            handler.release.set()
+            await first
+            return handler
+
+        handler = asyncio.run(scenario())
+        assert [batch for _, batch in handler.batches] == [['plan my day'], ['also the gym', 'at 6']]
+
+    def test_users_are_independent(self):
+        async def scenario():
+            handler = Recorder()
+            coalescer = MessageCoalescer(handler, window=0.02, max_wait=1.0)
+            await asyncio.gather(coalescer.submit(1, 'a'), coalescer.submit(2, 'b'), coalescer.submit(1, 'c'))
+            return handler
+
+        handler = asyncio.run(scenario())
+        assert sorted(handler.batches) == [(1, ['a', 'c']), (2, ['b'])]
+
+    def test_max_wait_bounds_the_debounce(self):
+        async def scenario():
+            handler = Recorder()
+            coalescer = MessageCoalescer(handler, window=0.05, max_wait=0.1)
+            first = asyncio.create_task(coalescer.submit(1, 0))
+            # Keep sending more often than the window for well past max_wait
+            for i in range(1, 12):
+                await asyncio.sleep(0.03)
+                await coalescer.submit(1, i)
+            await first
+            return handler
+
+        handler = asyncio.run(scenario())
+        assert len(handler.batches) > 1
+        assert sorted(item for _, batch in handler.batches for item in batch) == list(range(12))
+
+    def test_failed_turn_does_not_stall_the_queue(self):
+        calls = []
+
+        async def handler(key, batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise RuntimeError('engine down')
+
+        async def scenario():
+            coalescer = MessageCoalescer(handler, window=0.0, max_wait=0.0)
+            await coalescer.submit(1, 'first')
+            await coalescer.submit(1, 'second')
+
+        asyncio.run(scenario())
+        assert calls == [['first'], ['second']]
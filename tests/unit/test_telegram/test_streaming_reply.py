@@ -0,0 +1,59 @@
+"""
+Test suite for streaming replies into Telegram
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+from navi.interfaces.adapters import TelegramStreamingReply
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _message():
+    message = Mock()
+    sent = Mock()
+    sent.edit_text = AsyncMock()
+    message.reply_text = AsyncMock(return_value=sent)
+    return message, sent
+
+
+class TestTelegramStreamingReply:
+    """One message, edited no more often than the interval allows"""
+
+    def test_edits_are_rate_limited(self):
+        message, sent = _message()
+        clock = Clock()
+        reply = TelegramStreamingReply(message, interval=1.0, clock=clock)
+
+        async def main():
+            await reply.update('Hel')
+            clock.now = 0.5
+            await reply.update('Hello')
+            clock.now = 1.2
+            await reply.update('Hello there')
+            await reply.finish('*Hello there!*')
+
+        asyncio.run(main())
+        message.reply_text.assert_awaited_once_with('Hel')
+        assert [c.args for c in sent.edit_text.await_args_list] == [('Hello there',), ('*Hello there!*',)]
+        assert sent.edit_text.await_args.kwargs == {'parse_mode': 'Markdown'}
+
+    def test_long_final_reply_continues_in_new_messages(self):
+        message, sent = _message()
+        reply = TelegramStreamingReply(message, interval=0)
+
+        async def main():
+            await reply.update('x' * 5000)
+            await reply.finish('y' * 5000)
+
+        asyncio.run(main())
+        assert len(message.reply_text.await_args_list[0].args[0]) == 4096
+        assert sent.edit_text.await_args.args[0] == 'y' * 4096
+        assert message.reply_text.await_args.args[0] == 'y' * 904
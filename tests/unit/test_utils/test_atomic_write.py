@@ -0,0 +1,85 @@
+"""
+Test suite for crash-safe atomic file writes
+"""
+
+import os
+import json
+import threading
+import pytest
+
+from navi.utils import atomic_write as atomic_write_module
+from navi.utils.atomic_write import atomic_write, atomic_write_json, GroupCommitter
+
+
+class TestAtomicWrite:
+    """Temp file, fsync and rename"""
+
+    def test_writes_json(self, tmp_path):
+        path = str(tmp_path / 'data.json')
+        atomic_write_json(path, {'a': 1}, indent=2)
+
+        with open(path) as f:
+            assert json.load(f) == {'a': 1}
+
+    def test_leaves_no_temp_files(self, tmp_path):
+        path = str(tmp_path / 'data.json')
+        atomic_write(path, 'first')
+        atomic_write(path, 'second')
+
+        assert os.listdir(tmp_path) == ['data.json']
+        assert open(path).read() == 'second'
+
+    def test_unserializable_value_keeps_old_contents(self, tmp_path):
+        path = str(tmp_path / 'data.json')
+        atomic_write_json(path, {'a': 1})
+
+        with pytest.raises(TypeError):
+            atomic_write_json(path, {'a': object()})
+
+        with open(path) as f:
+            assert json.load(f) == {'a': 1}
+
+    def test_failed_rename_keeps_old_contents(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'data.json')
+        atomic_write(path, 'old')
+
+        def failing_replace(src, dst):
+            raise OSError("disk full")
+        monkeypatch.setattr(atomic_write_module.os, 'replace', failing_replace)
+
+        with pytest.raises(OSError):
+            atomic_write(path, 'new')
+
+        assert open(path).read() == 'old'
+        assert os.listdir(tmp_path) == ['data.json']
+
+
+class TestGroupCommitter:
+    """Batched writes share one commit"""
+
+    def test_burst_of_writes_is_committed_together(self, tmp_path):
+        committer = GroupCommitter(window_ms=20)
+        paths = [str(tmp_path / f'file{i}.json') for i in range(5)]
+
+        threads = [
+            threading.Thread(target=committer.write, args=(path, f'{{"n": {i}}}'.encode()))
+            for i, path in enumerate(paths)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=5)
+
+        for i, path in enumerate(paths):
+            with open(path) as f:
+                assert json.load(f) == {'n': i}
+
+    def test_enabled_via_environment(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('NAVI_FSYNC_BATCH_MS', '5')
+        path = str(tmp_path / 'data.json')
+
+        atomic_write_json(path, {'batched': True})
+
+        with open(path) as f:
+            assert json.load(f) == {'batched': True}
+        assert atomic_write_module._committer is not None
@@ -0,0 +1,27 @@
+"""
+Test suite for the orjson-backed JSON helpers
+"""
+
+import json
+
+from navi.utils import fast_json
+
+
+class TestFastJson:
+    """Encoding and decoding with or without orjson"""
+
+    def test_round_trip(self):
+        value = {'chat_history': [{'role': 'user', 'parts': [{'text': 'héllo'}]}], 'n': 1.5}
+
+        assert fast_json.loads(fast_json.dumps(value)) == value
+        assert fast_json.loads(fast_json.dumps(value, pretty=True)) == value
+
+    def test_sorted_output_is_stable(self):
+        assert fast_json.dumps({'b': 1, 'a': 2}, sort_keys=True) == fast_json.dumps({'a': 2, 'b': 1}, sort_keys=True)
+
+    def test_non_string_keys_match_json(self):
+        assert fast_json.loads(fast_json.dumps({1: 'x'})) == json.loads(json.dumps({1: 'x'}))
+
+    def test_falls_back_for_values_orjson_rejects(self):
+        big = 2 ** 70
+        assert fast_json.loads(fast_json.dumps({'big': big})) == {'big': big}
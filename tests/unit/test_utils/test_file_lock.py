@@ -0,0 +1,65 @@
+"""
+Test suite for advisory file locks
+"""
+
+import multiprocessing
+
+import pytest
+
+from navi.utils.file_lock import FileLock, LockTimeout, lock_for
+
+
+def _hold_lock(path, exclusive, ready, release):
+    lock = FileLock(path)
+    with (lock.write() if exclusive else lock.read()):
+        ready.set()
+        release.wait(10)
+
+
+@pytest.fixture
+def holder(tmp_path):
+    """Runs a lock holder in another process; yields a function starting it"""
+    ctx = multiprocessing.get_context('fork')
+    started = []
+
+    def start(exclusive):
+        ready, release = ctx.Event(), ctx.Event()
+        process = ctx.Process(target=_hold_lock, args=(str(tmp_path / 'state.json'), exclusive, ready, release))
+        process.start()
+        assert ready.wait(10)
+        started.append((process, release))
+
+    yield start
+    for process, release in started:
+        release.set()
+        process.join(10)
+
+
+class TestFileLock:
+    """Read/write semantics across processes"""
+
+    def test_readers_share_writers_exclude(self, tmp_path, holder):
+        path = str(tmp_path / 'state.json')
+        holder(exclusive=False)
+
+        with FileLock(path, timeout=1).read():
+            pass
+        with pytest.raises(LockTimeout):
+            with FileLock(path, timeout=0.1).write():
+                pass
+
+    def test_writer_excludes_readers(self, tmp_path, holder):
+        holder(exclusive=True)
+        with pytest.raises(LockTimeout):
+            with FileLock(str(tmp_path / 'state.json'), timeout=0.1).read():
+                pass
+
+    def test_reentrant_upgrade(self, tmp_path):
+        lock = lock_for(str(tmp_path / 'state.json'))
+        assert lock_for(str(tmp_path / 'state.json')) is lock
+
+        with lock.read():
+            with lock.write():
+                assert lock._exclusive
+            assert not lock._exclusive
+        assert lock._fd is None